@@ -7,6 +7,8 @@ import asyncio
 import traceback
 import random
 
+from ryno.streaming import StreamAccumulator
+
 # TODO
 class VideoGeneration(bt.StreamingSynapse):
     pass
@@ -21,24 +23,24 @@ async def query_miner(dendrite, axon_to_use, synapse, timeout, streaming):
             timeout=timeout,
             streaming=streaming,
         )
-        return await handle_response(responses)
+        return await handle_response(responses, synapse.uid)
     except Exception as e:
         print(f"Exception during query: {traceback.format_exc()}")
         return None
 
-async def handle_response(responses):
-    full_response = ""
+async def handle_response(responses, uid=None):
+    accumulator = StreamAccumulator(uid)
     try:
         for resp in responses:
             async for chunk in resp:
+                accumulator.add(chunk)
                 if isinstance(chunk, str):
-                    full_response += chunk
                     print(chunk, end='', flush=True)
                 else:
                     print(f"\n\nFinal synapse: {chunk}\n")
     except Exception as e:
-        print(f"Error processing response for uid {e}")
-    return full_response
+        print(f"Error processing response for uid {uid}: {e}")
+    return accumulator.finish()
 
 async def main():
     print("synching metagraph, this takes way too long.........")
@@ -0,0 +1,99 @@
+"""
+Compare the string-key grouping that scoring used to do with the integer-encoded, vectorized grouping.
+
+    python -m benchmarks.score_grouping --queries 100000
+"""
+import argparse
+import random
+import time
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+from validators.services.query_buffer import QueryBuffer, Vocabulary
+from validators.services.score_grouping import average_scores_by_group, sum_by_uid
+
+Synapse = namedtuple('Synapse', 'provider model')
+PROVIDER_MODELS = [("lucataco", "animate-diff"), ("anotherjesse", "zeroscope-v2-xl")]
+
+
+def make_queries(num_queries, num_uids, seed=0):
+    rng = random.Random(seed)
+    return [(rng.randrange(num_uids), Synapse(*rng.choice(PROVIDER_MODELS)), rng.random()) for _ in range(num_queries)]
+
+
+def string_key_sampling(queries, k):
+    grouped = defaultdict(list)
+    for uid, synapse, response in queries:
+        grouped[f"VideoValidator:{uid}:{synapse.provider}:{synapse.model}"].append((uid, synapse, response))
+    picked = []
+    for key, items in grouped.items():
+        vali_type = str(key).split(":")[0]
+        picked += random.choices(items, k=k)
+    return picked
+
+
+def string_key_scores(scored, bandwidth):
+    scores_dict = defaultdict(list)
+    for uid, synapse, score in scored:
+        scores_dict[f"{uid}::{synapse.provider}::{synapse.model}"].append(score)
+    uid_scores = defaultdict(float)
+    for key, scores in scores_dict.items():
+        uid = int(str(key).split("::")[0])
+        provider = str(key).split("::")[1]
+        model = str(key).split("::")[2]
+        uid_scores[uid] += sum(scores) / len(scores) * 1 * bandwidth[(uid, provider, model)]
+    return dict(uid_scores)
+
+
+def vectorized_scores(scored, bandwidth):
+    provider_models = Vocabulary()
+    uids = np.array([uid for uid, _, _ in scored], dtype=np.int64)
+    provider_model_ids = np.array([provider_models.get_id((syn.provider, syn.model)) for _, syn, _ in scored],
+                                  dtype=np.int64)
+    scores = np.array([score for _, _, score in scored], dtype=np.float64)
+    first_rows, avg_scores, _ = average_scores_by_group(uids, provider_model_ids, scores)
+    band_widths = np.array([bandwidth[(uid, *provider_models[provider_model_id])] for uid, provider_model_id
+                            in zip(uids[first_rows].tolist(), provider_model_ids[first_rows].tolist())],
+                           dtype=np.float64)
+    return sum_by_uid(uids[first_rows], avg_scores * 1 * band_widths)
+
+
+def timeit(fn, *args):
+    start_time = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=100000)
+    parser.add_argument("--uids", type=int, default=256)
+    parser.add_argument("--k", type=int, default=1)
+    args = parser.parse_args()
+    queries = make_queries(args.queries, args.uids)
+    bandwidth = {(uid, provider, model): random.randint(1, 50)
+                 for uid in range(args.uids) for provider, model in PROVIDER_MODELS}
+
+    buffer = QueryBuffer()
+    for uid, synapse, response in queries:
+        buffer.append(uid, synapse, response, 'synthetic', 0.0, 0)
+
+    _, string_sampling_elapsed = timeit(string_key_sampling, queries, args.k)
+    (picks, _), vectorized_sampling_elapsed = timeit(buffer.sample_per_group, args.k)
+    print(f"queries: {len(queries)}, groups: {len(picks)}")
+    print(f"sampling  string keys: {string_sampling_elapsed * 1000:.1f} ms, "
+          f"vectorized: {vectorized_sampling_elapsed * 1000:.1f} ms, "
+          f"speedup {string_sampling_elapsed / vectorized_sampling_elapsed:.1f}x")
+
+    # score every buffered query to stress the per-(uid, provider, model) aggregation.
+    string_scores, string_scoring_elapsed = timeit(string_key_scores, queries, bandwidth)
+    vectorized, vectorized_scoring_elapsed = timeit(vectorized_scores, queries, bandwidth)
+    print(f"aggregation string keys: {string_scoring_elapsed * 1000:.1f} ms, "
+          f"vectorized: {vectorized_scoring_elapsed * 1000:.1f} ms, "
+          f"speedup {string_scoring_elapsed / vectorized_scoring_elapsed:.1f}x")
+    print(f"identical uid scores: {string_scores == vectorized}")
+
+
+if __name__ == "__main__":
+    main()
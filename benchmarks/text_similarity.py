@@ -0,0 +1,45 @@
+"""
+Compare per-pair calculate_text_similarity with the batched calculate_text_similarities.
+
+    python -m benchmarks.text_similarity --pairs 5000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from ryno.text_similarity import calculate_text_similarity, calculate_text_similarities
+
+WORDS = ("video rhino jungle river mountain sunset city night neon rain forest ocean wave camera slow motion "
+         "drone shot close up dancing running flying bright dark colorful cinematic").split()
+
+
+def make_pairs(num_pairs, seed=0):
+    rng = random.Random(seed)
+    return [(" ".join(rng.choices(WORDS, k=rng.randint(5, 60))), " ".join(rng.choices(WORDS, k=rng.randint(5, 60))))
+            for _ in range(num_pairs)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=5000)
+    args = parser.parse_args()
+    pairs = make_pairs(args.pairs)
+
+    start_time = time.perf_counter()
+    per_pair = np.array([calculate_text_similarity(reference, response) for reference, response in pairs])
+    per_pair_elapsed = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    batched = calculate_text_similarities(pairs)
+    batched_elapsed = time.perf_counter() - start_time
+
+    print(f"pairs: {len(pairs)}")
+    print(f"per-pair: {len(pairs) / per_pair_elapsed:,.0f} pairs/s ({per_pair_elapsed:.3f}s)")
+    print(f"batched:  {len(pairs) / batched_elapsed:,.0f} pairs/s ({batched_elapsed:.3f}s)")
+    print(f"speedup:  {per_pair_elapsed / batched_elapsed:.1f}x, max abs diff {np.max(np.abs(per_pair - batched)):.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compare scoring videos one by one with scoring them in batches through compute_video_text_similarities.
+
+    python -m benchmarks.video_scoring --videos 64 --batch-size 16
+"""
+import argparse
+import resource
+import time
+
+import numpy as np
+
+from ryno.reward import compute_video_text_similarities, get_xclip_num_frames
+
+PROMPTS = ["a rhino walking through the jungle", "a drone shot of a city at night", "waves crashing on a beach",
+           "a slow motion close up of rain", "a colorful sunset over the mountains"]
+
+
+def make_videos(num_videos, num_frames, size=224, seed=0):
+    rng = np.random.default_rng(seed)
+    return [[rng.integers(0, 256, (size, size, 3), dtype=np.uint8) for _ in range(num_frames)]
+            for _ in range(num_videos)]
+
+
+def get_peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    num_frames = get_xclip_num_frames()
+    videos = make_videos(args.videos, num_frames)
+    prompts = [PROMPTS[i % len(PROMPTS)] for i in range(args.videos)]
+    print(f"videos: {len(videos)} x {num_frames} frames, model loaded, peak rss {get_peak_rss_mib():.0f} MiB")
+
+    start_time = time.perf_counter()
+    one_by_one = [compute_video_text_similarities([video], [prompt])[0] for video, prompt in zip(videos, prompts)]
+    one_by_one_elapsed = time.perf_counter() - start_time
+    print(f"one by one: {len(videos) / one_by_one_elapsed:.2f} videos/s, peak rss {get_peak_rss_mib():.0f} MiB")
+
+    start_time = time.perf_counter()
+    text_embedding_cache = {}
+    batched = []
+    for i in range(0, len(videos), args.batch_size):
+        batched.extend(compute_video_text_similarities(videos[i:i + args.batch_size], prompts[i:i + args.batch_size],
+                                                       text_embedding_cache))
+    batched_elapsed = time.perf_counter() - start_time
+    print(f"batched:    {len(videos) / batched_elapsed:.2f} videos/s, peak rss {get_peak_rss_mib():.0f} MiB")
+    print(f"speedup:    {one_by_one_elapsed / batched_elapsed:.1f}x, "
+          f"max abs diff {np.max(np.abs(np.array(one_by_one) - np.array(batched))):.2e}")
+
+
+if __name__ == "__main__":
+    main()
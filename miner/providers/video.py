@@ -5,6 +5,7 @@ from starlette.types import Send
 from .base import Provider
 from miner.config import config
 from miner.error_handler import error_handler
+from ryno.protocol import VIDEO_URL_KEY
 
 
 class VideoModel(Provider):
@@ -16,7 +17,7 @@ class VideoModel(Provider):
         # TODO: Generate video using models
         # meta = ...
         # video_url = meta.data[0].url
-        # video_data["url"] = video_url
+        # video_data[VIDEO_URL_KEY] = video_url
         # bt.logging.info(f"returning video response of {video_url}")
         # synapse.completion = video_data
         # return synapse
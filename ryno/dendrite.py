@@ -1,3 +1,4 @@
+import asyncio
 from typing import Union, AsyncGenerator, Any
 
 import aiohttp
@@ -8,11 +9,23 @@ import traceback
 import time
 from typing import Optional, List
 
-from ryno import StreamPrompting
+from ryno.latency import LatencyTracker
+from ryno.transport import TransportManager
+
+# yielded by call_stream_in_batch as (key, STREAM_END) once the stream of key has ended.
+STREAM_END = object()
+
 
 class RynoDendrite(dendrite):
     task_id = 0
-    miner_to_session = {}
+    # one pooled transport shared by every dendrite in the process.
+    transport = TransportManager()
+    # rolling latency per miner uid: latency holds successful single-shot calls and sets the hedge threshold,
+    # stream_latency holds whole streams, which take far longer.
+    latency = LatencyTracker()
+    stream_latency = LatencyTracker()
+    max_retries = 3
+    retry_backoff = 0.5
 
     def __init__(
             self, wallet: Optional[Union[bt.wallet, bt.Keypair]] = None
@@ -43,20 +56,21 @@ class RynoDendrite(dendrite):
         url = f"http://{endpoint}/{request_name}"
 
         # Preprocess synapse for making a request
-        synapse: StreamPrompting = self.preprocess_synapse_for_request(target_axon, synapse, timeout)  # type: ignore
+        synapse: bt.StreamingSynapse = self.preprocess_synapse_for_request(target_axon, synapse, timeout)  # type: ignore
         max_try = 0
-        session = RynoDendrite.miner_to_session.get(endpoint)
+        request_timeout = RynoDendrite.transport.get_timeout(timeout)
+        RynoDendrite.transport.stats.in_flight += 1
         try:
-            while max_try < 3:
-                if not session:
-                    timeout = aiohttp.ClientTimeout(total=300, connect=timeout, sock_connect=timeout, sock_read=timeout)
-                    connector = aiohttp.TCPConnector(limit=200)
-                    session = aiohttp.ClientSession(timeout=timeout, connector=connector)
-                    RynoDendrite.miner_to_session[endpoint] = session
+            while max_try < self.max_retries:
+                if max_try:
+                    # exponential backoff so a struggling miner isn't hit again right away.
+                    await asyncio.sleep(self.retry_backoff * 2 ** (max_try - 1))
+                session = RynoDendrite.transport.get_session()
                 async with session.post(
                         url,
                         headers=synapse.to_headers(),
                         json=synapse.dict(),
+                        timeout=request_timeout,
                 ) as response:
                     # Use synapse subclass' process_streaming_response method to yield the response chunks
                     try:
@@ -81,7 +95,86 @@ class RynoDendrite(dendrite):
         except Exception as e:
             bt.logging.error(f"{e} {traceback.format_exc()}")
         finally:
+            RynoDendrite.transport.stats.in_flight -= 1
             synapse.dendrite.process_time = str(time.time() - start_time)
+            RynoDendrite.stream_latency.record(getattr(synapse, 'uid', None), time.time() - start_time)
+
+    async def call_tracked(self, uid, target_axon, synapse, timeout=12.0, deserialize=False):
+        """
+        Query one axon and record how long it took for uid. Only successful responses are recorded, plus calls
+        cancelled while still waiting (a lower bound of their latency), so fast failures can't pull the
+        percentiles down.
+        """
+        start_time = time.time()
+        RynoDendrite.transport.stats.in_flight += 1
+        try:
+            response = await self(target_axon, synapse, deserialize=deserialize, timeout=timeout)
+        except asyncio.CancelledError:
+            RynoDendrite.latency.record(uid, time.time() - start_time)
+            raise
+        finally:
+            RynoDendrite.transport.stats.in_flight -= 1
+        if getattr(response, 'is_success', False):
+            RynoDendrite.latency.record(uid, time.time() - start_time)
+        return response
+
+    async def call_hedged(self, uid, target_axon, synapse, timeout=12.0, deserialize=False,
+                          get_hedge_target=None, release_hedge_target=None, hedge_percentile=95):
+        """
+        Query uid and, once it has taken longer than its hedge_percentile latency, send a copy of the synapse
+        to the (uid, axon) returned by get_hedge_target(). The first successful response wins and the other
+        request is cancelled. release_hedge_target(hedge_uid) is called whenever the hedge didn't answer.
+        Returns (uid that answered, response).
+        """
+        primary = asyncio.create_task(self.call_tracked(uid, target_axon, synapse, timeout, deserialize))
+        task_to_uid = {primary: uid}
+        hedge_uid = None
+        answer = None
+        try:
+            hedge_after = RynoDendrite.latency.percentile(uid, hedge_percentile)
+            if hedge_after is None or get_hedge_target is None:
+                return uid, await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            hedge_target = None if done else get_hedge_target()
+            if hedge_target is None:
+                return uid, await primary
+
+            hedge_uid, hedge_axon = hedge_target
+            hedge_synapse = synapse.copy(deep=True)
+            hedge_synapse.uid = hedge_uid
+            bt.logging.debug(f"uid {uid} passed its p{hedge_percentile} latency of {hedge_after:.2f}s. "
+                             f"hedging with uid {hedge_uid}")
+            hedge = asyncio.create_task(self.call_tracked(hedge_uid, hedge_axon, hedge_synapse, timeout, deserialize))
+            task_to_uid[hedge] = hedge_uid
+            pending = set(task_to_uid)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        bt.logging.error(f"request to uid {task_to_uid[task]} failed: {task.exception()}")
+                        continue
+                    response = task.result()
+                    if answer is None or (not answer[1].is_success and response.is_success):
+                        answer = (task_to_uid[task], response)
+                if answer is not None and answer[1].is_success:
+                    break
+            if answer is None:
+                raise primary.exception()
+            if answer[0] == hedge_uid:
+                if primary.done() and not primary.cancelled() and primary.exception() is None:
+                    primary_result = f"unsuccessful response {primary.result().dendrite.status_message}"
+                else:
+                    primary_result = "request, cancelled"
+                bt.logging.debug(f"hedge uid {hedge_uid} answered for uid {uid}. dropped uid {uid}'s {primary_result}")
+            return answer
+        finally:
+            pending = [task for task in task_to_uid if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if hedge_uid is not None and (answer is None or answer[0] != hedge_uid) and release_hedge_target:
+                release_hedge_target(hedge_uid)
 
     async def call_stream_in_batch(
             self,
@@ -89,5 +182,70 @@ class RynoDendrite(dendrite):
             synapses: List[bt.StreamingSynapse] = bt.Synapse(),  # type: ignore
             timeout: float = 12.0,
             deserialize: bool = True,
+            keys: Optional[List[Any]] = None,
+            target_deadline: Optional[float] = None,
+            deadline: Optional[float] = None,
+            max_concurrency: Optional[int] = None,
     ) -> AsyncGenerator[Any, Any]:
-        pass
+        """
+        Stream from every (axon, synapse) pair concurrently and yield (key, chunk) as chunks arrive, then
+        (key, STREAM_END) once the stream of key has ended, failed or been cancelled.
+
+        key defaults to synapse.uid; pass keys to tell several synapses to the same miner apart.
+        A target still streaming after target_deadline seconds is cancelled, and everything still running
+        after the overall deadline is cancelled, as are all streams if the caller stops iterating.
+        """
+        if keys is None:
+            keys = [synapse.uid for synapse in synapses]
+        queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def stream(key, target_axon, synapse):
+            chunks = self.call_stream(target_axon, synapse, timeout=timeout, deserialize=deserialize)
+            try:
+                async for chunk in chunks:
+                    queue.put_nowait((key, chunk))
+            finally:
+                # runs call_stream's finally (process time, latency) even when the stream is cancelled.
+                await chunks.aclose()
+
+        async def run(key, target_axon, synapse):
+            try:
+                if semaphore is None:
+                    await asyncio.wait_for(stream(key, target_axon, synapse), target_deadline)
+                else:
+                    async with semaphore:
+                        await asyncio.wait_for(stream(key, target_axon, synapse), target_deadline)
+            except asyncio.TimeoutError:
+                bt.logging.debug(f"stream for {key} passed its deadline of {target_deadline}s. cancelled it.")
+            except Exception as err:
+                bt.logging.error(f"stream for {key} failed: {err}")
+            finally:
+                queue.put_nowait((key, STREAM_END))
+
+        tasks = [asyncio.create_task(run(key, target_axon, synapse))
+                 for key, target_axon, synapse in zip(keys, target_axons, synapses)]
+        end_time = None if deadline is None else time.time() + deadline
+        remaining = len(tasks)
+        try:
+            while remaining:
+                wait_time = None if end_time is None else max(0.0, end_time - time.time())
+                try:
+                    key, chunk = await asyncio.wait_for(queue.get(), wait_time)
+                except asyncio.TimeoutError:
+                    bt.logging.debug(f"batch stream passed its deadline of {deadline}s with {remaining} "
+                                     f"streams still running. cancelling them.")
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    # the cancelled streams have queued their last chunks and their STREAM_END.
+                    while not queue.empty():
+                        yield queue.get_nowait()
+                    break
+                if chunk is STREAM_END:
+                    remaining -= 1
+                yield key, chunk
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,66 @@
+from collections import deque
+
+import numpy as np
+
+
+class LatencyHistogram:
+    """The last window latencies of one miner, in seconds."""
+
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q):
+        return float(np.percentile(np.fromiter(self.samples, dtype=np.float64, count=len(self.samples)), q))
+
+
+class LatencyTracker:
+    """
+    Rolling per-uid latency histograms. percentile() is None until a uid has min_samples latencies, so a
+    handful of early requests can't make a miner look fast or slow.
+    """
+
+    def __init__(self, window=200, min_samples=10):
+        self.window = window
+        self.min_samples = min_samples
+        self.uid_to_histogram = {}
+
+    def configure(self, window=None, min_samples=None):
+        if window is not None and window != self.window:
+            self.window = window
+            self.uid_to_histogram = {uid: self.resized(histogram) for uid, histogram in self.uid_to_histogram.items()}
+        if min_samples is not None:
+            self.min_samples = min_samples
+
+    def resized(self, histogram: LatencyHistogram):
+        resized = LatencyHistogram(self.window)
+        resized.samples.extend(histogram.samples)
+        resized.count = histogram.count
+        return resized
+
+    def record(self, uid, seconds):
+        if uid is None:
+            return
+        histogram = self.uid_to_histogram.get(uid)
+        if histogram is None:
+            histogram = self.uid_to_histogram[uid] = LatencyHistogram(self.window)
+        histogram.add(seconds)
+
+    def percentile(self, uid, q):
+        histogram = self.uid_to_histogram.get(uid)
+        if histogram is None or len(histogram.samples) < self.min_samples:
+            return None
+        return histogram.percentile(q)
+
+    def get_stats(self):
+        stats = {}
+        for uid, histogram in self.uid_to_histogram.items():
+            if not histogram.samples:
+                continue
+            p50, p95 = np.percentile(np.fromiter(histogram.samples, dtype=np.float64), [50, 95]).tolist()
+            stats[uid] = {'count': histogram.count, 'p50': round(p50, 3), 'p95': round(p95, 3)}
+        return stats
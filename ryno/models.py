@@ -0,0 +1,90 @@
+import os
+import resource
+import threading
+import time
+
+import bittensor as bt
+
+# name -> (env var with a local override, default pretrained source)
+MODEL_SOURCES = {
+    'clip': ('RYNO_CLIP_MODEL_PATH', "lucataco/animate-diff"),
+    'xclip': ('RYNO_XCLIP_MODEL_PATH', "microsoft/xclip-base-patch32"),
+}
+
+
+def get_rss_bytes():
+    # current resident set size. falls back to the peak when /proc is not available.
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def load_clip(source, local_files_only):
+    from transformers import CLIPProcessor, CLIPModel
+    model = CLIPModel.from_pretrained(source, local_files_only=local_files_only)
+    processor = CLIPProcessor.from_pretrained(source, local_files_only=local_files_only)
+    return model, processor
+
+
+def load_xclip(source, local_files_only):
+    from transformers import XCLIPProcessor, XCLIPModel
+    model = XCLIPModel.from_pretrained(source, local_files_only=local_files_only)
+    processor = XCLIPProcessor.from_pretrained(source, local_files_only=local_files_only)
+    return model, processor
+
+
+class ModelRegistry:
+    """Loads each model on first use and shares that single instance with every caller in the process."""
+
+    def __init__(self):
+        self.loaders = {'clip': load_clip, 'xclip': load_xclip}
+        self.models = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, loader, env_var=None, default_source=None):
+        self.loaders[name] = loader
+        MODEL_SOURCES[name] = (env_var, default_source)
+
+    def get_source(self, name):
+        env_var, default_source = MODEL_SOURCES[name]
+        return (os.getenv(env_var) if env_var else None) or default_source
+
+    def is_loaded(self, name):
+        return name in self.models
+
+    def get(self, name, source=None):
+        """Return (model, processor) for name, loading it from source, the env override or the default."""
+        model_processor = self.models.get(name)
+        if model_processor is not None:
+            return model_processor
+
+        with self.lock:
+            if name in self.models:
+                return self.models[name]
+            source = source or self.get_source(name)
+            # a local directory never touches the network.
+            local_files_only = os.path.isdir(source) or os.getenv('HF_HUB_OFFLINE') == '1'
+            start_time = time.time()
+            rss_before = get_rss_bytes()
+            model, processor = self.loaders[name](source, local_files_only)
+            model.eval()
+            self.stats[name] = {
+                'source': source,
+                'load_time': time.time() - start_time,
+                'rss_delta': get_rss_bytes() - rss_before,
+                'param_bytes': sum(p.numel() * p.element_size() for p in model.parameters()),
+            }
+            bt.logging.info(f"loaded {name} model from {source} in {self.stats[name]['load_time']:.2f}s. "
+                            f"resident memory grew by {self.stats[name]['rss_delta'] / 2 ** 20:.1f} MiB, "
+                            f"parameters take {self.stats[name]['param_bytes'] / 2 ** 20:.1f} MiB")
+            self.models[name] = (model, processor)
+            return self.models[name]
+
+    def get_stats(self):
+        return {**self.stats, 'rss': get_rss_bytes()}
+
+
+model_registry = ModelRegistry()
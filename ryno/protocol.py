@@ -18,13 +18,17 @@ class IsAlive(bt.Synapse):
 class Bandwidth(bt.Synapse):
     bandwidth_rpm: Optional[Dict[str, dict]] = None
 
+VIDEO_URL_KEY = "url"
+
+
 class VideoResponse(bt.Synapse):
     """ A class to represent the response for an video-related request. """
 
     completion: Optional[Dict] = pydantic.Field(
         None,
         title="Completion",
-        description="The completion data of the video response."
+        description=f"The completion data of the video response. Miners put the url of the generated video "
+                    f"under '{VIDEO_URL_KEY}'; validators download and score the video from there."
     )
 
     messages: str = pydantic.Field(
@@ -123,3 +127,7 @@ class VideoResponse(bt.Synapse):
     def deserialize(self) -> Optional[Dict]:
         """ Deserialize the completion data of the video response. """
         return self.completion
+
+    def get_video_url(self) -> Optional[str]:
+        """ The url of the generated video, or None when the miner returned none. """
+        return (self.completion or {}).get(VIDEO_URL_KEY)
@@ -30,64 +30,56 @@ import traceback
 import numpy as np
 from numpy.linalg import norm
 import bittensor as bt
-from ryno import utils
 from PIL import Image
 from scipy.spatial.distance import cosine
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
-from transformers import CLIPProcessor, CLIPModel
+from ryno.models import model_registry
+from ryno.text_similarity import TextSimilarityBatcher, calculate_text_similarity, calculate_text_similarities
 
 
 # ==== TEXT ====
 
-def calculate_text_similarity(text1: str, text2: str):
-    try:
-        text1 = str(text1).lower()
-        text2 = str(text2).lower()
-        # Initialize the TF-IDF Vectorizer
-        vectorizer = TfidfVectorizer()
+text_similarity_batcher = TextSimilarityBatcher()
 
-        # Vectorize the texts
-        tfidf_matrix = vectorizer.fit_transform([text1, text2])
 
-        # Calculate the Cosine Similarity
-        similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
+def get_length_weighted_score(api_answer: str, response: str, similarity: float, weight: float) -> float:
+    words_in_response = len(response.split())
+    words_in_api = len(api_answer.split())
 
-        return similarity
-    except Exception as e:
-        bt.logging.error(f"Error in calculate_text_similarity: {traceback.format_exc()}")
-        raise
+    word_count_over_threshold = words_in_api * 1.4
+    word_count_under_threshold = words_in_api * 0.50
+
+    # Check if the word count of the response is within the thresholds
+    if words_in_response <= word_count_over_threshold and words_in_response >= word_count_under_threshold:
+        return weight * similarity
+    return 0
 
 
 async def api_score(api_answer: str, response: str, weight: float, temperature: float, provider: str) -> float:
     try:
         if api_answer is None or response is None:
             return 0
-        loop = asyncio.get_running_loop()
-        similarity = await loop.run_in_executor(None, calculate_text_similarity, api_answer, response)
-
-        words_in_response = len(response.split())
-        words_in_api = len(api_answer.split())
-
-        word_count_over_threshold = words_in_api * 1.4
-        word_count_under_threshold = words_in_api * 0.50
-
-        # Check if the word count of the response is within the thresholds
-        if words_in_response <= word_count_over_threshold and words_in_response >= word_count_under_threshold:
-            score = weight * similarity
-        else:
-            score = 0
-
-        return score
+        # concurrent calls are scored together in one vectorized pass.
+        similarity = await text_similarity_batcher.similarity(api_answer, response)
+        return get_length_weighted_score(api_answer, response, similarity, weight)
     except Exception as e:
         bt.logging.error(f"Exception in api_score: {traceback.format_exc()}")
 
 
 # ==== IMAGES =====
 
-# Load the CLIP model and processor
-model = CLIPModel.from_pretrained("lucataco/animate-diff")
-processor = CLIPProcessor.from_pretrained("lucataco/animate-diff")
+# The CLIP model and processor are loaded from the shared registry on first use, not at import time.
+def get_clip_model():
+    return model_registry.get('clip')
+
+
+def __getattr__(name):
+    # keeps `ryno.reward.model` / `ryno.reward.processor` working without loading weights at import.
+    if name == 'model':
+        return get_clip_model()[0]
+    if name == 'processor':
+        return get_clip_model()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Could also verify the date from the url
 url_regex = (
@@ -110,3 +102,97 @@ url_regex = (
 )
 
 
+
+
+# ==== VIDEOS ====
+
+def get_xclip_model():
+    return model_registry.get('xclip')
+
+
+def get_xclip_num_frames() -> int:
+    model, _ = get_xclip_model()
+    return model.config.vision_config.num_frames
+
+
+def sample_frame_indices(total_frames: int, num_frames: int) -> list[int]:
+    # evenly spaced frames. short videos repeat frames so every video yields num_frames.
+    if total_frames <= 0:
+        return []
+    return np.linspace(0, total_frames - 1, num_frames).round().astype(int).tolist()
+
+
+def decode_sampled_frames(video, num_frames: int) -> list[np.ndarray]:
+    """Decode only the num_frames evenly spaced RGB frames the scorer needs from a video file or bytes."""
+    import av
+
+    source = io.BytesIO(video) if isinstance(video, (bytes, bytearray)) else video
+    with av.open(source, mode='r') as container:
+        stream = container.streams.video[0]
+        stream.thread_type = 'AUTO'
+        total_frames = stream.frames
+        if not total_frames and stream.duration and stream.average_rate:
+            total_frames = int(stream.duration * stream.time_base * stream.average_rate)
+
+        if not total_frames:
+            # frame count unknown (typically a non-seekable stream): keep every stride-th frame and double the
+            # stride whenever 2 * num_frames are held, so memory stays bounded however long the video is.
+            kept, stride = [], 1
+            for index, frame in enumerate(container.decode(stream)):
+                if index % stride:
+                    continue
+                kept.append(frame.to_ndarray(format='rgb24'))
+                if len(kept) >= 2 * num_frames:
+                    kept, stride = kept[::2], stride * 2
+            return [kept[index] for index in sample_frame_indices(len(kept), num_frames)]
+
+        wanted = sample_frame_indices(total_frames, num_frames)
+        frames = []
+        for index, frame in enumerate(container.decode(stream)):
+            if index in wanted:
+                frames.extend([frame.to_ndarray(format='rgb24')] * wanted.count(index))
+            if index >= wanted[-1]:
+                break
+
+    # the container may hold fewer frames than its header says.
+    while frames and len(frames) < num_frames:
+        frames.append(frames[-1])
+    return frames
+
+
+@torch.no_grad()
+def compute_text_embeddings(prompts: list[str]) -> torch.Tensor:
+    model, processor = get_xclip_model()
+    inputs = processor(text=prompts, return_tensors='pt', padding=True, truncation=True)
+    return model.get_text_features(input_ids=inputs['input_ids'], attention_mask=inputs['attention_mask'])
+
+
+@torch.no_grad()
+def compute_video_embeddings(videos: list[list[np.ndarray]]) -> torch.Tensor:
+    """Run all videos through the X-CLIP vision tower in one forward pass."""
+    model, processor = get_xclip_model()
+    pixel_values = processor(videos=videos, return_tensors='pt')['pixel_values']
+    return model.get_video_features(pixel_values=pixel_values)
+
+
+@torch.no_grad()
+def compute_embedding_similarities(video_embeds: torch.Tensor, prompts: list[str],
+                                   text_embedding_cache=None) -> list[float]:
+    """Cosine similarity of each video embedding with its prompt. text_embedding_cache maps prompt to embedding."""
+    text_embedding_cache = {} if text_embedding_cache is None else text_embedding_cache
+    prompt_to_embed = {prompt: text_embedding_cache.get(prompt) for prompt in prompts}
+    missing_prompts = [prompt for prompt, text_embed in prompt_to_embed.items() if text_embed is None]
+    if missing_prompts:
+        for prompt, text_embed in zip(missing_prompts, compute_text_embeddings(missing_prompts)):
+            prompt_to_embed[prompt] = text_embed
+            text_embedding_cache[prompt] = text_embed
+    text_embeds = torch.stack([prompt_to_embed[prompt] for prompt in prompts])
+
+    similarities = torch.nn.functional.cosine_similarity(video_embeds, text_embeds, dim=-1)
+    return similarities.clamp(min=0).tolist()
+
+
+def compute_video_text_similarities(videos: list[list[np.ndarray]], prompts: list[str],
+                                    text_embedding_cache=None) -> list[float]:
+    """Score how well each video matches its prompt with X-CLIP, batching all videos in one forward pass."""
+    return compute_embedding_similarities(compute_video_embeddings(videos), prompts, text_embedding_cache)
@@ -0,0 +1,95 @@
+import time
+
+import bittensor as bt
+
+
+class StreamLatencyStats:
+    """Time to first chunk and inter-chunk latency per uid, fed by finished StreamAccumulators."""
+
+    def __init__(self):
+        self.uid_to_stats = {}
+
+    def record(self, uid, accumulator: 'StreamAccumulator'):
+        stats = self.uid_to_stats.setdefault(uid, {
+            'streams': 0, 'empty_streams': 0, 'ttfb_sum': 0.0, 'last_ttfb': None,
+            'gap_sum': 0.0, 'gap_count': 0, 'max_gap': 0.0,
+        })
+        stats['streams'] += 1
+        if accumulator.ttfb is None:
+            stats['empty_streams'] += 1
+            return
+        stats['ttfb_sum'] += accumulator.ttfb
+        stats['last_ttfb'] = accumulator.ttfb
+        stats['gap_sum'] += accumulator.gap_sum
+        stats['gap_count'] += accumulator.gap_count
+        stats['max_gap'] = max(stats['max_gap'], accumulator.max_gap)
+
+    def get_stats(self, uid=None):
+        uids = self.uid_to_stats.keys() if uid is None else [uid] if uid in self.uid_to_stats else []
+        result = {}
+        for uid in uids:
+            stats = self.uid_to_stats[uid]
+            answered = stats['streams'] - stats['empty_streams']
+            result[uid] = {
+                'streams': stats['streams'],
+                'empty_streams': stats['empty_streams'],
+                'avg_ttfb': round(stats['ttfb_sum'] / answered, 4) if answered else None,
+                'avg_chunk_gap': round(stats['gap_sum'] / stats['gap_count'], 4) if stats['gap_count'] else None,
+                'max_chunk_gap': round(stats['max_gap'], 4),
+            }
+        return result
+
+
+class StreamAccumulator:
+    """
+    Collects the text chunks of one streamed response and joins them once at the end, instead of growing a
+    string per chunk. It also times the first chunk and the gaps between chunks; finish() returns the text
+    and records those timings for the uid in the shared StreamAccumulator.stats.
+    """
+    # one latency table shared by every streaming consumer in the process.
+    stats = StreamLatencyStats()
+
+    def __init__(self, uid=None, start_time=None):
+        self.uid = uid
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.chunks = []
+        self.size = 0
+        self.last_chunk = None
+        self.ttfb = None
+        self.last_chunk_time = None
+        self.gap_sum = 0.0
+        self.gap_count = 0
+        self.max_gap = 0.0
+
+    def add(self, chunk):
+        """Append a text chunk. Anything else (e.g. the final synapse) is kept as last_chunk and not timed."""
+        if not isinstance(chunk, str):
+            self.last_chunk = chunk
+            return
+        now = time.perf_counter()
+        if self.last_chunk_time is None:
+            self.ttfb = now - self.start_time
+        else:
+            gap = now - self.last_chunk_time
+            self.gap_sum += gap
+            self.gap_count += 1
+            self.max_gap = max(self.max_gap, gap)
+        self.last_chunk_time = now
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+
+    async def consume(self, stream):
+        """Drain an async stream of chunks and return the joined text."""
+        async for chunk in stream:
+            self.add(chunk)
+        return self.finish()
+
+    def text(self):
+        return ''.join(self.chunks)
+
+    def finish(self):
+        text = self.text()
+        self.stats.record(self.uid, self)
+        bt.logging.trace(f"stream from {self.uid} finished: {len(self.chunks)} chunks, {self.size} chars, "
+                         f"first chunk after {self.ttfb}s")
+        return text
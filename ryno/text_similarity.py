@@ -0,0 +1,118 @@
+import asyncio
+import concurrent.futures
+import traceback
+
+import bittensor as bt
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+
+def calculate_text_similarity(text1: str, text2: str):
+    try:
+        text1 = str(text1).lower()
+        text2 = str(text2).lower()
+        # Initialize the TF-IDF Vectorizer
+        vectorizer = TfidfVectorizer()
+
+        # Vectorize the texts
+        tfidf_matrix = vectorizer.fit_transform([text1, text2])
+
+        # Calculate the Cosine Similarity
+        similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
+
+        return similarity
+    except Exception as e:
+        bt.logging.error(f"Error in calculate_text_similarity: {traceback.format_exc()}")
+        raise
+
+
+# smooth idf of a term over a single (reference, response) pair: ln((1 + 2) / (1 + df)) + 1.
+IDF_IN_BOTH = 1.0
+IDF_IN_ONE = 1.0 + np.log(1.5)
+
+
+def calculate_text_similarities(pairs: list[tuple[str, str]]) -> np.ndarray:
+    """
+    Batched calculate_text_similarity: the same per-pair TF-IDF cosine similarity for N (reference, response)
+    pairs, computed with one shared vocabulary and sparse row-wise operations. A pair without a single token
+    scores 0, where calculate_text_similarity raises.
+    """
+    if not pairs:
+        return np.zeros(0)
+    references = [str(reference) for reference, _ in pairs]
+    responses = [str(response) for _, response in pairs]
+    try:
+        counts = CountVectorizer(lowercase=True).fit_transform(references + responses).tocsr().astype(np.float64)
+    except ValueError:
+        # none of the texts contain a single token.
+        return np.zeros(len(pairs))
+    reference_counts, response_counts = counts[:len(pairs)], counts[len(pairs):]
+
+    # idf only depends on whether a term occurs in one or both texts of the pair.
+    shared = reference_counts.multiply(response_counts > 0)
+    reference_tfidf = reference_counts * IDF_IN_ONE - shared * (IDF_IN_ONE - IDF_IN_BOTH)
+    response_tfidf = response_counts * IDF_IN_ONE - response_counts.multiply(reference_counts > 0) * (
+            IDF_IN_ONE - IDF_IN_BOTH)
+
+    dot = np.asarray(reference_tfidf.multiply(response_tfidf).sum(axis=1)).ravel()
+    norms = (np.sqrt(np.asarray(reference_tfidf.multiply(reference_tfidf).sum(axis=1)).ravel())
+             * np.sqrt(np.asarray(response_tfidf.multiply(response_tfidf).sum(axis=1)).ravel()))
+    similarities = np.zeros(len(pairs))
+    np.divide(dot, norms, out=similarities, where=norms > 0)
+    return similarities
+
+
+class TextSimilarityBatcher:
+    """
+    Collects concurrent similarity() calls for batch_window seconds (or until max_batch_size) and scores them
+    with one calculate_text_similarities pass on a dedicated thread. Vectorizing a hundred pairs together
+    costs about as much as three pairs one by one.
+    """
+
+    def __init__(self, max_batch_size=256, batch_window=0.01):
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='text-scoring')
+        self.pending = []
+        self.flush_handle = None
+        self.pairs_scored = 0
+        self.batches_scored = 0
+
+    async def similarity(self, reference, response) -> float:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((reference, response, future))
+        if len(self.pending) >= self.max_batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.batch_window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self.score_batch(batch))
+
+    async def score_batch(self, batch):
+        try:
+            pairs = [(reference, response) for reference, response, _ in batch]
+            similarities = await asyncio.get_running_loop().run_in_executor(
+                self.executor, calculate_text_similarities, pairs)
+        except Exception as err:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        for (_, _, future), similarity in zip(batch, similarities):
+            # the caller may have been cancelled while the batch was scored.
+            if not future.done():
+                future.set_result(float(similarity))
+        self.pairs_scored += len(batch)
+        self.batches_scored += 1
+
+    def get_stats(self):
+        return {'pairs_scored': self.pairs_scored, 'batches_scored': self.batches_scored}
@@ -0,0 +1,129 @@
+import asyncio
+import weakref
+
+import aiohttp
+import bittensor as bt
+
+
+class TransportStats:
+    """
+    Counters fed by aiohttp trace hooks. in_flight is kept by the dendrite around whole calls instead, since
+    aiohttp reports a request as ended once its headers arrive, long before its stream does. Every socket a
+    response arrived on is remembered weakly, so open_sockets() counts those the pool hasn't closed yet.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.failed = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.transports = weakref.WeakSet()
+
+    def open_sockets(self):
+        return sum(1 for transport in list(self.transports) if not transport.is_closing())
+
+    def get_trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.requests += 1
+
+        async def on_request_end(session, context, params):
+            connection = params.response.connection
+            if connection is not None and connection.transport is not None:
+                self.transports.add(connection.transport)
+
+        async def on_request_exception(session, context, params):
+            self.failed += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.dns_cache_misses += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+
+class TransportManager:
+    """
+    One pooled HTTP transport for every miner the dendrite streams from.
+
+    A single ClientSession and TCPConnector replace the session per miner endpoint: max_connections caps
+    sockets across all miners, max_connections_per_host caps them per miner, keep-alive sockets idle for
+    idle_timeout seconds are closed, and resolved hosts are cached for dns_ttl seconds. Timeouts are set
+    per request instead of once per session.
+    """
+
+    def __init__(self, max_connections=1000, max_connections_per_host=50, idle_timeout=60, dns_ttl=300):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.idle_timeout = idle_timeout
+        self.dns_ttl = dns_ttl
+        self.stats = TransportStats()
+        self.session: aiohttp.ClientSession = None
+        self.session_loop = None
+
+    def configure(self, max_connections=None, max_connections_per_host=None, idle_timeout=None, dns_ttl=None):
+        """Change the pool limits. They apply to the next session, so call this before the first request."""
+        if max_connections is not None:
+            self.max_connections = max_connections
+        if max_connections_per_host is not None:
+            self.max_connections_per_host = max_connections_per_host
+        if idle_timeout is not None:
+            self.idle_timeout = idle_timeout
+        if dns_ttl is not None:
+            self.dns_ttl = dns_ttl
+
+    def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self.session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_connections_per_host,
+                                             keepalive_timeout=self.idle_timeout, use_dns_cache=True,
+                                             ttl_dns_cache=self.dns_ttl, enable_cleanup_closed=True)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 trace_configs=[self.stats.get_trace_config()])
+            self.session_loop = loop
+            bt.logging.debug(f"opened pooled dendrite transport: {self.max_connections} connections, "
+                             f"{self.max_connections_per_host} per host, idle timeout {self.idle_timeout}s")
+        return self.session
+
+    @staticmethod
+    def get_timeout(timeout, total=300) -> aiohttp.ClientTimeout:
+        # socket connect and read deadlines come from the caller's timeout; total bounds a whole stream.
+        # connect stays unset: it also covers waiting for a free pooled connection, which isn't a miner failing.
+        return aiohttp.ClientTimeout(total=total, connect=None, sock_connect=timeout, sock_read=timeout)
+
+    def get_stats(self):
+        stats = self.stats
+        connections = stats.connections_created + stats.connections_reused
+        return {
+            'requests': stats.requests,
+            'in_flight': stats.in_flight,
+            'open_sockets': stats.open_sockets(),
+            'failed': stats.failed,
+            'connections_created': stats.connections_created,
+            'reuse_ratio': stats.connections_reused / connections if connections else 0.0,
+            'dns_cache_hit_ratio': (stats.dns_cache_hits / (stats.dns_cache_hits + stats.dns_cache_misses)
+                                    if stats.dns_cache_hits + stats.dns_cache_misses else 0.0),
+        }
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
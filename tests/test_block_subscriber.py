@@ -0,0 +1,120 @@
+import asyncio
+import threading
+
+from validators.services import block_subscriber
+from validators.services.block_subscriber import LocalBlockSubscriber, SubstrateBlockSubscriber
+
+
+def test_wait_for_block_returns_once_reached():
+    async def run():
+        subscriber = LocalBlockSubscriber(asyncio.get_running_loop(), start_block=10)
+        assert await subscriber.wait_for_block(5) == 10
+
+        waiter = asyncio.ensure_future(subscriber.wait_for_block(12))
+        subscriber.advance()
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        subscriber.advance(3)
+        assert await waiter == 14
+
+    asyncio.run(run())
+
+
+def test_older_blocks_are_ignored():
+    async def run():
+        subscriber = LocalBlockSubscriber(asyncio.get_running_loop(), start_block=10)
+        subscriber.publish(8)
+        assert subscriber.current_block == 10
+        waiter = asyncio.ensure_future(subscriber.wait_for_next_block())
+        await asyncio.sleep(0)
+        subscriber.advance()
+        assert await waiter == 11
+
+    asyncio.run(run())
+
+
+def test_waiters_wake_in_block_order():
+    async def run():
+        subscriber = LocalBlockSubscriber(asyncio.get_running_loop(), start_block=0)
+        woken = []
+
+        async def wait(block_num):
+            woken.append((block_num, await subscriber.wait_for_block(block_num)))
+
+        waiters = [asyncio.ensure_future(wait(block_num)) for block_num in [3, 1, 2]]
+        await asyncio.sleep(0)
+        subscriber.advance(2)
+        await asyncio.sleep(0)
+        assert sorted(woken) == [(1, 2), (2, 2)]
+        subscriber.advance()
+        await asyncio.gather(*waiters)
+        assert sorted(woken) == [(1, 2), (2, 2), (3, 3)]
+
+    asyncio.run(run())
+
+
+def test_timer_produces_blocks():
+    async def run():
+        subscriber = LocalBlockSubscriber(asyncio.get_running_loop(), start_block=0, block_time=0.01)
+        subscriber.start()
+        try:
+            assert await asyncio.wait_for(subscriber.wait_for_block(3), 1) >= 3
+        finally:
+            subscriber.stop()
+
+    asyncio.run(run())
+
+
+class FakeSubstrate:
+    """Sends the headers of its blocks, then blocks like a live subscription until close() is called."""
+    instances = []
+    blocks_per_connection = [[1, 2, 3]]
+
+    def __init__(self, url):
+        self.closed = threading.Event()
+        self.index = len(FakeSubstrate.instances)
+        FakeSubstrate.instances.append(self)
+
+    def subscribe_block_headers(self, handler):
+        blocks = FakeSubstrate.blocks_per_connection[min(self.index, len(FakeSubstrate.blocks_per_connection) - 1)]
+        if blocks is None:
+            raise ConnectionError("handshake failed")
+        for update_nr, block_num in enumerate(blocks):
+            if handler({'header': {'number': block_num}}, update_nr, 'subscription') is not None:
+                return
+        self.closed.wait()
+        raise ConnectionError("websocket closed")
+
+    def close(self):
+        self.closed.set()
+
+
+def run_substrate_subscriber(monkeypatch, blocks_per_connection, wait_for):
+    monkeypatch.setattr(FakeSubstrate, 'instances', [])
+    monkeypatch.setattr(FakeSubstrate, 'blocks_per_connection', blocks_per_connection)
+    monkeypatch.setattr(block_subscriber, 'SubstrateInterface', FakeSubstrate)
+
+    async def run():
+        subscriber = SubstrateBlockSubscriber('ws://fake', asyncio.get_running_loop(), reconnect_delay=0.01)
+        subscriber.start()
+        try:
+            return await asyncio.wait_for(subscriber.wait_for_block(wait_for), 2)
+        finally:
+            subscriber.stop()
+            await asyncio.to_thread(subscriber._thread.join, 2)
+            assert not subscriber._thread.is_alive()
+
+    return asyncio.run(run())
+
+
+def test_substrate_subscriber_publishes_headers_and_stops_while_blocked(monkeypatch):
+    assert run_substrate_subscriber(monkeypatch, [[1, 2, 3]], wait_for=3) == 3
+    # stop() closed the connection the subscription was blocked on.
+    assert len(FakeSubstrate.instances) == 1
+    assert FakeSubstrate.instances[0].closed.is_set()
+
+
+def test_substrate_subscriber_reconnects_and_closes_failed_connections(monkeypatch):
+    assert run_substrate_subscriber(monkeypatch, [None, None, [5]], wait_for=5) == 5
+    assert len(FakeSubstrate.instances) == 3
+    assert all(substrate.closed.is_set() for substrate in FakeSubstrate.instances)
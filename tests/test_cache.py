@@ -0,0 +1,193 @@
+import json
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from validators.services import cache as cache_module
+from validators.services.cache import AUTO_VACUUM_INCREMENTAL, CacheWriter, QueryResponseCache
+
+
+class FakeSynapse(SimpleNamespace):
+    """Just the synapse fields set_cache_in_batch reads and writes."""
+
+    def __init__(self, uid, prompt):
+        super().__init__(uid=uid, prompt=prompt, completion=f"answer to {prompt}", provider='OpenAI', model='sora',
+                         dendrite=SimpleNamespace(process_time=0.5), axon=SimpleNamespace(hotkey=f'hotkey-{uid}'))
+
+    def json(self, exclude=()):
+        return json.dumps({key: value for key, value in vars(self).items() if key not in exclude}, default=vars)
+
+
+def get_auto_vacuum(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_fresh_database_uses_incremental_auto_vacuum(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    cache = QueryResponseCache(db_path=db_path)
+    cache.close()
+    assert get_auto_vacuum(db_path) == AUTO_VACUUM_INCREMENTAL
+
+
+def test_existing_database_is_converted_only_on_request(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE cache (p_key TEXT PRIMARY KEY, question TEXT, answer TEXT, provider TEXT, "
+                 "model TEXT, timestamp REAL)")
+    conn.commit()
+    conn.close()
+
+    cache = QueryResponseCache(db_path=db_path)
+    assert not cache.has_incremental_auto_vacuum()
+    cache.enable_incremental_auto_vacuum()
+    assert cache.has_incremental_auto_vacuum()
+    cache.close()
+    assert get_auto_vacuum(db_path) == AUTO_VACUUM_INCREMENTAL
+
+
+def read_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT question, epoch_num FROM cache ORDER BY rowid").fetchall()
+    finally:
+        conn.close()
+
+
+def test_writer_flushes_in_batches_of_flush_size(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    writer = CacheWriter(db_path=db_path, flush_size=3, flush_interval=60, retention_interval=0)
+    writer.submit([FakeSynapse(uid, f'prompt {uid}') for uid in range(4)], epoch_num=1)
+    writer.submit([FakeSynapse(uid, f'prompt {uid}') for uid in range(4, 7)], epoch_num=2)
+    writer.start()
+    writer.stop()
+
+    stats = writer.get_stats()
+    assert stats['enqueued'] == stats['written'] == 7
+    assert stats['flushes'] == 3 and stats['queue_depth'] == 0 and stats['max_queue_depth'] == 7
+    rows = read_rows(db_path)
+    assert [json.loads(question)['prompt'] for question, _ in rows] == [f'prompt {uid}' for uid in range(7)]
+    assert [epoch_num for _, epoch_num in rows] == [1] * 4 + [2] * 3
+
+
+def test_writer_flushes_after_flush_interval(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    writer = CacheWriter(db_path=db_path, flush_size=100, flush_interval=0.05, retention_interval=0)
+    writer.start()
+    try:
+        writer.submit([FakeSynapse(1, 'prompt')])
+        deadline = time.monotonic() + 5
+        while writer.written == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.written == 1 and writer.thread.is_alive()
+    finally:
+        writer.stop()
+    assert len(read_rows(db_path)) == 1
+
+
+def test_stop_flushes_the_partial_batch(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    writer = CacheWriter(db_path=db_path, flush_size=100, flush_interval=60, retention_interval=0)
+    writer.start()
+    writer.submit([FakeSynapse(uid, f'prompt {uid}') for uid in range(2)])
+    start_time = time.monotonic()
+    writer.stop()
+    assert time.monotonic() - start_time < 5
+    assert writer.written == 2 and writer.thread is None
+    assert len(read_rows(db_path)) == 2
+
+
+def test_submit_after_stop_drops_and_counts(tmp_path):
+    writer = CacheWriter(db_path=str(tmp_path / 'cache.db'), retention_interval=0)
+    writer.start()
+    writer.stop()
+    assert writer.submit([FakeSynapse(uid, 'late') for uid in range(3)]) == 3
+    stats = writer.get_stats()
+    assert stats['dropped'] == 3 and stats['enqueued'] == 0 and stats['queue_depth'] == 0
+
+
+def test_connections_are_per_thread_and_closed_together(tmp_path):
+    cache = QueryResponseCache(db_path=str(tmp_path / 'cache.db'))
+    main_conn = cache.conn
+    assert cache.conn is main_conn
+
+    thread_conns = []
+    thread = threading.Thread(target=lambda: thread_conns.append(cache.conn))
+    thread.start()
+    thread.join()
+    assert thread_conns[0] is not main_conn
+    assert cache.connections == [main_conn, thread_conns[0]]
+
+    cache.close()
+    assert cache.connections == []
+    for conn in [main_conn, thread_conns[0]]:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    # the next use opens a fresh connection.
+    assert cache.conn is not main_conn
+    cache.close()
+
+
+def insert_rows(cache, rows):
+    cache.conn.executemany("INSERT INTO cache (p_key, question, answer, provider, model) VALUES (?, ?, ?, ?, ?)",
+                           [(f'key-{index}', *row) for index, row in enumerate(rows)])
+    cache.conn.commit()
+
+
+def test_random_question_is_sampled_by_rowid_within_provider_and_model(tmp_path, monkeypatch):
+    cache = QueryResponseCache(db_path=str(tmp_path / 'cache.db'))
+    assert cache.get_random_question_to_answer('OpenAI', 'sora') is None
+    # rowids 1..6; rows 2 and 4 belong to another model and row 5 is deleted, leaving gaps.
+    insert_rows(cache, [(f'q{rowid}', f'a{rowid}', 'OpenAI', 'other' if rowid in (2, 4) else 'sora')
+                        for rowid in range(1, 7)])
+    cache.conn.execute("DELETE FROM cache WHERE question = 'q5'")
+    cache.conn.commit()
+
+    bounds = []
+
+    def pick(first, last, rowid):
+        bounds.append((first, last))
+        return rowid
+
+    picked = {}
+    for rowid in range(1, 7):
+        monkeypatch.setattr(cache_module.random, 'randint', lambda first, last: pick(first, last, rowid))
+        picked[rowid] = cache.get_random_question_to_answer('OpenAI', 'sora')
+    # a rowid in a gap maps to the next row of the same provider and model.
+    assert picked == {1: ('q1', 'a1'), 2: ('q3', 'a3'), 3: ('q3', 'a3'), 4: ('q6', 'a6'), 5: ('q6', 'a6'),
+                      6: ('q6', 'a6')}
+    assert set(bounds) == {(1, 6)}
+    assert cache.get_random_question_to_answer('Google', 'sora') is None
+    cache.close()
+
+
+def test_prune_deletes_expired_and_old_epoch_rows_in_batches(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    cache = QueryResponseCache(db_path=db_path)
+    now = time.time()
+    expired = [FakeSynapse(uid, f'expired {uid}') for uid in range(5)]
+    cache.set_cache_in_batch(expired, ttl=-60, epoch_num=3)
+    cache.set_cache_in_batch([FakeSynapse(uid, f'old epoch {uid}') for uid in range(3)], ttl=3600, epoch_num=1)
+    cache.set_cache_in_batch([FakeSynapse(uid, f'fresh {uid}') for uid in range(4)], ttl=3600, epoch_num=3)
+    expires_at = [row[0] for row in cache.conn.execute("SELECT expires_at FROM cache ORDER BY rowid")]
+    assert all(value < now for value in expires_at[:5]) and all(value > now for value in expires_at[5:])
+
+    # without a minimum epoch only the ttl applies.
+    stats = cache.prune(batch_size=2)
+    assert stats['pruned'] == 5
+    assert [json.loads(question)['prompt'] for question, _ in read_rows(db_path)] == \
+           [f'old epoch {uid}' for uid in range(3)] + [f'fresh {uid}' for uid in range(4)]
+
+    stats = cache.prune(min_epoch_num=2, batch_size=2)
+    assert stats['pruned'] == 3
+    assert [json.loads(question)['prompt'] for question, _ in read_rows(db_path)] == \
+           [f'fresh {uid}' for uid in range(4)]
+    assert cache.prune()['pruned'] == 0
+    assert stats['db_size'] > 0 and stats['free_size'] >= 0
+    cache.close()
@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+
+from validators.services import chain_state
+from validators.services.chain_state import ChainStateCache
+
+
+class FakeSubstrate:
+    """Answers query_multi from the shared (module, method, params) -> value state and logs every call."""
+    nodes = []
+    state = {}
+
+    def __init__(self, url):
+        self.url = url
+        self.queries = []
+        self.fail = False
+        self.closed = False
+        FakeSubstrate.nodes.append(self)
+
+    def create_storage_key(self, module, method, params):
+        return (module, method, tuple(params))
+
+    def query_multi(self, storage_keys, block_hash=None):
+        if self.fail:
+            raise ConnectionError("connection reset")
+        self.queries.append(list(storage_keys))
+        return [(storage_key, SimpleNamespace(value=self.state[storage_key])) for storage_key in storage_keys]
+
+    def close(self):
+        self.closed = True
+
+
+def make_cache(monkeypatch, **kwargs):
+    monkeypatch.setattr(FakeSubstrate, 'nodes', [])
+    monkeypatch.setattr(FakeSubstrate, 'state', {('System', 'Number', ()): 100,
+                                                 ('SubtensorModule', 'Tempo', (1,)): 360,
+                                                 ('SubtensorModule', 'LastUpdate', (1,)): [90, 95]})
+    monkeypatch.setattr(chain_state, 'SubstrateInterface', FakeSubstrate)
+    return ChainStateCache('ws://fake', **kwargs)
+
+
+def test_reads_within_ttl_hit(monkeypatch):
+    cache = make_cache(monkeypatch, ttl=60)
+    tempo_key = cache.watch('SubtensorModule', 'Tempo', [1])
+    last_update_key = cache.watch('SubtensorModule', 'LastUpdate', [1])
+
+    async def read_three_times():
+        return [await cache.read() for _ in range(3)]
+
+    values = asyncio.run(read_three_times())
+    assert values[0] == values[2] == {tempo_key: 360, last_update_key: [90, 95]}
+    assert cache.node.queries == [[tempo_key, last_update_key]]
+    assert cache.get_stats() == {'hits': 2, 'misses': 1, 'rpc_calls': 1, 'hit_rate': 2 / 3}
+
+
+def test_only_stale_items_are_fetched(monkeypatch):
+    cache = make_cache(monkeypatch, ttl=60)
+    number_key = cache.watch('System', 'Number', ttl=0)
+    tempo_key = cache.watch('SubtensorModule', 'Tempo', [1])
+    last_update_key = cache.watch('SubtensorModule', 'LastUpdate', [1])
+
+    async def read_twice():
+        await cache.read()
+        cache.node.state[number_key] = 101
+        cache.node.state[last_update_key] = [101, 95]
+        first = await cache.read()
+        cache.invalidate(last_update_key)
+        return first, await cache.read()
+
+    first, second = asyncio.run(read_twice())
+    assert first == {number_key: 101, tempo_key: 360, last_update_key: [90, 95]}
+    assert second[last_update_key] == [101, 95]
+    assert cache.node.queries == [[number_key, tempo_key, last_update_key], [number_key],
+                                  [number_key, last_update_key]]
+    assert cache.rpc_calls == 3
+
+
+def test_concurrent_readers_share_one_query(monkeypatch):
+    cache = make_cache(monkeypatch)
+    tempo_key = cache.watch('SubtensorModule', 'Tempo', [1])
+
+    async def read_concurrently():
+        return await asyncio.gather(*[cache.read() for _ in range(5)])
+
+    assert asyncio.run(read_concurrently()) == [{tempo_key: 360}] * 5
+    assert len(cache.node.queries) == 1
+    assert cache.get_stats()['misses'] == 1 and cache.get_stats()['hits'] == 4
+
+
+def test_failed_query_reconnects_and_closes_the_old_node(monkeypatch):
+    cache = make_cache(monkeypatch)
+    tempo_key = cache.watch('SubtensorModule', 'Tempo', [1])
+    broken = cache.node
+    broken.fail = True
+    assert cache.read_sync() == {tempo_key: 360}
+    assert broken.closed
+    assert cache.node is FakeSubstrate.nodes[-1] and cache.node is not broken
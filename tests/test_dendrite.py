@@ -0,0 +1,221 @@
+import asyncio
+
+from ryno.dendrite import STREAM_END, RynoDendrite
+from ryno.latency import LatencyTracker
+
+
+class FakeTerminalInfo:
+    status_message = "timed out"
+
+
+class FakeSynapse:
+    def __init__(self, uid, is_success=True):
+        self.uid = uid
+        self.is_success = is_success
+        self.dendrite = FakeTerminalInfo()
+
+    def copy(self, deep=False):
+        return FakeSynapse(self.uid, self.is_success)
+
+
+class FakeDendrite(RynoDendrite):
+    """Answers each uid after a fixed delay, without a wallet or network."""
+
+    def __init__(self, uid_to_delay, failing_uids=()):
+        self.uid_to_delay = uid_to_delay
+        self.failing_uids = set(failing_uids)
+        self.cancelled_uids = []
+        # read by bittensor's dendrite.__del__.
+        self._session = None
+
+    async def __call__(self, target_axon, synapse, deserialize=False, timeout=12.0):
+        try:
+            await asyncio.sleep(self.uid_to_delay[synapse.uid])
+        except asyncio.CancelledError:
+            self.cancelled_uids.append(synapse.uid)
+            raise
+        return FakeSynapse(synapse.uid, is_success=synapse.uid not in self.failing_uids)
+
+
+def make_tracker(monkeypatch, uid_to_latency):
+    tracker = LatencyTracker(min_samples=3)
+    for uid, seconds in uid_to_latency.items():
+        for _ in range(3):
+            tracker.record(uid, seconds)
+    monkeypatch.setattr(RynoDendrite, 'latency', tracker)
+    return tracker
+
+
+def call_hedged(dendrite, released, hedge_uid=2):
+    return dendrite.call_hedged(1, None, FakeSynapse(1), get_hedge_target=lambda: (hedge_uid, None),
+                                release_hedge_target=released.append)
+
+
+def test_no_hedge_without_enough_samples(monkeypatch):
+    monkeypatch.setattr(RynoDendrite, 'latency', LatencyTracker(min_samples=3))
+    dendrite = FakeDendrite({1: 0.05, 2: 0.0})
+    released = []
+    uid, response = asyncio.run(call_hedged(dendrite, released))
+    assert uid == 1 and response.uid == 1
+    assert released == []
+
+
+def test_fast_primary_is_not_hedged(monkeypatch):
+    make_tracker(monkeypatch, {1: 0.5})
+    dendrite = FakeDendrite({1: 0.01, 2: 0.0})
+    released = []
+    uid, _ = asyncio.run(call_hedged(dendrite, released))
+    assert uid == 1
+    assert released == []
+
+
+def test_hedge_wins_and_primary_is_cancelled(monkeypatch):
+    tracker = make_tracker(monkeypatch, {1: 0.01})
+    dendrite = FakeDendrite({1: 1.0, 2: 0.01})
+    released = []
+    uid, response = asyncio.run(call_hedged(dendrite, released))
+    assert uid == 2 and response.uid == 2
+    assert dendrite.cancelled_uids == [1]
+    # the hedge answered, so its bandwidth is kept.
+    assert released == []
+    # the cancelled primary records a lower bound of its latency.
+    assert tracker.uid_to_histogram[1].count == 4
+
+
+def test_primary_wins_and_hedge_is_released(monkeypatch):
+    make_tracker(monkeypatch, {1: 0.01})
+    dendrite = FakeDendrite({1: 0.05, 2: 1.0})
+    released = []
+    uid, _ = asyncio.run(call_hedged(dendrite, released))
+    assert uid == 1
+    assert dendrite.cancelled_uids == [2]
+    assert released == [2]
+
+
+def test_unsuccessful_answer_waits_for_the_other(monkeypatch):
+    tracker = make_tracker(monkeypatch, {1: 0.01})
+    dendrite = FakeDendrite({1: 0.1, 2: 0.02}, failing_uids=[2])
+    released = []
+    uid, response = asyncio.run(call_hedged(dendrite, released))
+    assert uid == 1 and response.is_success
+    assert released == [2]
+    # failed calls are not recorded.
+    assert 2 not in tracker.uid_to_histogram
+
+
+def test_cancelled_caller_cancels_both_requests(monkeypatch):
+    make_tracker(monkeypatch, {1: 0.01})
+    dendrite = FakeDendrite({1: 1.0, 2: 1.0})
+    released = []
+
+    async def cancel_caller():
+        task = asyncio.create_task(call_hedged(dendrite, released))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_caller())
+    assert sorted(dendrite.cancelled_uids) == [1, 2]
+    assert released == [2]
+
+
+def test_cancelled_caller_cancels_primary_before_hedging(monkeypatch):
+    make_tracker(monkeypatch, {1: 0.5})
+    dendrite = FakeDendrite({1: 1.0, 2: 0.0})
+    released = []
+
+    async def cancel_caller():
+        task = asyncio.create_task(call_hedged(dendrite, released))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_caller())
+    assert dendrite.cancelled_uids == [1]
+    assert released == []
+
+
+class FakeStreamDendrite(RynoDendrite):
+    """Streams num_chunks chunks per uid, one every delay seconds, and records which streams were closed."""
+
+    def __init__(self, uid_to_delay, num_chunks=3):
+        self._session = None
+        self.uid_to_delay = uid_to_delay
+        self.num_chunks = num_chunks
+        self.closed_uids = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def call_stream(self, target_axon, synapse, timeout=12.0, deserialize=True):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            for index in range(self.num_chunks):
+                await asyncio.sleep(self.uid_to_delay[synapse.uid])
+                yield f"{synapse.uid}:{index}"
+        finally:
+            self.in_flight -= 1
+            self.closed_uids.append(synapse.uid)
+
+
+def stream_in_batch(dendrite, uids, **kwargs):
+    return dendrite.call_stream_in_batch([None] * len(uids), [FakeSynapse(uid) for uid in uids], **kwargs)
+
+
+async def collect(stream):
+    key_to_chunks = {}
+    async for key, chunk in stream:
+        key_to_chunks.setdefault(key, []).append(chunk)
+    return key_to_chunks
+
+
+def test_stream_in_batch_yields_every_chunk_then_the_end():
+    dendrite = FakeStreamDendrite({1: 0.01, 2: 0.02})
+    key_to_chunks = asyncio.run(collect(stream_in_batch(dendrite, [1, 2], keys=['a', 'b'])))
+    assert key_to_chunks == {'a': ['1:0', '1:1', '1:2', STREAM_END], 'b': ['2:0', '2:1', '2:2', STREAM_END]}
+    assert sorted(dendrite.closed_uids) == [1, 2]
+
+
+def test_stream_in_batch_limits_concurrency():
+    dendrite = FakeStreamDendrite({uid: 0.01 for uid in range(6)})
+    key_to_chunks = asyncio.run(collect(stream_in_batch(dendrite, list(range(6)), max_concurrency=2)))
+    assert all(chunks[-1] is STREAM_END for chunks in key_to_chunks.values())
+    assert dendrite.max_in_flight == 2
+
+
+def test_target_deadline_cancels_only_the_slow_stream():
+    dendrite = FakeStreamDendrite({1: 0.01, 2: 1.0})
+    key_to_chunks = asyncio.run(collect(stream_in_batch(dendrite, [1, 2], target_deadline=0.2)))
+    assert key_to_chunks == {1: ['1:0', '1:1', '1:2', STREAM_END], 2: [STREAM_END]}
+    # the cancelled stream was closed, so call_stream's cleanup ran.
+    assert sorted(dendrite.closed_uids) == [1, 2]
+
+
+def test_deadline_cancels_running_streams_and_keeps_their_chunks():
+    dendrite = FakeStreamDendrite({1: 0.01, 2: 0.2}, num_chunks=4)
+
+    async def collect_in_time():
+        return await asyncio.wait_for(collect(stream_in_batch(dendrite, [1, 2], deadline=0.5)), 2)
+
+    key_to_chunks = asyncio.run(collect_in_time())
+    assert key_to_chunks[1] == ['1:0', '1:1', '1:2', '1:3', STREAM_END]
+    # uid 2 got two chunks out before the deadline, then ended.
+    assert key_to_chunks[2] == ['2:0', '2:1', STREAM_END]
+    assert sorted(dendrite.closed_uids) == [1, 2]
+    assert dendrite.in_flight == 0
+
+
+def test_consumer_exit_closes_in_flight_streams():
+    dendrite = FakeStreamDendrite({1: 0.01, 2: 1.0, 3: 1.0})
+
+    async def take_first_chunk():
+        stream = stream_in_batch(dendrite, [1, 2, 3])
+        try:
+            async for key, chunk in stream:
+                return key, chunk
+        finally:
+            await stream.aclose()
+
+    assert asyncio.run(take_first_chunk()) == (1, '1:0')
+    assert sorted(dendrite.closed_uids) == [1, 2, 3]
+    assert dendrite.in_flight == 0
@@ -0,0 +1,77 @@
+import os
+
+import torch
+
+from validators.services.embedding_cache import PromptEmbeddingCache, normalize_prompt
+
+
+def test_prompt_variants_share_one_entry():
+    assert normalize_prompt('  A Cat\tsurfing\n a WAVE ') == 'a cat surfing a wave'
+    cache = PromptEmbeddingCache()
+    cache['A cat surfing a wave'] = torch.ones(4)
+    assert torch.equal(cache.get('  a CAT  surfing\ta wave'), torch.ones(4))
+    assert cache.get('a dog surfing a wave') is None
+    assert len(cache) == 1
+    assert cache.get_stats() == {'entries': 1, 'hits': 1, 'disk_hits': 0, 'misses': 1, 'evictions': 0,
+                                 'hit_rate': 0.5}
+
+
+def test_stored_rows_do_not_keep_the_batch_alive():
+    cache = PromptEmbeddingCache()
+    batch = torch.zeros(2, 4)
+    cache['prompt'] = batch[0]
+    batch[0] += 1
+    assert torch.equal(cache.get('prompt'), torch.zeros(4))
+    assert cache.get('prompt').untyped_storage().nbytes() == 4 * 4
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PromptEmbeddingCache(max_entries=2)
+    cache['first'] = torch.zeros(1)
+    cache['second'] = torch.zeros(1)
+    cache.get('first')
+    cache['third'] = torch.zeros(1)
+    assert cache.get('second') is None
+    assert cache.get('first') is not None and cache.get('third') is not None
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_namespaces_keep_models_apart(tmp_path):
+    cache = PromptEmbeddingCache(cache_dir=str(tmp_path), namespace='model-a')
+    key_a = cache.get_key('prompt')
+    cache['prompt'] = torch.ones(4)
+
+    # another model must neither reuse the in-memory entry nor the file on disk.
+    cache.configure(namespace='model-b')
+    assert len(cache) == 0
+    assert cache.get_key('prompt') != key_a
+    assert cache.get('prompt') is None
+    assert PromptEmbeddingCache(cache_dir=str(tmp_path), namespace='model-b').get('prompt') is None
+    assert torch.equal(PromptEmbeddingCache(cache_dir=str(tmp_path), namespace='model-a').get('prompt'),
+                       torch.ones(4))
+
+
+def test_embeddings_persist_across_instances(tmp_path):
+    cache_dir = str(tmp_path / 'embeddings')
+    writer = PromptEmbeddingCache()
+    writer.configure(cache_dir=cache_dir)
+    embedding = torch.randn(8)
+    writer['a cat surfing a wave'] = embedding
+    key = writer.get_key('a cat surfing a wave')
+    assert os.listdir(os.path.join(cache_dir, key[:2])) == [f'{key}.npy']
+
+    reader = PromptEmbeddingCache(cache_dir=cache_dir)
+    assert torch.equal(reader.get('A cat surfing a wave'), embedding)
+    assert torch.equal(reader.get('a cat surfing a wave'), embedding)
+    stats = reader.get_stats()
+    assert stats['disk_hits'] == 1 and stats['hits'] == 1 and stats['misses'] == 0
+
+
+def test_unreadable_files_are_misses(tmp_path):
+    cache = PromptEmbeddingCache(cache_dir=str(tmp_path))
+    path = cache.get_path(cache.get_key('prompt'))
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as f:
+        f.write(b'truncated')
+    assert cache.get('prompt') is None
+    assert cache.get_stats()['misses'] == 1
@@ -0,0 +1,37 @@
+import pytest
+
+from ryno.latency import LatencyTracker
+
+
+def test_percentile_needs_min_samples():
+    tracker = LatencyTracker(window=10, min_samples=3)
+    tracker.record(1, 0.1)
+    tracker.record(1, 0.2)
+    assert tracker.percentile(1, 95) is None
+    assert tracker.percentile(2, 95) is None
+    tracker.record(1, 0.3)
+    assert tracker.percentile(1, 50) == pytest.approx(0.2)
+
+
+def test_window_keeps_latest_samples():
+    tracker = LatencyTracker(window=3, min_samples=1)
+    for seconds in [10.0, 10.0, 1.0, 1.0, 1.0]:
+        tracker.record(1, seconds)
+    assert tracker.percentile(1, 95) == pytest.approx(1.0)
+    assert tracker.get_stats()[1] == {'count': 5, 'p50': 1.0, 'p95': 1.0}
+
+
+def test_record_ignores_missing_uid():
+    tracker = LatencyTracker(min_samples=1)
+    tracker.record(None, 1.0)
+    assert tracker.get_stats() == {}
+
+
+def test_configure_resizes_existing_windows():
+    tracker = LatencyTracker(window=5, min_samples=1)
+    for seconds in [5.0, 4.0, 3.0, 2.0, 1.0]:
+        tracker.record(1, seconds)
+    tracker.configure(window=2, min_samples=2)
+    assert tracker.min_samples == 2
+    assert list(tracker.uid_to_histogram[1].samples) == [2.0, 1.0]
+    assert tracker.get_stats()[1]['count'] == 5
@@ -0,0 +1,36 @@
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from validators.services.query_buffer import QueryBuffer
+
+Synapse = namedtuple('Synapse', 'provider model')
+
+
+def test_groups_stay_distinct_past_16_bit_ids():
+    buffer = QueryBuffer()
+    for model_id in range(70000):
+        buffer.append(1, Synapse('lucataco', f"model-{model_id}"), None, 'synthetic', 0.0, 0)
+    # model 65536 used to share the key of model 0.
+    assert len(np.unique(buffer.group_keys())) == 70000
+
+
+def test_sample_per_group_picks_rows_of_one_group():
+    buffer = QueryBuffer(capacity=2)
+    rng = np.random.default_rng(0)
+    for row in range(500):
+        buffer.append(int(rng.integers(0, 5)), Synapse(f"p{row % 2}", 'm'), row, 'organic', float(row), row % 3)
+    picks, validator_type_ids = buffer.sample_per_group(3, rng=rng)
+    keys = buffer.group_keys()
+    assert picks.shape == (len(np.unique(keys)), 3)
+    for rows, validator_type_id in zip(picks, validator_type_ids):
+        assert len(set(keys[rows].tolist())) == 1
+        assert buffer[int(rows[0])].validator_type_id == validator_type_id
+
+
+def test_append_rejects_missing_uid():
+    buffer = QueryBuffer()
+    with pytest.raises(ValueError):
+        buffer.append(None, Synapse('lucataco', 'animate-diff'), None, 'synthetic', 0.0, 0)
+    assert len(buffer) == 0
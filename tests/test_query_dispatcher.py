@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+from validators.services.query_dispatcher import QueryDispatcher
+
+
+class FakeMiners:
+    """query_fn stand-in: sleeps uid_to_delay[uid] per query and tracks how many queries are in flight."""
+
+    def __init__(self, uid_to_delay, failing_uids=()):
+        self.uid_to_delay = uid_to_delay
+        self.failing_uids = set(failing_uids)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.uid_to_in_flight = {}
+        self.uid_to_max_in_flight = {}
+        self.uid_to_done_time = {}
+        self.queried = []
+
+    async def query(self, uid, item):
+        self.in_flight += 1
+        self.uid_to_in_flight[uid] = self.uid_to_in_flight.get(uid, 0) + 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.uid_to_max_in_flight[uid] = max(self.uid_to_max_in_flight.get(uid, 0), self.uid_to_in_flight[uid])
+        try:
+            await asyncio.sleep(self.uid_to_delay[uid])
+            if uid in self.failing_uids:
+                raise ConnectionError(f"uid {uid} is down")
+            self.queried.append((uid, item))
+        finally:
+            self.in_flight -= 1
+            self.uid_to_in_flight[uid] -= 1
+            self.uid_to_done_time[uid] = time.time()
+
+
+def test_every_item_is_queried_once_and_none_uids_are_skipped():
+    miners = FakeMiners({1: 0.0, 2: 0.0})
+    uid_items = [(1, 'a'), (2, 'b'), (None, 'c'), (1, 'd')]
+    stats = asyncio.run(QueryDispatcher().run(miners.query, uid_items))
+    assert sorted(miners.queried) == [(1, 'a'), (1, 'd'), (2, 'b')]
+    assert stats.to_dict()['total'] == 4
+    assert stats.succeeded == 3 and stats.skipped == 1 and stats.failed == 0
+
+
+def test_failures_are_counted_and_do_not_stop_the_lane():
+    miners = FakeMiners({1: 0.0, 2: 0.0}, failing_uids=[2])
+    stats = asyncio.run(QueryDispatcher().run(miners.query, [(2, 'a'), (2, 'b'), (1, 'c')]))
+    assert stats.failed == 2 and stats.succeeded == 1
+    assert miners.queried == [(1, 'c')]
+
+
+def test_in_flight_limits_per_miner_and_overall():
+    miners = FakeMiners({uid: 0.02 for uid in range(4)})
+    dispatcher = QueryDispatcher(max_concurrency=6, max_in_flight_per_miner=2)
+    uid_items = [(uid, item) for uid in range(4) for item in range(5)]
+    stats = asyncio.run(dispatcher.run(miners.query, uid_items))
+    assert stats.succeeded == 20
+    assert max(miners.uid_to_max_in_flight.values()) == 2
+    assert miners.max_in_flight == 6
+
+
+def test_slow_miner_only_delays_its_own_lane():
+    miners = FakeMiners({1: 0.3, 2: 0.01})
+    dispatcher = QueryDispatcher(max_in_flight_per_miner=1)
+    uid_items = [(1, 'slow-1'), (1, 'slow-2')] + [(2, item) for item in range(10)]
+
+    start_time = time.time()
+    stats = asyncio.run(dispatcher.run(miners.query, uid_items))
+    assert miners.uid_to_done_time[2] - start_time < 0.3
+    assert miners.uid_to_done_time[1] - start_time >= 0.6
+    assert stats.to_dict()['slowest_uid'] == 1
+    assert dispatcher.last_stats is stats
@@ -0,0 +1,84 @@
+import asyncio
+import os
+
+import pytest
+
+from validators.services import question_corpus
+from validators.services.question_corpus import MIN_QUESTIONS_CNT, CorpusSnapshot, QuestionCorpus
+
+QUESTIONS = ['what is a hurricane?', '', 'qu\'est-ce qu\'un ouragan ?', '台風とは何ですか', 'why' * 1000]
+
+
+def fake_fetch(questions):
+    async def fetch_entire_questions(concurrency=16, max_retries=3):
+        return list(questions)
+
+    return fetch_entire_questions
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'corpus' / 'questions.bin')
+    CorpusSnapshot.write(path, QUESTIONS)
+    snapshot = CorpusSnapshot(path)
+    assert len(snapshot) == len(QUESTIONS)
+    assert [snapshot[index] for index in range(len(snapshot))] == QUESTIONS
+    assert snapshot[-1] == QUESTIONS[-1]
+    with pytest.raises(IndexError):
+        snapshot[len(QUESTIONS)]
+    assert os.listdir(tmp_path / 'corpus') == ['questions.bin']
+
+
+def test_load_rejects_missing_and_foreign_files(tmp_path):
+    path = str(tmp_path / 'questions.bin')
+    corpus = QuestionCorpus(path)
+    assert not corpus.load() and len(corpus) == 0
+    with open(path, 'wb') as f:
+        f.write(b'not a corpus file at all')
+    assert not corpus.load() and len(corpus) == 0
+    with pytest.raises(ValueError):
+        CorpusSnapshot(path)
+
+    CorpusSnapshot.write(path, QUESTIONS)
+    assert corpus.load()
+    assert len(corpus) == len(QUESTIONS) and corpus[0] == QUESTIONS[0]
+
+
+def test_refresh_replaces_the_snapshot_atomically(tmp_path, monkeypatch):
+    path = str(tmp_path / 'questions.bin')
+    CorpusSnapshot.write(path, QUESTIONS)
+    corpus = QuestionCorpus(path, min_count=3)
+    assert corpus.load()
+    old_snapshot = corpus.snapshot
+
+    new_questions = [f'question {index}' for index in range(10)]
+    monkeypatch.setattr(question_corpus, 'fetch_entire_questions', fake_fetch(new_questions))
+    assert asyncio.run(corpus.refresh())
+    assert corpus.snapshot is not old_snapshot
+    assert [corpus[index] for index in range(len(corpus))] == new_questions
+    # the replaced file stays readable through the old mapping, and no temporary file is left behind.
+    assert old_snapshot[0] == QUESTIONS[0]
+    assert os.listdir(tmp_path) == ['questions.bin']
+
+    reloaded = QuestionCorpus(path)
+    assert reloaded.load() and len(reloaded) == len(new_questions)
+
+
+def test_refresh_keeps_the_old_snapshot_below_the_minimum(tmp_path, monkeypatch):
+    path = str(tmp_path / 'questions.bin')
+    corpus = QuestionCorpus(path)
+    assert corpus.min_count == MIN_QUESTIONS_CNT == 10000
+
+    monkeypatch.setattr(question_corpus, 'fetch_entire_questions', fake_fetch(['q'] * (MIN_QUESTIONS_CNT - 1)))
+    assert not asyncio.run(corpus.refresh())
+    assert len(corpus) == 0 and not os.path.exists(path)
+
+    monkeypatch.setattr(question_corpus, 'fetch_entire_questions',
+                        fake_fetch([f'q{index}' for index in range(MIN_QUESTIONS_CNT)]))
+    assert asyncio.run(corpus.refresh())
+    assert len(corpus) == MIN_QUESTIONS_CNT and corpus[-1] == f'q{MIN_QUESTIONS_CNT - 1}'
+    snapshot = corpus.snapshot
+
+    monkeypatch.setattr(question_corpus, 'fetch_entire_questions', fake_fetch(['q'] * 10))
+    assert not asyncio.run(corpus.refresh())
+    assert corpus.snapshot is snapshot
+    assert CorpusSnapshot(path)[0] == 'q0'
@@ -0,0 +1,81 @@
+import asyncio
+import io
+
+import av
+import numpy as np
+import pytest
+import torch
+
+from ryno import reward
+from ryno.reward import compute_embedding_similarities, decode_sampled_frames, sample_frame_indices
+
+
+def encode_video(num_frames, size=64):
+    """An mp4 whose frame i is filled with the gray level 10 * i."""
+    buffer = io.BytesIO()
+    with av.open(buffer, mode='w', format='mp4') as container:
+        stream = container.add_stream('mpeg4', rate=10)
+        stream.width = stream.height = size
+        stream.pix_fmt = 'yuv420p'
+        for index in range(num_frames):
+            frame = np.full((size, size, 3), 10 * index, dtype=np.uint8)
+            container.mux(stream.encode(av.VideoFrame.from_ndarray(frame, format='rgb24')))
+        container.mux(stream.encode())
+    return buffer.getvalue()
+
+
+def gray_levels(frames):
+    return [int(round(float(np.mean(frame)) / 10)) for frame in frames]
+
+
+def test_sample_frame_indices():
+    assert sample_frame_indices(10, 4) == [0, 3, 6, 9]
+    assert sample_frame_indices(2, 4) == [0, 0, 1, 1]
+    assert sample_frame_indices(0, 4) == []
+
+
+def test_decode_sampled_frames():
+    frames = decode_sampled_frames(encode_video(20), 4)
+    assert len(frames) == 4
+    assert all(frame.shape == (64, 64, 3) for frame in frames)
+    assert gray_levels(frames) == [0, 6, 13, 19]
+
+
+def test_decode_sampled_frames_repeats_frames_of_short_videos():
+    frames = decode_sampled_frames(encode_video(3), 5)
+    assert gray_levels(frames) == [0, 0, 1, 2, 2]
+
+
+def test_compute_embedding_similarities(monkeypatch):
+    prompt_to_embed = {'a cat': torch.tensor([1.0, 0.0]), 'a dog': torch.tensor([0.0, 1.0])}
+    encoded = []
+
+    def compute_text_embeddings(prompts):
+        encoded.append(list(prompts))
+        return torch.stack([prompt_to_embed[prompt] for prompt in prompts])
+
+    monkeypatch.setattr(reward, 'compute_text_embeddings', compute_text_embeddings)
+    cache = {}
+    video_embeds = torch.tensor([[2.0, 0.0], [1.0, 1.0], [0.0, -1.0]])
+    similarities = compute_embedding_similarities(video_embeds, ['a cat', 'a cat', 'a dog'], cache)
+    # cosine similarity, with negative similarities clamped to 0.
+    assert similarities == pytest.approx([1.0, 2 ** -0.5, 0.0])
+    # each missing prompt is encoded once and cached.
+    assert encoded == [['a cat', 'a dog']]
+    assert set(cache) == {'a cat', 'a dog'}
+
+    compute_embedding_similarities(video_embeds[:1], ['a cat'], cache)
+    assert len(encoded) == 1
+
+
+def test_api_score_weights_similarity_by_length():
+    async def score_all():
+        return await asyncio.gather(
+            reward.api_score("a cat in the rain", "a cat in the rain", 0.5, 0, 'provider'),
+            reward.api_score("a cat in the rain", "a cat", 0.5, 0, 'provider'),
+            reward.api_score(None, "a cat", 0.5, 0, 'provider'))
+
+    same, too_short, missing = asyncio.run(score_all())
+    assert same == pytest.approx(0.5)
+    assert too_short == 0
+    assert missing == 0
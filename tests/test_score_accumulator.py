@@ -0,0 +1,58 @@
+import torch
+
+from validators.services.score_accumulator import ScoreAccumulator, resize_tensor
+
+
+def test_resize_tensor_pads_and_truncates():
+    tensor = torch.tensor([1.0, 2.0, 3.0])
+    assert resize_tensor(tensor, 5).tolist() == [1.0, 2.0, 3.0, 0.0, 0.0]
+    truncated = resize_tensor(tensor, 2)
+    assert truncated.tolist() == [1.0, 2.0]
+    # a copy, not a view of the input.
+    truncated[0] = 9.0
+    assert tensor[0] == 1.0
+    assert resize_tensor(torch.tensor([True]), 3).dtype == torch.bool
+
+
+def test_averages_only_count_available_uids():
+    accumulator = ScoreAccumulator()
+    accumulator.reset([1, 3], size=5)
+    accumulator.add({1: 0.5, 2: 1.0, 3: 0.25})
+    accumulator.add({1: 1.0})
+    assert accumulator.counts.tolist() == [0, 2, 0, 1, 0]
+    assert accumulator.averages().tolist() == [0.0, 0.75, 0.0, 0.25, 0.0]
+    assert accumulator.summary() == {1: 0.75, 3: 0.25}
+
+
+def test_add_grows_for_new_uids():
+    accumulator = ScoreAccumulator(size=2)
+    accumulator.reset([0, 1])
+    accumulator.add({4: 1.0, 1: 0.5})
+    assert len(accumulator) == 5
+    # uid 4 wasn't available when the epoch started.
+    assert accumulator.averages().tolist() == [0.0, 0.5, 0.0, 0.0, 0.0]
+
+
+def test_reset_starts_a_new_epoch():
+    accumulator = ScoreAccumulator(size=3)
+    accumulator.reset([0, 1, 2])
+    accumulator.add({0: 1.0, 2: 1.0})
+    accumulator.reset([2], size=4)
+    assert len(accumulator) == 4
+    assert accumulator.counts.sum() == 0
+    assert accumulator.available.tolist() == [False, False, True, False]
+    assert accumulator.averages(size=2).tolist() == [0.0, 0.0]
+
+
+def test_averages_match_per_uid_lists():
+    accumulator = ScoreAccumulator()
+    accumulator.reset(list(range(8)), size=8)
+    generator = torch.Generator().manual_seed(0)
+    uid_to_scores = {uid: [] for uid in range(8)}
+    for step in range(50):
+        uid_to_score = {uid: float(torch.rand(1, generator=generator)) for uid in range(0, 8, 1 + step % 3)}
+        accumulator.add(uid_to_score)
+        for uid, score in uid_to_score.items():
+            uid_to_scores[uid].append(score)
+    expected = [sum(scores) / len(scores) if scores else 0.0 for scores in uid_to_scores.values()]
+    assert torch.allclose(accumulator.averages(), torch.tensor(expected))
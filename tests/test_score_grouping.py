@@ -0,0 +1,58 @@
+from collections import defaultdict
+
+import numpy as np
+
+from validators.services.score_grouping import (average_scores_by_group, encode_keys,
+                                                group_in_order_of_appearance, sum_by_uid)
+
+
+def make_rows(num_rows=2000, num_uids=40, num_provider_models=3, seed=0):
+    rng = np.random.default_rng(seed)
+    uids = rng.integers(0, num_uids, num_rows)
+    provider_model_ids = rng.integers(0, num_provider_models, num_rows)
+    scores = rng.random(num_rows)
+    return uids, provider_model_ids, scores
+
+
+def test_groups_are_numbered_in_order_of_appearance():
+    keys = np.array([7, 3, 7, 1, 3, 9, 1])
+    first_rows, group_of_row = group_in_order_of_appearance(keys)
+    assert first_rows.tolist() == [0, 1, 3, 5]
+    assert group_of_row.tolist() == [0, 1, 0, 2, 1, 3, 2]
+
+    groups = {}
+    for key in keys.tolist():
+        groups.setdefault(key, len(groups))
+    assert keys[first_rows].tolist() == list(groups)
+
+
+def test_average_scores_match_dict_implementation():
+    uids, provider_model_ids, scores = make_rows()
+    scores_dict = defaultdict(list)
+    for uid, provider_model_id, score in zip(uids.tolist(), provider_model_ids.tolist(), scores.tolist()):
+        scores_dict[(uid, provider_model_id)].append(score)
+
+    first_rows, avg_scores, group_of_row = average_scores_by_group(uids, provider_model_ids, scores)
+    keys = list(zip(uids[first_rows].tolist(), provider_model_ids[first_rows].tolist()))
+    assert keys == list(scores_dict)
+    # bit-identical: bincount adds in row order like sum() does.
+    assert avg_scores.tolist() == [sum(values) / len(values) for values in scores_dict.values()]
+    assert (encode_keys(uids, provider_model_ids) ==
+            encode_keys(uids[first_rows], provider_model_ids[first_rows])[group_of_row]).all()
+
+
+def test_sum_by_uid_matches_dict_implementation():
+    uids, _, scores = make_rows()
+    expected = defaultdict(float)
+    for uid, score in zip(uids.tolist(), scores.tolist()):
+        expected[uid] += score
+    result = sum_by_uid(uids, scores)
+    assert list(result) == list(expected)
+    assert result == dict(expected)
+
+
+def test_empty_input():
+    empty = np.array([], dtype=np.int64)
+    first_rows, avg_scores, group_of_row = average_scores_by_group(empty, empty, np.array([]))
+    assert len(first_rows) == len(avg_scores) == len(group_of_row) == 0
+    assert sum_by_uid(empty, np.array([])) == {}
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from ryno import streaming
+from ryno.streaming import StreamAccumulator, StreamLatencyStats
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(streaming, 'time', SimpleNamespace(perf_counter=clock.perf_counter))
+    monkeypatch.setattr(StreamAccumulator, 'stats', StreamLatencyStats())
+    return clock
+
+
+def stream_at(clock, uid, times_and_chunks):
+    accumulator = StreamAccumulator(uid)
+    for at, chunk in times_and_chunks:
+        clock.now = at
+        accumulator.add(chunk)
+    return accumulator
+
+
+def test_ttfb_and_chunk_gaps(clock):
+    final_synapse = object()
+    accumulator = stream_at(clock, 1, [(100.5, 'a'), (100.75, 'bc'), (101.75, 'def'), (105.0, final_synapse)])
+    assert accumulator.ttfb == 0.5
+    assert accumulator.gap_count == 2 and accumulator.gap_sum == 1.25 and accumulator.max_gap == 1.0
+    # the final synapse is kept but neither timed nor joined.
+    assert accumulator.last_chunk is final_synapse and accumulator.size == 6
+    assert accumulator.finish() == 'abcdef'
+
+
+def test_latency_stats_per_uid(clock):
+    stream_at(clock, 1, [(100.5, 'a'), (100.75, 'b')]).finish()
+    clock.now = 200.0
+    stream_at(clock, 1, [(201.5, 'a'), (201.75, 'b'), (204.75, 'c')]).finish()
+    clock.now = 300.0
+    stream_at(clock, 2, []).finish()
+
+    assert StreamAccumulator.stats.get_stats() == {
+        1: {'streams': 2, 'empty_streams': 0, 'avg_ttfb': 1.0, 'avg_chunk_gap': round(3.5 / 3, 4),
+            'max_chunk_gap': 3.0},
+        2: {'streams': 1, 'empty_streams': 1, 'avg_ttfb': None, 'avg_chunk_gap': None, 'max_chunk_gap': 0.0},
+    }
+    assert list(StreamAccumulator.stats.get_stats(uid=2)) == [2]
+    assert StreamAccumulator.stats.get_stats(uid=3) == {}
+
+
+def test_consume_times_each_chunk_as_it_arrives(clock):
+    async def chunks():
+        for at, chunk in [(100.25, 'he'), (100.5, 'll'), (101.5, 'o')]:
+            clock.now = at
+            yield chunk
+
+    accumulator = StreamAccumulator(uid=7, start_time=100.0)
+    assert asyncio.run(accumulator.consume(chunks())) == 'hello'
+    assert accumulator.ttfb == 0.25 and accumulator.max_gap == 1.0
+    assert StreamAccumulator.stats.get_stats(7)[7]['avg_chunk_gap'] == 0.625
@@ -0,0 +1,113 @@
+import random
+from collections import namedtuple
+from copy import deepcopy
+
+from validators.task_manager import TaskMgr
+
+Synapse = namedtuple('Synapse', 'provider model')
+
+
+def make_task_mgr(uid_to_capacities):
+    return TaskMgr(uid_to_capacities=uid_to_capacities, dendrite=None, metagraph=None, loop=None)
+
+
+def test_none_capacity_is_treated_as_zero():
+    task_mgr = make_task_mgr({1: {'lucataco': {'animate-diff': 2}}})
+    task_mgr.update_remain_capacity_based_on_new_capacity({1: {'lucataco': {'animate-diff': None}},
+                                                           2: {'lucataco': {'animate-diff': None}}})
+    assert task_mgr.get_remaining_bandwidth(1, 'lucataco', 'animate-diff') == 0
+    assert task_mgr.get_remaining_bandwidth(2, 'lucataco', 'animate-diff') == 0
+    assert task_mgr.choose_miner(Synapse('lucataco', 'animate-diff')) is None
+
+
+def test_remaining_bandwidth_matches_nested_view():
+    task_mgr = make_task_mgr({
+        1: {'lucataco': {'animate-diff': 2}, 'anotherjesse': {'zeroscope-v2-xl': 0}},
+        2: None,
+        3: {'anotherjesse': {'zeroscope-v2-xl': 1}},
+    })
+    task_mgr.choose_miner(Synapse('anotherjesse', 'zeroscope-v2-xl'))
+    nested = [(uid, provider, model, bandwidth)
+              for uid, provider_to_cap in task_mgr.remain_resources.items() if provider_to_cap
+              for provider, model_to_cap in provider_to_cap.items()
+              for model, bandwidth in model_to_cap.items() if bandwidth > 0]
+    assert list(task_mgr.iter_remaining_bandwidth()) == nested == [(1, 'lucataco', 'animate-diff', 2)]
+
+
+def test_uid_to_capacity_is_rebuilt_after_update():
+    task_mgr = make_task_mgr({1: {'lucataco': {'animate-diff': 2}}})
+    assert task_mgr.uid_to_capacity is task_mgr.uid_to_capacity
+    task_mgr.update_remain_capacity_based_on_new_capacity({1: {'lucataco': {'animate-diff': 5}}})
+    assert task_mgr.uid_to_capacity == {1: {'lucataco': {'animate-diff': 5}}}
+
+
+def legacy_choose_miner(remain_resources, synapse):
+    # the linear scan choose_miner did before CapacityScheduler.
+    available_uids = []
+    for uid, capacity in remain_resources.items():
+        if capacity is None:
+            continue
+        bandwidth = capacity.get(synapse.provider, {}).get(synapse.model)
+        if bandwidth is not None and bandwidth > 0:
+            available_uids.append(uid)
+    return available_uids
+
+
+def test_scheduler_matches_legacy_assignment():
+    random.seed(0)
+    uid_to_capacities = {uid: {'lucataco': {'animate-diff': random.randint(0, 4)},
+                               'anotherjesse': {'zeroscope-v2-xl': random.randint(0, 4)}}
+                         for uid in range(50)}
+    uid_to_capacities[50] = None
+    task_mgr = make_task_mgr(uid_to_capacities)
+    remain_resources = deepcopy(uid_to_capacities)
+    synapses = [Synapse(*random.choice([('lucataco', 'animate-diff'), ('anotherjesse', 'zeroscope-v2-xl')]))
+                for _ in range(500)]
+
+    for synapse in synapses:
+        available_uids = legacy_choose_miner(remain_resources, synapse)
+        uid = task_mgr.assign_many([synapse])[0]
+        # the scheduler picks from exactly the miners the scan would have considered.
+        if not available_uids:
+            assert uid is None
+            continue
+        assert uid in available_uids
+        remain_resources[uid][synapse.provider][synapse.model] -= 1
+        assert task_mgr.get_remaining_bandwidth(uid, synapse.provider, synapse.model) == \
+            remain_resources[uid][synapse.provider][synapse.model]
+
+
+def test_swap_remove_keeps_index_consistent():
+    task_mgr = make_task_mgr({uid: {'lucataco': {'animate-diff': 1}} for uid in range(10)})
+    scheduler = task_mgr.scheduler
+    key = ('lucataco', 'animate-diff')
+    assigned = []
+    for _ in range(10):
+        assigned.append(task_mgr.choose_miner(Synapse(*key)))
+        rows = scheduler.rows[key]
+        assert {row: index for index, row in enumerate(rows)} == scheduler.positions[key]
+    assert sorted(assigned) == list(range(10))
+    assert task_mgr.choose_miner(Synapse(*key)) is None
+
+    task_mgr.restore_capacities_for_all_miners()
+    assert sorted(task_mgr.assign_many([Synapse(*key)] * 11), key=lambda uid: (uid is None, uid)) == \
+        list(range(10)) + [None]
+
+
+def test_assign_many_is_error_handled():
+    task_mgr = make_task_mgr({1: {'lucataco': {'animate-diff': 1}}})
+    # a synapse without provider/model breaks the scheduler; batch assignment returns None like assign_task.
+    assert task_mgr.assign_many([object()]) is None
+    assert task_mgr.assign_task(object()) is None
+
+
+def test_release_gives_bandwidth_back():
+    task_mgr = make_task_mgr({1: {'lucataco': {'animate-diff': 1}}})
+    synapse = Synapse('lucataco', 'animate-diff')
+    assert task_mgr.choose_miner(synapse) == 1
+    assert task_mgr.choose_miner(synapse) is None
+    task_mgr.release_miner(synapse, 1)
+    task_mgr.release_miner(synapse, 1)
+    # never above the miner's max.
+    assert task_mgr.get_remaining_bandwidth(1, 'lucataco', 'animate-diff') == 1
+    assert task_mgr.choose_miner(synapse) == 1
@@ -0,0 +1,54 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from ryno.text_similarity import TextSimilarityBatcher, calculate_text_similarities, calculate_text_similarity
+
+WORDS = "A cat, the dog; rhino RIVER river sunset night-time neon rain 42 forest. ocean wave drone shot".split()
+
+
+def make_pairs(num_pairs, seed=0):
+    rng = random.Random(seed)
+    return [(" ".join(rng.choices(WORDS, k=rng.randint(1, 30))), " ".join(rng.choices(WORDS, k=rng.randint(1, 30))))
+            for _ in range(num_pairs)]
+
+
+def test_batched_similarities_match_the_per_pair_path():
+    pairs = make_pairs(300) + [("same words here", "same words here"), ("cat", "dog"), ("Cat", "cat")]
+    expected = [calculate_text_similarity(reference, response) for reference, response in pairs]
+    assert calculate_text_similarities(pairs) == pytest.approx(expected, abs=1e-9)
+
+
+def test_pairs_without_tokens_score_zero():
+    with pytest.raises(ValueError):
+        calculate_text_similarity("", "a")
+    similarities = calculate_text_similarities([("", "a"), ("rain", "rain"), ("", "")])
+    assert similarities.tolist() == pytest.approx([0.0, 1.0, 0.0])
+    assert calculate_text_similarities([("", "")]).tolist() == [0.0]
+    assert calculate_text_similarities([]).shape == (0,)
+
+
+def test_concurrent_calls_are_scored_in_one_batch():
+    batcher = TextSimilarityBatcher()
+    pairs = make_pairs(20)
+
+    async def score_all():
+        return await asyncio.gather(*[batcher.similarity(reference, response) for reference, response in pairs])
+
+    similarities = asyncio.run(score_all())
+    assert similarities == pytest.approx(calculate_text_similarities(pairs).tolist())
+    assert batcher.get_stats() == {'pairs_scored': 20, 'batches_scored': 1}
+
+
+def test_full_batches_are_scored_right_away():
+    batcher = TextSimilarityBatcher(max_batch_size=8, batch_window=10)
+    pairs = make_pairs(16)
+
+    async def score_all():
+        return await asyncio.wait_for(
+            asyncio.gather(*[batcher.similarity(reference, response) for reference, response in pairs]), 5)
+
+    assert np.allclose(asyncio.run(score_all()), calculate_text_similarities(pairs))
+    assert batcher.get_stats()['batches_scored'] == 2
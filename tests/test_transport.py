@@ -0,0 +1,97 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ryno.transport import TransportManager
+
+
+async def stream_chunks(request):
+    response = web.StreamResponse()
+    await response.prepare(request)
+    for _ in range(int(request.query.get('chunks', 1))):
+        await asyncio.sleep(0.05)
+        await response.write(b'chunk')
+    await response.write_eof()
+    return response
+
+
+async def fetch(transport, url, timeout=1.0):
+    async with transport.get_session().get(url, timeout=transport.get_timeout(timeout)) as response:
+        return await response.read()
+
+
+def run_with_server(test):
+    async def run():
+        app = web.Application()
+        app.router.add_get('/stream', stream_chunks)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            return await test(server)
+        finally:
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def test_timeout_leaves_waiting_for_the_pool_unbounded():
+    timeout = TransportManager.get_timeout(5, total=100)
+    assert timeout.connect is None
+    assert timeout.sock_connect == 5 and timeout.sock_read == 5 and timeout.total == 100
+
+
+def test_session_is_shared_per_loop_and_configured():
+    transport = TransportManager()
+    transport.configure(max_connections=10, max_connections_per_host=3)
+
+    async def get_session_twice():
+        first, second = transport.get_session(), transport.get_session()
+        assert first is second
+        assert first.connector.limit == 10 and first.connector.limit_per_host == 3
+        return first
+
+    loops = [asyncio.new_event_loop() for _ in range(2)]
+    try:
+        # each event loop gets its own session.
+        first, second = [loop.run_until_complete(get_session_twice()) for loop in loops]
+        assert first is not second
+        for loop, session in zip(loops, [first, second]):
+            loop.run_until_complete(session.close())
+    finally:
+        for loop in loops:
+            loop.close()
+
+
+def test_waiting_for_a_pooled_connection_is_not_a_connect_timeout():
+    transport = TransportManager(max_connections_per_host=1)
+
+    async def test(server):
+        # the first stream holds the only connection for 0.3s, longer than the timeout of the second one.
+        url = server.make_url('/stream')
+        try:
+            return await asyncio.gather(fetch(transport, f"{url}?chunks=6", timeout=0.2),
+                                        fetch(transport, f"{url}?chunks=1", timeout=0.2))
+        finally:
+            await transport.close()
+
+    assert run_with_server(test) == [b'chunk' * 6, b'chunk']
+
+
+def test_stats_count_reused_and_open_sockets():
+    transport = TransportManager()
+
+    async def test(server):
+        url = server.make_url('/stream')
+        for _ in range(3):
+            assert await fetch(transport, url) == b'chunk'
+        stats = transport.get_stats()
+        await transport.close()
+        return stats, transport.get_stats()
+
+    stats, stats_after_close = run_with_server(test)
+    assert stats['requests'] == 3
+    assert stats['connections_created'] == 1
+    assert abs(stats['reuse_ratio'] - 2 / 3) < 1e-9
+    assert stats['open_sockets'] == 1
+    assert stats_after_close['open_sockets'] == 0
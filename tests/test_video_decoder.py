@@ -0,0 +1,130 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import av
+import numpy as np
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from ryno.reward import decode_sampled_frames
+from validators.services import video_decoder
+from validators.services.video_decoder import ResponseStreamReader, StreamingVideoDecoder
+from validators.utils import close_http_session
+
+
+def encode_video(num_frames=20, container_format='mpegts', size=64):
+    """A video whose frame i is filled with the gray level 10 * i."""
+    buffer = io.BytesIO()
+    with av.open(buffer, mode='w', format=container_format) as container:
+        stream = container.add_stream('mpeg4', rate=10)
+        stream.width = stream.height = size
+        stream.pix_fmt = 'yuv420p'
+        for index in range(num_frames):
+            frame = np.full((size, size, 3), 10 * index, dtype=np.uint8)
+            container.mux(stream.encode(av.VideoFrame.from_ndarray(frame, format='rgb24')))
+        container.mux(stream.encode())
+    return buffer.getvalue()
+
+
+VIDEO = encode_video()
+
+
+async def serve_video(request):
+    return web.Response(body=VIDEO, content_type='video/mp2t')
+
+
+async def serve_chunked_video(request):
+    # no content length, so only the bytes actually read can enforce the size cap.
+    response = web.StreamResponse()
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    for start in range(0, len(VIDEO), 1024):
+        await response.write(VIDEO[start:start + 1024])
+    await response.write_eof()
+    return response
+
+
+def fetch_with_server(decoder, path, num_frames=4):
+    async def run():
+        app = web.Application()
+        app.router.add_get('/video.ts', serve_video)
+        app.router.add_get('/chunked.ts', serve_chunked_video)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            return await decoder.fetch_sampled_frames(str(server.make_url(path)), num_frames)
+        finally:
+            await close_http_session()
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def gray_levels(frames):
+    return [int(round(float(np.mean(frame)) / 10)) for frame in frames]
+
+
+@pytest.fixture
+def streaming_fails(monkeypatch):
+    """Makes every streaming decode fail, like an mp4 whose index sits at the end of the file."""
+    def decode(video, num_frames):
+        if isinstance(video, ResponseStreamReader):
+            raise av.error.InvalidDataError(0, "moov atom not found")
+        return decode_sampled_frames(video, num_frames)
+
+    monkeypatch.setattr(video_decoder, 'decode_sampled_frames', decode)
+
+
+def test_streaming_decode():
+    decoder = StreamingVideoDecoder(chunk_size=1024)
+    frames = fetch_with_server(decoder, '/video.ts')
+    assert len(frames) == 4
+    assert gray_levels(frames) == sorted(gray_levels(frames))
+    stats = decoder.get_stats()
+    assert stats['decoded'] == 1 and stats['spooled'] == 0
+    assert 0 < stats['bytes_streamed'] <= len(VIDEO)
+
+
+def test_spooled_fallback(streaming_fails):
+    decoder = StreamingVideoDecoder(chunk_size=1024, spool_memory_bytes=2048)
+    frames = fetch_with_server(decoder, '/chunked.ts')
+    assert len(frames) == 4
+    stats = decoder.get_stats()
+    assert stats['decoded'] == 1 and stats['spooled'] == 1
+
+
+@pytest.mark.parametrize('path', ['/video.ts', '/chunked.ts'])
+def test_videos_over_the_size_cap_are_skipped(path):
+    decoder = StreamingVideoDecoder(max_video_bytes=len(VIDEO) // 2, chunk_size=1024)
+    assert fetch_with_server(decoder, path) is None
+    assert decoder.get_stats()['too_large'] == 1
+
+
+def test_size_cap_applies_to_the_spooled_fallback(streaming_fails):
+    decoder = StreamingVideoDecoder(max_video_bytes=len(VIDEO) // 2, chunk_size=1024)
+    assert fetch_with_server(decoder, '/chunked.ts') is None
+    assert decoder.get_stats()['too_large'] == 1
+
+
+def test_read_timeout_cancels_the_pending_read():
+    cancelled = []
+
+    async def read_forever(size):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(size)
+            raise
+
+    async def read_with_timeout():
+        response = SimpleNamespace(content=SimpleNamespace(read=read_forever))
+        reader = ResponseStreamReader(response, asyncio.get_running_loop(), max_bytes=100, chunk_size=10,
+                                      read_timeout=0.05)
+        with pytest.raises(TimeoutError):
+            await asyncio.to_thread(reader.read, 100)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(read_with_timeout())
+    assert cancelled == [10]
@@ -0,0 +1,127 @@
+import asyncio
+
+import numpy as np
+import pytest
+import torch
+
+from validators.services import video_scoring
+from validators.services.video_scoring import VideoScoringPipeline
+
+NUM_FRAMES = 4
+
+
+def make_frames(seed):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (32, 32, 3), dtype=np.uint8) for _ in range(NUM_FRAMES)]
+
+
+class FakeDecoder:
+    def __init__(self, url_to_frames):
+        self.url_to_frames = url_to_frames
+        self.fetched = []
+
+    async def fetch_sampled_frames(self, url, num_frames):
+        self.fetched.append(url)
+        frames = self.url_to_frames[url]
+        if isinstance(frames, Exception):
+            raise frames
+        return frames
+
+    def get_stats(self):
+        return {}
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Stands in for X-CLIP: a video embeds to its mean pixel value and scores its first embedding value."""
+    batches = []
+
+    def compute_video_embeddings(videos):
+        batches.append(len(videos))
+        return torch.tensor([[float(np.mean(frames)) / 255, 1.0] for frames in videos])
+
+    def compute_embedding_similarities(video_embeds, prompts, text_embedding_cache=None):
+        assert len(video_embeds) == len(prompts)
+        return video_embeds[:, 0].tolist()
+
+    monkeypatch.setattr(video_scoring, 'compute_video_embeddings', compute_video_embeddings)
+    monkeypatch.setattr(video_scoring, 'compute_embedding_similarities', compute_embedding_similarities)
+    return batches
+
+
+def expected_score(frames):
+    return pytest.approx(float(np.mean(frames)) / 255, abs=1e-6)
+
+
+def test_scores_with_num_frames_given(fake_model):
+    url_to_frames = {'a': make_frames(1), 'b': make_frames(2)}
+    pipeline = VideoScoringPipeline(num_frames=NUM_FRAMES, decoder=FakeDecoder(url_to_frames))
+    uid_to_score = asyncio.run(pipeline.score_many([(1, 'a cat', 'a'), (2, 'a dog', 'b')]))
+    assert uid_to_score == {1: expected_score(url_to_frames['a']), 2: expected_score(url_to_frames['b'])}
+    assert pipeline.get_stats()['dedup_index']['entries'] == 2
+
+
+def test_near_duplicate_from_another_uid_is_flagged_not_zeroed(fake_model):
+    frames = make_frames(1)
+    url_to_frames = {'original': frames, 'copy': [frame.copy() for frame in frames]}
+    pipeline = VideoScoringPipeline(num_frames=NUM_FRAMES, decoder=FakeDecoder(url_to_frames))
+    uid_to_score = asyncio.run(pipeline.score_many([(1, 'a cat', 'original'), (2, 'a cat', 'copy')]))
+    # both uids keep their score. only one embedding was computed.
+    assert uid_to_score == {1: expected_score(frames), 2: expected_score(frames)}
+    assert fake_model == [1]
+    stats = pipeline.get_stats()
+    assert stats['duplicates'] == 1
+    assert stats['copies'] == 1
+    assert stats['copying_uids'] == 1
+
+
+def test_concurrent_calls_share_forward_passes(fake_model):
+    url_to_frames = {str(seed): make_frames(seed) for seed in range(5)}
+    pipeline = VideoScoringPipeline(max_batch_size=2, num_frames=NUM_FRAMES, decoder=FakeDecoder(url_to_frames))
+    uid_to_score = asyncio.run(pipeline.score_many([(seed, 'a cat', str(seed)) for seed in range(5)]))
+    assert uid_to_score == {seed: expected_score(url_to_frames[str(seed)]) for seed in range(5)}
+    # full batches are flushed right away, the last one after batch_window.
+    assert fake_model == [2, 2, 1]
+    assert pipeline.get_stats()['batches_scored'] == 3
+
+
+def test_duplicate_in_a_later_batch_reuses_the_embedding(fake_model):
+    frames = make_frames(1)
+    pipeline = VideoScoringPipeline(num_frames=NUM_FRAMES, decoder=FakeDecoder({'a': frames}))
+
+    async def score_twice():
+        return [await pipeline.score('a cat', 'a', 1), await pipeline.score('a dog', 'a', 1)]
+
+    assert asyncio.run(score_twice()) == [expected_score(frames)] * 2
+    assert fake_model == [1]
+    stats = pipeline.get_stats()
+    assert stats['duplicates'] == 1
+    # the same uid returning its own video again is not a copy.
+    assert stats['copies'] == 0
+
+
+def test_undecodable_video_scores_zero(fake_model):
+    frames = make_frames(1)
+    url_to_frames = {'a': frames, 'broken': ValueError("no video stream"), 'empty': []}
+    pipeline = VideoScoringPipeline(num_frames=NUM_FRAMES, decoder=FakeDecoder(url_to_frames))
+    uid_to_score = asyncio.run(pipeline.score_many([(1, 'a cat', 'a'), (2, 'a cat', 'broken'),
+                                                    (3, 'a cat', 'empty')]))
+    assert uid_to_score == {1: expected_score(frames), 2: 0, 3: 0}
+    assert fake_model == [1]
+
+
+def test_cancelled_caller_does_not_cost_the_batch_its_scores(fake_model):
+    url_to_frames = {str(seed): make_frames(seed) for seed in range(3)}
+    pipeline = VideoScoringPipeline(num_frames=NUM_FRAMES, decoder=FakeDecoder(url_to_frames))
+
+    async def score_and_cancel_one():
+        tasks = [asyncio.create_task(pipeline.score('a cat', str(seed), seed)) for seed in range(3)]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    first, second, third = asyncio.run(score_and_cancel_one())
+    assert isinstance(second, asyncio.CancelledError)
+    assert first == expected_score(url_to_frames['0'])
+    assert third == expected_score(url_to_frames['2'])
+    assert pipeline.get_stats()['videos_scored'] == 3
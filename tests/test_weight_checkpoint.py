@@ -0,0 +1,39 @@
+import numpy as np
+import torch
+
+from validators.services.weight_checkpoint import load_weight_checkpoint, remap_scores, save_weight_checkpoint
+
+
+def test_remap_scores_follows_hotkeys():
+    scores = torch.tensor([0.1, 0.2, 0.3, 0.4])
+    old_hotkeys = ['a', 'b', 'c', 'd']
+    # b deregistered and x took its uid, d moved to a new uid, a new uid was appended.
+    new_hotkeys = ['a', 'x', 'c', 'y', 'd']
+    remapped = remap_scores(scores, old_hotkeys, new_hotkeys)
+    assert remapped.dtype == scores.dtype
+    assert torch.allclose(remapped, torch.tensor([0.1, 0.0, 0.3, 0.0, 0.4]))
+
+
+def test_remap_scores_shrinking_metagraph():
+    remapped = remap_scores(torch.tensor([0.1, 0.2, 0.3]), ['a', 'b', 'c'], ['c', 'a'])
+    assert torch.allclose(remapped, torch.tensor([0.3, 0.1]))
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / 'state' / 'weights_state.npz')
+    hotkeys = ['a', 'b', 'c']
+    moving_average_scores = torch.tensor([0.5, 0.25, 0.125])
+    save_weight_checkpoint(path, hotkeys, moving_average_scores, block=1234)
+
+    assert torch.equal(load_weight_checkpoint(path, hotkeys), moving_average_scores)
+    assert torch.equal(load_weight_checkpoint(path, ['c', 'z', 'a']), torch.tensor([0.125, 0.0, 0.5]))
+    with np.load(path) as checkpoint:
+        assert int(checkpoint['block']) == 1234
+    assert not (tmp_path / 'state' / 'weights_state.npz.tmp').exists()
+
+
+def test_missing_or_corrupt_checkpoint(tmp_path):
+    path = tmp_path / 'weights_state.npz'
+    assert load_weight_checkpoint(str(path), ['a']) is None
+    path.write_bytes(b'not a checkpoint')
+    assert load_weight_checkpoint(str(path), ['a']) is None
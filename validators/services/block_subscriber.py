@@ -0,0 +1,139 @@
+import asyncio
+import heapq
+import itertools
+import threading
+
+import bittensor as bt
+from substrateinterface import SubstrateInterface
+
+
+class BlockSubscriber:
+    """Publishes the latest block number to coroutines waiting on it, all on loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.current_block = None
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def publish(self, block_num):
+        # must be called on the event loop thread. use publish_threadsafe from other threads.
+        if self.current_block is not None and block_num <= self.current_block:
+            return
+        self.current_block = block_num
+        while self._waiters and self._waiters[0][0] <= block_num:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(block_num)
+
+    def publish_threadsafe(self, block_num):
+        self.loop.call_soon_threadsafe(self.publish, block_num)
+
+    async def wait_for_block(self, block_num):
+        """Wait until the chain reaches block_num and return the current block."""
+        if self.current_block is not None and self.current_block >= block_num:
+            return self.current_block
+        future = self.loop.create_future()
+        heapq.heappush(self._waiters, (block_num, next(self._counter), future))
+        return await future
+
+    async def wait_for_next_block(self):
+        next_block = 0 if self.current_block is None else self.current_block + 1
+        return await self.wait_for_block(next_block)
+
+
+class SubstrateBlockSubscriber(BlockSubscriber):
+    """Follows new block headers through a SubstrateInterface head subscription on a daemon thread."""
+
+    def __init__(self, chain_endpoint, loop: asyncio.AbstractEventLoop, reconnect_delay=3):
+        super().__init__(loop)
+        self.chain_endpoint = chain_endpoint
+        self.reconnect_delay = reconnect_delay
+        self._stopped = threading.Event()
+        self._thread = None
+        self._substrate = None
+        self._substrate_lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='block-subscriber', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        # the subscription blocks until the next header arrives. closing its websocket ends it right away.
+        with self._substrate_lock:
+            substrate = self._substrate
+        if substrate is not None:
+            self._close(substrate)
+
+    @staticmethod
+    def _close(substrate):
+        try:
+            substrate.close()
+        except Exception as err:
+            bt.logging.debug(f"closing the block subscription failed: {err}")
+
+    def _handle_header(self, obj, update_nr, subscription_id):
+        if self._stopped.is_set():
+            # any non-None return value ends the subscription.
+            return True
+        # head subscription headers carry no hash; chain reads resolve it from the number when they need it.
+        self.publish_threadsafe(int(obj['header']['number']))
+
+    def _run(self):
+        while not self._stopped.is_set():
+            substrate = None
+            try:
+                substrate = SubstrateInterface(url=self.chain_endpoint)
+                with self._substrate_lock:
+                    self._substrate = substrate
+                # stop() may have run before the connection was published.
+                if self._stopped.is_set():
+                    break
+                substrate.subscribe_block_headers(self._handle_header)
+            except Exception as err:
+                if self._stopped.is_set():
+                    break
+                bt.logging.error(f"block subscription failed: {err}. reconnecting in {self.reconnect_delay}s")
+                self._stopped.wait(self.reconnect_delay)
+            finally:
+                with self._substrate_lock:
+                    self._substrate = None
+                if substrate is not None:
+                    self._close(substrate)
+
+
+class LocalBlockSubscriber(BlockSubscriber):
+    """Stand-in for tests and local runs: blocks are produced by a timer or by calling advance."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, start_block=0, block_time=None):
+        super().__init__(loop)
+        self.start_block = start_block
+        self.block_time = block_time
+        self._task = None
+        self.publish(start_block)
+
+    def start(self):
+        if self.block_time and self._task is None:
+            self._task = self.loop.create_task(self._tick())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def advance(self, num_blocks=1):
+        self.publish(self.current_block + num_blocks)
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.block_time)
+            self.advance()
@@ -1,35 +1,103 @@
+import queue
+import random
 import sqlite3
+import threading
 import time
 import hashlib
+import traceback
+from collections import defaultdict
 from typing import List
 
-from ryno import StreamPrompting
+import bittensor as bt
+
+from ryno import VIDEO_SYNAPSE_TYPE
+
+CACHE_DB_PATH = 'cache.db'
+
+# WAL lets readers run alongside the writer thread, and NORMAL sync is durable enough for a cache.
+# auto_vacuum goes first: a fresh database ignores it once journal_mode = WAL has written the header.
+# on an existing database it is a no-op until enable_incremental_auto_vacuum runs.
+SQLITE_PRAGMAS = [
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",  # 64 MiB
+    "PRAGMA mmap_size = 268435456",  # 256 MiB
+    "PRAGMA temp_store = MEMORY",
+]
+AUTO_VACUUM_INCREMENTAL = 2
+DEFAULT_TTL = 3600 * 24
 
 
 class QueryResponseCache:
-    def __init__(self, validator_info=None):
+    # schema is created once per database file, not once per instance.
+    schema_lock = threading.Lock()
+    initialized_db_paths = set()
+
+    def __init__(self, validator_info=None, db_path=CACHE_DB_PATH):
         self.vali_hotkey = None
         self.vali_uid = None
-        # Connect to (or create) the SQLite database
-        conn = sqlite3.connect('cache.db')
-        cursor = conn.cursor()
+        self.db_path = db_path
+        # one connection per thread, opened lazily on first use from that thread.
+        self.local = threading.local()
+        self.connections = []
+        self.connections_lock = threading.Lock()
+        self.create_schema()
 
-        # Create a table for caching (key, value, and expiry time)
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS cache (
-            p_key TEXT PRIMARY KEY,
-            question TEXT,
-            answer TEXT,
-            provider TEXT,
-            model TEXT,
-            timestamp REAL
-        )
-        ''')
-        cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_provider_model ON cache (provider, model);
-        ''')
-        conn.commit()
-        self.conn = conn
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # Connect to (or create) the SQLite database
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            for pragma in SQLITE_PRAGMAS:
+                conn.execute(pragma)
+            self.local.conn = conn
+            with self.connections_lock:
+                self.connections.append(conn)
+        return conn
+
+    def create_schema(self):
+        with QueryResponseCache.schema_lock:
+            if self.db_path in QueryResponseCache.initialized_db_paths:
+                return
+            cursor = self.conn.cursor()
+            if not self.has_incremental_auto_vacuum():
+                bt.logging.info(f"{self.db_path} was created without incremental auto vacuum, so pruned pages "
+                                f"aren't given back to the filesystem. run with --cache_convert_auto_vacuum "
+                                f"once to convert it.")
+
+            # Create a table for caching (key, value, and expiry time)
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cache (
+                p_key TEXT PRIMARY KEY,
+                question TEXT,
+                answer TEXT,
+                provider TEXT,
+                model TEXT,
+                timestamp REAL,
+                epoch_num INTEGER,
+                expires_at REAL
+            )
+            ''')
+            columns = [row[1] for row in cursor.execute("PRAGMA table_info(cache)").fetchall()]
+            if 'epoch_num' not in columns:
+                cursor.execute("ALTER TABLE cache ADD COLUMN epoch_num INTEGER")
+            if 'expires_at' not in columns:
+                cursor.execute("ALTER TABLE cache ADD COLUMN expires_at REAL")
+                # rows written before ttl was stored get the default ttl from their write time.
+                cursor.execute("UPDATE cache SET expires_at = timestamp + ?", (DEFAULT_TTL,))
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_provider_model ON cache (provider, model);
+            ''')
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_epoch_num ON cache (epoch_num);
+            ''')
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_expires_at ON cache (expires_at);
+            ''')
+            self.conn.commit()
+            QueryResponseCache.initialized_db_paths.add(self.db_path)
 
     @staticmethod
     def generate_hash(input_string):
@@ -39,10 +107,10 @@ class QueryResponseCache:
         self.vali_hotkey = vali_hotkey
         self.vali_uid = vali_uid
 
-    def set_cache(self, question, answer, provider, model, ttl=3600 * 24):
+    def set_cache(self, question, answer, provider, model, ttl=DEFAULT_TTL):
         pass
 
-    def set_cache_in_batch(self, syns: List[StreamPrompting], ttl=3600 * 24, block_num=0, cycle_num=0, epoch_num=0):
+    def set_cache_in_batch(self, syns: List[VIDEO_SYNAPSE_TYPE], ttl=DEFAULT_TTL, block_num=0, cycle_num=0, epoch_num=0):
         datas = []
         last_update_time = time.time()
         for syn in syns:
@@ -57,13 +125,13 @@ class QueryResponseCache:
                 exclude={"dendrite", "completion", "total_size", "header_size", "axon", "uid", "provider", "model",
                          "required_hash_fields", "computed_body_hash", "streaming", "deserialize_flag", "task_id", }),
                           syn.completion, syn.provider, syn.model,
-                          last_update_time))
+                          last_update_time, epoch_num, last_update_time + ttl))
 
         # Insert multiple records
         cursor = self.conn.cursor()
         cursor.executemany('''
-            INSERT OR IGNORE INTO cache (p_key, question, answer, provider, model, timestamp) 
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT OR IGNORE INTO cache (p_key, question, answer, provider, model, timestamp, epoch_num, expires_at) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', datas)
 
         # Commit the transaction
@@ -94,8 +162,219 @@ class QueryResponseCache:
         results = [(row[0], row[1]) for row in cursor.fetchall()]
         return results
 
+    def get_random_question_to_answer(self, provider, model):
+        """Pick one (question, answer) row for provider/model without loading the rest of the table."""
+        cursor = self.conn.cursor()
+        # idx_provider_model stores rowid after (provider, model), so these are index seeks.
+        cursor.execute('''
+                SELECT rowid FROM cache WHERE provider = ? AND model = ? ORDER BY rowid ASC LIMIT 1
+                ''', (provider, model))
+        first = cursor.fetchone()
+        if first is None:
+            return None
+        cursor.execute('''
+                SELECT rowid FROM cache WHERE provider = ? AND model = ? ORDER BY rowid DESC LIMIT 1
+                ''', (provider, model))
+        last = cursor.fetchone()
+        rowid = random.randint(first[0], last[0])
+        cursor.execute('''
+                SELECT question, answer FROM cache WHERE provider = ? AND model = ? AND rowid >= ?
+                ORDER BY rowid ASC LIMIT 1
+                ''', (provider, model, rowid))
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else None
+
+    def get_db_size(self):
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return page_size * page_count, page_size * freelist_count
+
+    def prune(self, min_epoch_num=None, batch_size=1000, vacuum_pages=1000):
+        """
+        Delete expired rows, and rows older than min_epoch_num, in small batches so readers are never blocked
+        for long, then hand up to vacuum_pages free pages back to the filesystem.
+        """
+        start_time = time.time()
+        cursor = self.conn.cursor()
+        conditions = [("expires_at < ?", time.time())]
+        if min_epoch_num is not None:
+            conditions.append(("epoch_num < ?", min_epoch_num))
+
+        pruned = 0
+        for condition, value in conditions:
+            while True:
+                cursor.execute(f'''
+                    DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache WHERE {condition} LIMIT ?)
+                ''', (value, batch_size))
+                self.conn.commit()
+                pruned += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    break
+
+        # executescript steps the pragma to completion; a plain execute frees a single page.
+        self.conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+        db_size, free_size = self.get_db_size()
+        return {'pruned': pruned, 'duration': time.time() - start_time, 'db_size': db_size, 'free_size': free_size}
+
+    def has_incremental_auto_vacuum(self):
+        return self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+
+    def enable_incremental_auto_vacuum(self):
+        """
+        Convert a database created without incremental auto vacuum. This rewrites the whole file with VACUUM,
+        so it is a maintenance step run on the writer thread, never at startup.
+        """
+        if self.has_incremental_auto_vacuum():
+            return
+        start_time = time.time()
+        bt.logging.info(f"converting {self.db_path} to incremental auto vacuum.")
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.execute("VACUUM")
+        bt.logging.info(f"converted {self.db_path} to incremental auto vacuum in {time.time() - start_time:.1f}s")
+
     def close(self):
-        self.conn.close()
+        with self.connections_lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+
+class CacheWriter:
+    """Write-behind queue that persists miner responses to the cache database on its own thread."""
+
+    def __init__(self, vali_uid=None, vali_hotkey=None, db_path=CACHE_DB_PATH, flush_size=500, flush_interval=5,
+                 max_queue_size=100000, ttl=DEFAULT_TTL, keep_epochs=0, retention_interval=600,
+                 prune_batch_size=1000, vacuum_pages=1000, convert_auto_vacuum=False):
+        self.vali_uid = vali_uid
+        self.vali_hotkey = vali_hotkey
+        self.db_path = db_path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.should_exit = False
+        self.thread = None
+
+        # retention runs on the writer thread so there is only ever one writer on the database.
+        self.ttl = ttl
+        self.keep_epochs = keep_epochs
+        self.retention_interval = retention_interval
+        self.prune_batch_size = prune_batch_size
+        self.vacuum_pages = vacuum_pages
+        self.convert_auto_vacuum = convert_auto_vacuum
+        self.latest_epoch_num = None
+        self.last_retention_stats = {}
+
+        # backpressure metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.max_queue_depth = 0
+        self.last_flush_duration = 0.0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='cache-writer', daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=30):
+        self.should_exit = True
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def submit(self, syns, block_num=0, cycle_num=0, epoch_num=0):
+        """Queue synapses for saving without blocking the caller. Returns the number of dropped synapses."""
+        if self.should_exit:
+            # the writer thread has drained the queue and exited, so nothing queued now would ever be saved.
+            self.dropped += len(syns)
+            bt.logging.warning(f"cache writer is stopped. dropped {len(syns)} responses.")
+            return len(syns)
+        dropped = 0
+        for syn in syns:
+            try:
+                self.queue.put_nowait((syn, block_num, cycle_num, epoch_num))
+            except queue.Full:
+                dropped += 1
+        self.enqueued += len(syns) - dropped
+        self.dropped += dropped
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        if dropped:
+            bt.logging.warning(f"cache writer queue is full. dropped {dropped} responses. {self.get_stats()}")
+        return dropped
+
+    def get_stats(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'flushes': self.flushes,
+            'last_flush_duration': self.last_flush_duration,
+            **{f'retention_{key}': value for key, value in self.last_retention_stats.items()},
+        }
+
+    def flush(self, cache: QueryResponseCache, items):
+        start_time = time.time()
+        block_to_syns = defaultdict(list)
+        for syn, block_num, cycle_num, epoch_num in items:
+            block_to_syns[(block_num, cycle_num, epoch_num)].append(syn)
+        for (block_num, cycle_num, epoch_num), syns in block_to_syns.items():
+            cache.set_cache_in_batch(syns, ttl=self.ttl, block_num=block_num, cycle_num=cycle_num,
+                                     epoch_num=epoch_num)
+            self.latest_epoch_num = max(self.latest_epoch_num or 0, epoch_num)
+        self.written += len(items)
+        self.flushes += 1
+        self.last_flush_duration = time.time() - start_time
+        bt.logging.debug(f"saved {len(items)} responses in {self.last_flush_duration}s. {self.get_stats()}")
+
+    def apply_retention(self, cache: QueryResponseCache):
+        min_epoch_num = None
+        if self.keep_epochs and self.latest_epoch_num is not None:
+            min_epoch_num = self.latest_epoch_num - self.keep_epochs
+        self.last_retention_stats = cache.prune(min_epoch_num=min_epoch_num, batch_size=self.prune_batch_size,
+                                                vacuum_pages=self.vacuum_pages)
+        stats = self.last_retention_stats
+        bt.logging.info(f"pruned {stats['pruned']} cached responses in {stats['duration']:.3f}s. "
+                        f"cache db size is {stats['db_size'] / 2 ** 20:.1f} MiB "
+                        f"({stats['free_size'] / 2 ** 20:.1f} MiB free)")
+
+    def run(self):
+        cache = QueryResponseCache(db_path=self.db_path)
+        cache.set_vali_info(vali_uid=self.vali_uid, vali_hotkey=self.vali_hotkey)
+        if self.convert_auto_vacuum:
+            # responses queue up meanwhile and are flushed once the conversion is done.
+            try:
+                cache.enable_incremental_auto_vacuum()
+            except Exception as err:
+                bt.logging.error(f"failed to convert cache database to incremental auto vacuum: {err}")
+        items = []
+        deadline = time.monotonic() + self.flush_interval
+        next_retention = time.monotonic()
+        while not self.should_exit or not self.queue.empty():
+            try:
+                items.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0.01)))
+            except queue.Empty:
+                pass
+            if (len(items) >= self.flush_size or time.monotonic() >= deadline
+                    or (self.should_exit and self.queue.empty())):
+                if items:
+                    try:
+                        self.flush(cache, items)
+                    except Exception as err:
+                        bt.logging.error(f"failed to save {len(items)} responses: {err} {traceback.format_exc()}")
+                    items = []
+                deadline = time.monotonic() + self.flush_interval
+            if self.retention_interval and time.monotonic() >= next_retention and not self.should_exit:
+                try:
+                    self.apply_retention(cache)
+                except Exception as err:
+                    bt.logging.error(f"failed to prune cache database: {err} {traceback.format_exc()}")
+                next_retention = time.monotonic() + self.retention_interval
+        cache.close()
 
 
 cache_service = QueryResponseCache()
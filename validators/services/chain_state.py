@@ -0,0 +1,111 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from functools import partial
+
+import bittensor as bt
+from substrateinterface import SubstrateInterface
+
+
+class ChainStateCache:
+    """
+    Reads watched storage items at the chain head and memoizes each one for its own ttl. All items that have
+    gone stale are refreshed together with a single query_multi call, so slow-changing items like Tempo
+    cost a round trip every few minutes instead of one per block.
+    """
+
+    def __init__(self, chain_endpoint, ttl=60, executor=None):
+        self.chain_endpoint = chain_endpoint
+        self.ttl = ttl
+        # a single worker keeps every substrate call off the event loop and serialized on one connection.
+        self.executor = executor or concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                                          thread_name_prefix='chain-state')
+        self.node = SubstrateInterface(url=chain_endpoint)
+        self.key_to_ttl = {}
+        self.key_to_storage_key = {}
+        # key -> (expiry time, value)
+        self.entries = {}
+        self.pending = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rpc_calls = 0
+
+    def watch(self, module, method, params=None, ttl=None):
+        key = (module, method, tuple(params or ()))
+        self.key_to_ttl[key] = self.ttl if ttl is None else ttl
+        return key
+
+    def invalidate(self, key=None):
+        """Drop the memoized value of key, or of every item, so the next read fetches it."""
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'rpc_calls': self.rpc_calls,
+                'hit_rate': self.hits / total if total else 0.0}
+
+    def _query_multi(self, keys):
+        storage_keys = []
+        for key in keys:
+            if key not in self.key_to_storage_key:
+                module, method, params = key
+                self.key_to_storage_key[key] = self.node.create_storage_key(module, method, list(params))
+            storage_keys.append(self.key_to_storage_key[key])
+        self.rpc_calls += 1
+        results = self.node.query_multi(storage_keys)
+        return {key: obj.value for key, (_, obj) in zip(keys, results)}
+
+    def read_sync(self, keys=None):
+        """Fetch keys (every watched item by default) from the chain head, bypassing the cache."""
+        keys = list(self.key_to_ttl) if keys is None else keys
+        with self.lock:
+            try:
+                return self._query_multi(keys)
+            except Exception as err:
+                bt.logging.error(f"chain state query failed: {err}. reconnecting to {self.chain_endpoint}")
+                try:
+                    self.node.close()
+                except Exception:
+                    pass
+                self.node = SubstrateInterface(url=self.chain_endpoint)
+                self.key_to_storage_key = {}
+                return self._query_multi(keys)
+
+    def get_stale_keys(self):
+        now = time.monotonic()
+        return [key for key in self.key_to_ttl if key not in self.entries or self.entries[key][0] <= now]
+
+    def store(self, keys, future):
+        # runs on the event loop as soon as the read finishes, before any reader waiting on it resumes.
+        self.pending = None
+        if future.cancelled() or future.exception() is not None:
+            return
+        now = time.monotonic()
+        for key, value in future.result().items():
+            self.entries[key] = (now + self.key_to_ttl.get(key, self.ttl), value)
+
+    async def read(self):
+        """Every watched value. Items older than their ttl are refreshed with one query_multi."""
+        stale = self.get_stale_keys()
+        while stale and self.pending is not None:
+            # another reader is fetching already. wait for it, then only fetch what is still stale.
+            await asyncio.shield(self.pending)
+            stale = self.get_stale_keys()
+        if stale:
+            self.misses += 1
+            self.pending = asyncio.get_running_loop().run_in_executor(self.executor, self.read_sync, stale)
+            self.pending.add_done_callback(partial(self.store, stale))
+            await asyncio.shield(self.pending)
+        else:
+            self.hits += 1
+        return {key: self.entries[key][1] for key in self.key_to_ttl}
+
+    async def get(self, module, method, params=None):
+        key = self.watch(module, method, params)
+        values = await self.read()
+        return values[key]
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+import bittensor as bt
+
+
+def normalize_prompt(prompt: str) -> str:
+    # the CLIP tokenizer lowercases and collapses whitespace, so these variants embed identically.
+    return " ".join(str(prompt).lower().split())
+
+
+class PromptEmbeddingCache:
+    """
+    LRU cache of prompt text embeddings keyed by the hash of the normalized prompt, optionally backed by
+    one .npy file per prompt in cache_dir so embeddings survive restarts.
+
+    It behaves like the mapping compute_embedding_similarities expects (get / __setitem__) and is safe
+    to use from the scoring thread while the event loop reads its stats.
+    """
+
+    def __init__(self, max_entries=4096, cache_dir=None, namespace='xclip'):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_entries=None, cache_dir=None, namespace=None):
+        with self.lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if cache_dir is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                self.cache_dir = cache_dir
+            if namespace is not None and namespace != self.namespace:
+                # embeddings of another model are useless.
+                self.namespace = namespace
+                self.entries.clear()
+            self._evict()
+
+    def get_key(self, prompt):
+        # the namespace (model source) is part of the key so a model change never reuses stale files.
+        return hashlib.sha256(f"{self.namespace}\0{normalize_prompt(prompt)}".encode('utf-8')).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def get(self, prompt, default=None):
+        key = self.get_key(prompt)
+        with self.lock:
+            embedding = self.entries.get(key)
+            if embedding is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+        embedding = self._load(key)
+        with self.lock:
+            if embedding is None:
+                self.misses += 1
+                return default
+            self.disk_hits += 1
+            self._put(key, embedding)
+        return embedding
+
+    def __setitem__(self, prompt, embedding):
+        key = self.get_key(prompt)
+        # clone: on CPU, detach().cpu() is still a view of the whole batch tensor the row came from.
+        embedding = embedding.detach().cpu().clone()
+        with self.lock:
+            self._put(key, embedding)
+        self._store(key, embedding)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _put(self, key, embedding):
+        self.entries[key] = embedding
+        self.entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self.get_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return torch.from_numpy(np.load(path))
+        except Exception as err:
+            bt.logging.debug(f"ignoring unreadable embedding file {path}: {err}")
+            return None
+
+    def _store(self, key, embedding):
+        if not self.cache_dir:
+            return
+        path = self.get_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, embedding.numpy())
+            os.replace(tmp_path, path)
+        except OSError as err:
+            bt.logging.debug(f"failed to persist embedding to {path}: {err}")
+
+    def get_stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,129 @@
+import numpy as np
+
+from validators.services.query_record import QueryRecord
+
+QUERY_TYPES = ('synthetic', 'organic')
+COLUMN_DTYPES = {
+    'uids': np.int32,
+    'provider_ids': np.int32,
+    'model_ids': np.int32,
+    'validator_type_ids': np.int16,
+    'query_type_ids': np.int8,
+    'timestamps': np.float64,
+    'process_times': np.float32,
+}
+
+
+class Vocabulary:
+    """Interns strings to small ints. Shared between the buffers of consecutive epochs so ids stay stable."""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def get_id(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.ids[value] = value_id
+            self.values.append(value)
+        return value_id
+
+    def __getitem__(self, value_id):
+        return self.values[value_id]
+
+
+class QueryBuffer:
+    """
+    Append-only, columnar buffer of the queries and responses of one epoch.
+
+    Scalar fields live in typed numpy columns and the synapse / response objects in two lists indexed by
+    row, so a buffered query costs a few bytes plus its payload, and the end of an epoch swaps in an
+    empty buffer (empty_like) instead of copying the accumulated one.
+    """
+
+    def __init__(self, capacity=1024, providers: Vocabulary = None, models: Vocabulary = None):
+        self.capacity = capacity
+        self.size = 0
+        self.providers = providers or Vocabulary()
+        self.models = models or Vocabulary()
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMN_DTYPES.items()}
+        self.synapses = []
+        self.responses = []
+
+    def empty_like(self):
+        return QueryBuffer(self.capacity, providers=self.providers, models=self.models)
+
+    def __len__(self):
+        return self.size
+
+    def column(self, name) -> np.ndarray:
+        """View of the filled part of a column."""
+        return self.columns[name][:self.size]
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            grown = np.empty(self.capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def append(self, uid, synapse, response, query_type, timestamp, validator_type_id, process_time=None):
+        if uid is None:
+            raise ValueError("can't buffer a query without a uid")
+        if self.size == self.capacity:
+            self._grow()
+        row = self.size
+        columns = self.columns
+        columns['uids'][row] = uid
+        columns['provider_ids'][row] = self.providers.get_id(synapse.provider)
+        columns['model_ids'][row] = self.models.get_id(synapse.model)
+        columns['validator_type_ids'][row] = validator_type_id
+        columns['query_type_ids'][row] = QUERY_TYPES.index(query_type)
+        columns['timestamps'][row] = timestamp
+        columns['process_times'][row] = np.nan if process_time is None else process_time
+        self.synapses.append(synapse)
+        self.responses.append(response)
+        self.size += 1
+        return row
+
+    def __getitem__(self, row) -> QueryRecord:
+        if not 0 <= row < self.size:
+            raise IndexError("query buffer index out of range")
+        return QueryRecord(uid=int(self.columns['uids'][row]), synapse=self.synapses[row],
+                           response=self.responses[row],
+                           query_type=QUERY_TYPES[self.columns['query_type_ids'][row]],
+                           timestamp=float(self.columns['timestamps'][row]),
+                           validator_type_id=int(self.columns['validator_type_ids'][row]))
+
+    def __iter__(self):
+        return (self[row] for row in range(self.size))
+
+    def group_keys(self):
+        """One int64 key per row, equal for rows of the same (validator type, uid, provider, model)."""
+        columns = [self.column(name).astype(np.int64)
+                   for name in ('validator_type_ids', 'uids', 'provider_ids', 'model_ids')]
+        # mixed radix over the id ranges actually present, so no vocabulary size can make two groups collide.
+        keys = np.zeros(self.size, dtype=np.int64)
+        key_range = 1
+        for column in columns:
+            radix = int(column.max()) + 1 if self.size else 1
+            key_range *= radix
+            if key_range > np.iinfo(np.int64).max:
+                return np.unique(np.stack(columns, axis=1), axis=0, return_inverse=True)[1].ravel()
+            keys = keys * radix + column
+        return keys
+
+    def sample_per_group(self, k, rng: np.random.Generator = None):
+        """
+        Pick k rows with replacement from every (validator type, uid, provider, model) group.
+        Returns an (n_groups, k) array of row indices and the validator type id of each group.
+        """
+        if not self.size:
+            return np.empty((0, k), dtype=np.int64), np.empty(0, dtype=np.int16)
+        rng = rng or np.random.default_rng()
+        _, inverse, counts = np.unique(self.group_keys(), return_inverse=True, return_counts=True)
+        order = np.argsort(inverse, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        picks = order[starts[:, None] + (rng.random((len(counts), k)) * counts[:, None]).astype(np.int64)]
+        return picks, self.column('validator_type_ids')[order[starts]]
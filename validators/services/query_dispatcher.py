@@ -0,0 +1,97 @@
+import asyncio
+import time
+import traceback
+from collections import defaultdict, deque
+
+import bittensor as bt
+
+
+class DispatchStats:
+    def __init__(self):
+        self.total = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.max_latency = 0.0
+        self.uid_to_latency = defaultdict(float)
+        self.start_time = time.time()
+        self.elapsed = 0.0
+
+    def record(self, uid, latency, ok):
+        if ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self.max_latency = max(self.max_latency, latency)
+        self.uid_to_latency[uid] += latency
+
+    def to_dict(self):
+        slowest_uid = max(self.uid_to_latency, key=self.uid_to_latency.get) if self.uid_to_latency else None
+        return {
+            'total': self.total,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'elapsed': self.elapsed,
+            'max_latency': self.max_latency,
+            'slowest_uid': slowest_uid,
+            'slowest_uid_busy_time': self.uid_to_latency.get(slowest_uid, 0.0),
+        }
+
+
+class QueryDispatcher:
+    """
+    Feeds (uid, synapse) tasks to miners as slots free up instead of in batches.
+
+    Every uid gets its own lane of at most max_in_flight_per_miner workers pulling from that uid's queue,
+    and every request also holds a slot of the global semaphore, so a slow miner only delays its own lane.
+    """
+
+    def __init__(self, max_concurrency=10000, max_in_flight_per_miner=50):
+        self.max_in_flight_per_miner = max_in_flight_per_miner
+        self.global_semaphore = asyncio.Semaphore(max_concurrency)
+        self.uid_semaphores = {}
+        self.last_stats: DispatchStats = None
+
+    def get_uid_semaphore(self, uid):
+        semaphore = self.uid_semaphores.get(uid)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_in_flight_per_miner)
+            self.uid_semaphores[uid] = semaphore
+        return semaphore
+
+    async def _lane_worker(self, query_fn, uid, queue: deque, stats: DispatchStats):
+        uid_semaphore = self.get_uid_semaphore(uid)
+        while queue:
+            item = queue.popleft()
+            async with uid_semaphore, self.global_semaphore:
+                start_time = time.time()
+                try:
+                    await query_fn(uid, item)
+                except Exception as err:
+                    bt.logging.error(f"query to uid {uid} failed: {err} {traceback.format_exc()}")
+                    stats.record(uid, time.time() - start_time, ok=False)
+                else:
+                    stats.record(uid, time.time() - start_time, ok=True)
+
+    async def run(self, query_fn, uid_items):
+        """Run query_fn(uid, item) for every (uid, item) pair and return the stats of this run."""
+        stats = DispatchStats()
+        uid_to_queue = defaultdict(deque)
+        for uid, item in uid_items:
+            stats.total += 1
+            if uid is None:
+                stats.skipped += 1
+                continue
+            uid_to_queue[uid].append(item)
+
+        workers = []
+        for uid, queue in uid_to_queue.items():
+            for _ in range(min(self.max_in_flight_per_miner, len(queue))):
+                workers.append(self._lane_worker(query_fn, uid, queue, stats))
+        await asyncio.gather(*workers)
+
+        stats.elapsed = time.time() - stats.start_time
+        self.last_stats = stats
+        bt.logging.debug(f"dispatched queries to {len(uid_to_queue)} miners: {stats.to_dict()}")
+        return stats
@@ -0,0 +1,16 @@
+class QueryRecord:
+    """One buffered query and its response, waiting to be scored at the end of the epoch."""
+    __slots__ = ('uid', 'synapse', 'response', 'query_type', 'timestamp', 'validator_type_id')
+
+    def __init__(self, uid, synapse, response, query_type, timestamp, validator_type_id):
+        self.uid = uid
+        self.synapse = synapse
+        self.response = response
+        self.query_type = query_type
+        self.timestamp = timestamp
+        # index into WeightSetter.validators instead of a per-record validator instance.
+        self.validator_type_id = validator_type_id
+
+    def __repr__(self):
+        return (f"QueryRecord(uid={self.uid}, query_type={self.query_type}, timestamp={self.timestamp}, "
+                f"validator_type_id={self.validator_type_id})")
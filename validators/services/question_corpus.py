@@ -0,0 +1,114 @@
+import asyncio
+import os
+import time
+
+import numpy as np
+import bittensor as bt
+
+from validators.utils import fetch_entire_questions
+
+CORPUS_MAGIC = b'RYNOQSTN'
+CORPUS_VERSION = 1
+# magic (8 bytes) | version (uint32) | reserved (uint32) | count (uint64)
+HEADER_SIZE = 24
+MIN_QUESTIONS_CNT = 10000
+
+
+class CorpusSnapshot:
+    """
+    Read-only, memory-mapped question list.
+
+    After the header the file holds count + 1 little-endian uint64 offsets followed by one UTF-8 blob,
+    so opening a snapshot costs one mmap and a question is decoded only when it is picked.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+        header = bytes(self.data[:HEADER_SIZE])
+        if header[:8] != CORPUS_MAGIC:
+            raise ValueError(f"{path} is not a question corpus file")
+        self.version = int.from_bytes(header[8:12], 'little')
+        if self.version != CORPUS_VERSION:
+            raise ValueError(f"unsupported question corpus version {self.version} in {path}")
+        self.count = int.from_bytes(header[16:24], 'little')
+        self.offsets = np.frombuffer(self.data, dtype='<u8', count=self.count + 1, offset=HEADER_SIZE)
+        self.blob_start = HEADER_SIZE + 8 * (self.count + 1)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("question index out of range")
+        start = self.blob_start + int(self.offsets[index])
+        end = self.blob_start + int(self.offsets[index + 1])
+        return bytes(self.data[start:end]).decode('utf-8')
+
+    @staticmethod
+    def write(path, questions):
+        """Write questions to path atomically: readers see either the old or the new file, never a partial one."""
+        encoded = [question.encode('utf-8') for question in questions]
+        offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        header = (CORPUS_MAGIC + CORPUS_VERSION.to_bytes(4, 'little') + bytes(4)
+                  + len(encoded).to_bytes(8, 'little'))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(offsets.tobytes())
+            f.write(b''.join(encoded))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+class QuestionCorpus:
+    """Synthetic questions served from a local snapshot that can be refreshed in the background."""
+
+    def __init__(self, path, min_count=MIN_QUESTIONS_CNT):
+        self.path = path
+        self.min_count = min_count
+        self.snapshot: CorpusSnapshot = None
+
+    def __len__(self):
+        return len(self.snapshot) if self.snapshot is not None else 0
+
+    def __getitem__(self, index):
+        return self.snapshot[index]
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            start_time = time.time()
+            self.snapshot = CorpusSnapshot(self.path)
+        except Exception as err:
+            bt.logging.error(f"failed to load question corpus from {self.path}: {err}")
+            return False
+        bt.logging.info(f"loaded {len(self.snapshot)} questions from {self.path} in {time.time() - start_time:.3f}s")
+        return True
+
+    async def refresh(self, concurrency=16, max_retries=3):
+        """Download the questions again and swap in the new snapshot if enough of them came back."""
+        questions = await fetch_entire_questions(concurrency=concurrency, max_retries=max_retries)
+        if len(questions) < self.min_count:
+            bt.logging.error(f"refreshing questions failed. only {len(questions)} questions were fetched.")
+            return False
+        await asyncio.to_thread(CorpusSnapshot.write, self.path, questions)
+        # assigning the attribute swaps the snapshot atomically for readers on the event loop.
+        self.snapshot = await asyncio.to_thread(CorpusSnapshot, self.path)
+        bt.logging.info(f"question corpus refreshed with {len(self.snapshot)} questions.")
+        return True
+
+    async def refresh_periodically(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception as err:
+                bt.logging.error(f"failed to refresh question corpus: {err}")
@@ -0,0 +1,62 @@
+import torch
+
+
+def resize_tensor(tensor: torch.Tensor, size) -> torch.Tensor:
+    """Zero-pad or truncate a 1-d tensor to size."""
+    if len(tensor) >= size:
+        return tensor[:size].clone()
+    resized = torch.zeros(size, dtype=tensor.dtype)
+    resized[:len(tensor)] = tensor
+    return resized
+
+
+class ScoreAccumulator:
+    """
+    Per-uid score sums and counts of the current epoch, held in tensors indexed by uid so that they line
+    up with metagraph.uids. Only uids marked available by reset() accumulate scores.
+    """
+
+    def __init__(self, size=0):
+        self.sums = torch.zeros(size, dtype=torch.float64)
+        self.counts = torch.zeros(size, dtype=torch.int64)
+        self.available = torch.zeros(size, dtype=torch.bool)
+
+    def __len__(self):
+        return len(self.sums)
+
+    def resize(self, size):
+        self.sums = resize_tensor(self.sums, size)
+        self.counts = resize_tensor(self.counts, size)
+        self.available = resize_tensor(self.available, size)
+
+    def reset(self, available_uids, size=None):
+        """Start a new epoch for available_uids, growing the tensors to size (the metagraph size) if needed."""
+        size = max(size or 0, len(self), max(available_uids, default=-1) + 1)
+        self.sums = torch.zeros(size, dtype=torch.float64)
+        self.counts = torch.zeros(size, dtype=torch.int64)
+        self.available = torch.zeros(size, dtype=torch.bool)
+        if available_uids:
+            self.available[torch.tensor(list(available_uids), dtype=torch.long)] = True
+
+    def add(self, uid_to_score: dict):
+        """Add one score per uid; scores of unavailable uids are ignored."""
+        if not uid_to_score:
+            return
+        uids = torch.tensor(list(uid_to_score.keys()), dtype=torch.long)
+        scores = torch.tensor(list(uid_to_score.values()), dtype=torch.float64)
+        if int(uids.max()) >= len(self):
+            self.resize(int(uids.max()) + 1)
+        keep = self.available[uids]
+        uids = uids[keep]
+        self.sums.index_add_(0, uids, scores[keep])
+        self.counts.index_add_(0, uids, torch.ones(len(uids), dtype=torch.int64))
+
+    def averages(self, size=None) -> torch.Tensor:
+        """Average score per uid (0 for uids without scores) as a float tensor of length size."""
+        averages = (self.sums / self.counts.clamp(min=1)).float()
+        return averages if size is None else resize_tensor(averages, size)
+
+    def summary(self):
+        scored = self.counts > 0
+        return {uid: round(score, 4) for uid, score in
+                zip(scored.nonzero().flatten().tolist(), self.averages()[scored].tolist())}
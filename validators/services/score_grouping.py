@@ -0,0 +1,36 @@
+import numpy as np
+
+
+def encode_keys(uids: np.ndarray, provider_model_ids: np.ndarray) -> np.ndarray:
+    """Pack (uid, interned (provider, model) id) into one int64 per row."""
+    return (uids.astype(np.int64) << 32) | provider_model_ids.astype(np.int64)
+
+
+def group_in_order_of_appearance(keys: np.ndarray):
+    """
+    Group equal keys in a single np.unique pass, numbering groups by first appearance like dict insertion order.
+    Returns (first row of each group, group index of each row).
+    """
+    _, first_rows, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first_rows, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return first_rows[order], rank[inverse.ravel()]
+
+
+def average_scores_by_group(uids, provider_model_ids, scores):
+    """
+    Average scores per (uid, provider, model).
+    Returns (first row of each group, average score of each group, group index of each row).
+    """
+    first_rows, inverse = group_in_order_of_appearance(encode_keys(uids, provider_model_ids))
+    # bincount adds rows in order, so every average matches sum(scores) / len(scores) exactly.
+    avg_scores = np.bincount(inverse, weights=scores) / np.bincount(inverse)
+    return first_rows, avg_scores, inverse
+
+
+def sum_by_uid(uids: np.ndarray, values: np.ndarray) -> dict:
+    """Sum values per uid, adding them in row order."""
+    first_rows, inverse = group_in_order_of_appearance(uids)
+    sums = np.bincount(inverse, weights=values)
+    return dict(zip(uids[first_rows].tolist(), sums.tolist()))
@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+from collections import deque
+
+import bittensor as bt
+from rich.console import Console
+from rich.table import Table
+
+REPORT_MODES = ('table', 'jsonl', 'off')
+
+
+class ScoreReporter:
+    """
+    Renders score tables on a background thread so scoring never waits on terminal or file I/O.
+
+    report() only appends to a bounded ring buffer. The renderer wakes up at most once per min_interval,
+    keeps the latest report of every validator type and prints it as a rich table or appends its rows
+    to a JSON lines file. When the buffer is full the oldest reports are dropped and counted.
+    """
+
+    def __init__(self, mode='table', jsonl_path=None, min_interval=60, max_pending=64):
+        self.mode = mode
+        self.jsonl_path = jsonl_path
+        self.min_interval = min_interval
+        self.pending = deque(maxlen=max_pending)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.should_exit = threading.Event()
+        self.thread: threading.Thread = None
+        self.last_render_time = 0.0
+        self.reported = 0
+        self.rendered = 0
+        self.dropped = 0
+
+    def configure(self, mode=None, jsonl_path=None, min_interval=None):
+        if mode is not None:
+            if mode not in REPORT_MODES:
+                raise ValueError(f"unknown score report mode {mode}. use one of {REPORT_MODES}")
+            self.mode = mode
+        if jsonl_path is not None:
+            self.jsonl_path = jsonl_path
+        if min_interval is not None:
+            self.min_interval = min_interval
+        if self.mode == 'jsonl' and not self.jsonl_path:
+            raise ValueError("score report mode jsonl needs a path")
+
+    def report(self, validator_type, table_data):
+        """Queue a score table (header row first) without blocking."""
+        if self.mode == 'off':
+            return
+        with self.lock:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append((time.time(), validator_type, table_data))
+            self.reported += 1
+        if self.thread is None:
+            self.start()
+        self.wakeup.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='score-reporter', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        """Render whatever is pending, ignoring the rate limit, and stop the thread."""
+        if self.thread is None:
+            return
+        self.should_exit.set()
+        self.wakeup.set()
+        self.thread.join(timeout)
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            # rate limit: let reports pile up (and coalesce) until min_interval has passed. stop() cuts it short.
+            self.should_exit.wait(max(0.0, self.last_render_time + self.min_interval - time.time()))
+            self.wakeup.clear()
+            with self.lock:
+                reports = list(self.pending)
+                self.pending.clear()
+
+            latest = {}
+            for report in reports:
+                latest[report[1]] = report
+            for timestamp, validator_type, table_data in latest.values():
+                try:
+                    self.render(timestamp, validator_type, table_data)
+                    self.rendered += 1
+                except Exception as err:
+                    bt.logging.error(f"failed to render {validator_type} scores: {err}")
+            self.last_render_time = time.time()
+            if self.should_exit.is_set():
+                return
+
+    def render(self, timestamp, validator_type, table_data):
+        header, rows = table_data[0], sorted(table_data[1:], key=lambda row: row[0])
+        if self.mode == 'jsonl':
+            with open(self.jsonl_path, 'a') as f:
+                for row in rows:
+                    f.write(json.dumps({'timestamp': timestamp, 'validator': validator_type,
+                                        **dict(zip(header, row))}) + '\n')
+            return
+
+        table = Table(title=f"All Weights ({validator_type})")
+        for col in header:
+            table.add_column(col)
+        for row in rows:
+            table.add_row(*[str(item) for item in row])
+        Console().print(table)
+
+    def get_stats(self):
+        return {'reported': self.reported, 'rendered': self.rendered, 'dropped': self.dropped,
+                'pending': len(self.pending)}
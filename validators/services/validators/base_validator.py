@@ -2,22 +2,31 @@ from abc import abstractmethod
 import asyncio
 from collections import defaultdict
 
-from ryno import StreamPrompting
-from rich.table import Table
-from rich.console import Console
+from ryno import VIDEO_SYNAPSE_TYPE
 
 import random
 from typing import Tuple
 
+import numpy as np
+
 import bittensor as bt
 
 from ryno.metaclasses import ValidatorRegistryMeta
+from validators.services.query_buffer import Vocabulary
+from validators.services.score_grouping import average_scores_by_group, sum_by_uid
+from validators.services.embedding_cache import PromptEmbeddingCache
+from validators.services.score_reporter import ScoreReporter
 from validators.utils import error_handler, get_bandwidth
 
 dataset = None
 
 
 class BaseValidator(metaclass=ValidatorRegistryMeta):
+    # shared by every validator type so a prompt's text embedding is computed once per process.
+    text_embedding_cache = PromptEmbeddingCache()
+    # score tables are rendered off the scoring path.
+    score_reporter = ScoreReporter()
+
     def __init__(self, config, metagraph):
         self.config = config
         self.metagraph = metagraph
@@ -104,80 +113,53 @@ class BaseValidator(metaclass=ValidatorRegistryMeta):
         return uid_scores_dict, scored_response, uid_to_query_resps
 
     def get_uid_to_scores_dict(self, uid_to_query_resps, scored_responses: tuple[float], uid_to_capacity):
-        uid_provider_model_scores_dict = defaultdict(list)
-
-        # collect all scores per each uid, provider, model
-        for (uid, query_resp), scored_response in zip(uid_to_query_resps, scored_responses):
-            synapse: StreamPrompting = query_resp.get('query')
-            provider = synapse.provider
-            model = synapse.model
-            if scored_response is not None:
-                bt.logging.trace(f"scored response is {scored_response} for uid {uid} for provider {provider} "
-                                 f"and for model {model}")
-                uid_provider_model_scores_dict[f"{uid}::{provider}::{model}"].append((float(scored_response), synapse))
-            else:
-                uid_provider_model_scores_dict[f"{uid}::{provider}::{model}"].append((0, synapse))
-
-        # get avg score value for each uid, provider, model
-        uid_provider_model_scores_avg_dict = {}
-        for key, score_syns in uid_provider_model_scores_dict.items():
-            if len(score_syns) == 0:
-                bt.logging.debug(f"no scores found for this uid {key}")
-            scores = [item[0] for item in score_syns]
-            syns = [item[1] for item in score_syns]
-            avg_score = sum(scores) / len(scores)
-            uid_provider_model_scores_avg_dict[key] = (avg_score, syns)
-
-        # apply weight for each model and calculate score based on weight of models.
         uid_scores_dict = defaultdict(float)
-        table_data = [
-            ["uid", "provider", "model", 'similarity', 'weight', 'bandwidth', 'weighted_score']
-        ]
-        for key, avg_score_syns in uid_provider_model_scores_avg_dict.items():
-            avg_score, syns = avg_score_syns
-            uid = int(str(key).split("::")[0])
-            provider = str(key).split("::")[1]
-            model = str(key).split("::")[2]
-            model_weight = 1
-            #if model_weight is None:
-            #    bt.logging.debug(f"no weight found for this provider {provider} and model {model}")
-            #    model_weight = 0
+        if not uid_to_query_resps:
+            validator_type = self.__class__.__name__
+            bt.logging.debug(f"{validator_type} scores is {uid_scores_dict}")
+            return uid_scores_dict
 
-            band_width = get_bandwidth(uid_to_capacity, uid, provider, model)
+        # encode (uid, provider, model) as integers and group them in one pass.
+        provider_models = Vocabulary()
+        syns = [query_resp.get('query') for _, query_resp in uid_to_query_resps]
+        uids = np.array([uid for uid, _ in uid_to_query_resps], dtype=np.int64)
+        provider_model_ids = np.array([provider_models.get_id((syn.provider, syn.model)) for syn in syns],
+                                      dtype=np.int64)
+        scores = np.array([0 if score is None else float(score) for score in scored_responses], dtype=np.float64)
+        first_rows, avg_scores, group_of_row = average_scores_by_group(uids, provider_model_ids, scores)
 
+        # apply weight for each model and calculate score based on weight of models.
+        group_uids = uids[first_rows]
+        group_provider_models = [provider_models[provider_model_id]
+                                 for provider_model_id in provider_model_ids[first_rows].tolist()]
+        model_weight = 1
+        band_widths = np.ones(len(first_rows), dtype=np.float64)
+        for group, (uid, (provider, model)) in enumerate(zip(group_uids.tolist(), group_provider_models)):
+            band_width = get_bandwidth(uid_to_capacity, uid, provider, model)
             if band_width is None:
                 bt.logging.debug(f"no band_width found for this uid {uid}")
                 band_width = 1
-            weighted_score = avg_score * model_weight * band_width
-            uid_scores_dict[uid] += weighted_score
-            table_data.append([uid, provider, model, avg_score, model_weight, band_width, weighted_score])
-            for syn in syns:
-                syn: StreamPrompting
-                syn.similarity = avg_score
-                syn.score = weighted_score
+            band_widths[group] = band_width
+        weighted_scores = avg_scores * model_weight * band_widths
+        uid_scores_dict.update(sum_by_uid(group_uids, weighted_scores))
 
-        self.show_pretty_table_score(table_data)
+        row_similarities = avg_scores[group_of_row].tolist()
+        row_scores = weighted_scores[group_of_row].tolist()
+        for syn, similarity, score in zip(syns, row_similarities, row_scores):
+            syn: VIDEO_SYNAPSE_TYPE
+            syn.similarity = similarity
+            syn.score = score
 
-        if not len(uid_scores_dict):
-            validator_type = self.__class__.__name__
-            bt.logging.debug(f"{validator_type} scores is {uid_scores_dict}")
+        table_data = [
+            ["uid", "provider", "model", 'similarity', 'weight', 'bandwidth', 'weighted_score']
+        ]
+        for uid, (provider, model), avg_score, band_width, weighted_score in zip(
+                group_uids.tolist(), group_provider_models, avg_scores.tolist(), band_widths.tolist(),
+                weighted_scores.tolist()):
+            table_data.append([uid, provider, model, avg_score, model_weight, band_width, weighted_score])
+        self.score_reporter.report(self.__class__.__name__, table_data)
         return uid_scores_dict
 
-    @staticmethod
-    def show_pretty_table_score(table_data):
-        table = Table(title="All Weights")
-        header = table_data[0]
-        for col in header:
-            table.add_column(col)
-
-        rows = table_data[1:]
-        rows = sorted(rows, key=lambda x: x[0])
-        for row in rows:
-            renderable_list = [str(item) for item in row]
-            table.add_row(*renderable_list)
-        console = Console()
-        console.print(table)
-
     @classmethod
     def get_task_type(cls):
         pass
@@ -7,10 +7,15 @@ from ryno.protocol import VideoResponse
 from validators import utils
 from validators.utils import error_handler, save_or_get_answer_from_cache
 from ryno.utils import get_question
+from validators.services.validators.base_validator import BaseValidator
+from validators.services.video_scoring import VideoScoringPipeline
 import bittensor as bt
 
 
-class VideoValidator:
+class VideoValidator(BaseValidator):
+    # shared by every VideoValidator so responses from all miners are batched into the same forward passes.
+    scoring_pipeline = VideoScoringPipeline(text_embedding_cache=BaseValidator.text_embedding_cache)
+
     def __init__(self, config, metagraph=None):
         super().__init__(config, metagraph)
         self.num_uids_to_pick = 30
@@ -52,8 +57,8 @@ class VideoValidator:
         question = await get_question("videos", 1)
         return question
 
-    async def create_query(self, uid, provider=None, model=None) -> bt.Synapse:
-        question = await self.get_question()
+    async def create_query(self, uid, provider=None, model=None, prompt=None) -> bt.Synapse:
+        question = prompt or await self.get_question()
         syn = VideoResponse(messages=question, model=model, size=self.size, quality=self.quality,
                             style=self.style, provider=provider, seed=self.seed, steps=self.steps)
         bt.logging.info(f"uid = {uid}, syn = {syn}")
@@ -67,8 +72,11 @@ class VideoValidator:
         if response is None:
             bt.logging.trace(f"response is None. so return score with 0 for this uid {uid}.")
             return 0
-        # TODO
-        score = 0
+        video_url = response.get_video_url()
+        if not video_url:
+            bt.logging.trace(f"no video url in response. so return score with 0 for this uid {uid}.")
+            return 0
+        score = await self.scoring_pipeline.score(response.messages, video_url, uid)
         return score
 
     @save_or_get_answer_from_cache
@@ -0,0 +1,133 @@
+import asyncio
+import concurrent.futures
+import tempfile
+
+import aiohttp
+import bittensor as bt
+
+from ryno.reward import decode_sampled_frames
+from validators.utils import get_http_session
+
+MAX_VIDEO_BYTES = 64 * 2 ** 20
+CHUNK_SIZE = 256 * 2 ** 10
+SPOOL_MEMORY_BYTES = 8 * 2 ** 20
+
+
+class VideoTooLarge(Exception):
+    pass
+
+
+class ResponseStreamReader:
+    """
+    Blocking, non-seekable file object over an aiohttp response body, read by a decoder on a worker thread.
+
+    Every read() pulls at most one chunk from the event loop, so the bytes held per video are bounded by
+    the chunk size plus aiohttp's read buffer instead of the full body. There is deliberately no seek():
+    PyAV then opens the input as a stream.
+    """
+
+    def __init__(self, response: aiohttp.ClientResponse, loop, max_bytes, chunk_size, read_timeout):
+        self.response = response
+        self.loop = loop
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.read_timeout = read_timeout
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        size = self.chunk_size if size is None or size < 0 else min(size, self.chunk_size)
+        future = asyncio.run_coroutine_threadsafe(self.response.content.read(size), self.loop)
+        try:
+            chunk = future.result(self.read_timeout)
+        except concurrent.futures.TimeoutError:
+            # otherwise the read keeps waiting on the loop after the decoder has given up on it.
+            future.cancel()
+            raise
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_bytes:
+            raise VideoTooLarge(f"video is larger than {self.max_bytes} bytes")
+        return chunk
+
+
+class StreamingVideoDecoder:
+    """
+    Fetches miner videos over the shared HTTP session and decodes only the sampled frames while the body
+    is still downloading.
+
+    Containers that cannot be decoded as a stream (e.g. mp4 with the index at the end) are fetched again
+    into a spooled temp file that keeps at most spool_memory_bytes in memory and spills the rest to disk.
+    """
+
+    def __init__(self, max_video_bytes=MAX_VIDEO_BYTES, chunk_size=CHUNK_SIZE, max_concurrent=8,
+                 spool_memory_bytes=SPOOL_MEMORY_BYTES, read_timeout=30):
+        self.max_video_bytes = max_video_bytes
+        self.chunk_size = chunk_size
+        self.spool_memory_bytes = spool_memory_bytes
+        self.read_timeout = read_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.stats = {'decoded': 0, 'failed': 0, 'too_large': 0, 'spooled': 0, 'bytes_streamed': 0}
+
+    async def fetch_sampled_frames(self, url, num_frames):
+        """Return num_frames RGB frames of the video at url, or None if it can't be fetched or decoded."""
+        async with self.semaphore:
+            try:
+                try:
+                    frames = await self._decode_streaming(url, num_frames)
+                except VideoTooLarge:
+                    raise
+                except Exception as err:
+                    bt.logging.trace(f"streaming decode of {url} failed, retrying from a spooled file: {err}")
+                    self.stats['spooled'] += 1
+                    frames = await self._decode_spooled(url, num_frames)
+            except VideoTooLarge as err:
+                bt.logging.debug(f"skipping {url}: {err}")
+                self.stats['too_large'] += 1
+                return None
+            except Exception as err:
+                bt.logging.debug(f"couldn't decode video {url}: {err}")
+                self.stats['failed'] += 1
+                return None
+
+            if not frames:
+                self.stats['failed'] += 1
+                return None
+            self.stats['decoded'] += 1
+            return frames
+
+    async def _open(self, url) -> aiohttp.ClientResponse:
+        response = await get_http_session().get(url)
+        response.raise_for_status()
+        if response.content_length and response.content_length > self.max_video_bytes:
+            response.release()
+            raise VideoTooLarge(f"video is {response.content_length} bytes, the limit is {self.max_video_bytes}")
+        return response
+
+    async def _decode_streaming(self, url, num_frames):
+        response = await self._open(url)
+        reader = ResponseStreamReader(response, asyncio.get_running_loop(), self.max_video_bytes, self.chunk_size,
+                                      self.read_timeout)
+        try:
+            return await asyncio.to_thread(decode_sampled_frames, reader, num_frames)
+        finally:
+            self.stats['bytes_streamed'] += reader.bytes_read
+            # the decoder stops after the last sampled frame, so drop the connection instead of draining it.
+            response.close()
+
+    async def _decode_spooled(self, url, num_frames):
+        response = await self._open(url)
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_memory_bytes) as spool:
+            try:
+                size = 0
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    size += len(chunk)
+                    if size > self.max_video_bytes:
+                        raise VideoTooLarge(f"video is larger than {self.max_video_bytes} bytes")
+                    spool.write(chunk)
+            finally:
+                response.close()
+            self.stats['bytes_streamed'] += size
+            spool.seek(0)
+            return await asyncio.to_thread(decode_sampled_frames, spool, num_frames)
+
+    def get_stats(self):
+        return dict(self.stats)
@@ -0,0 +1,123 @@
+import time
+from collections import defaultdict
+
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+NUM_BANDS = 4
+BAND_BITS = HASH_BITS // NUM_BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def dhash(frame: np.ndarray) -> int:
+    """64-bit difference hash: the sign of the horizontal gradient on a 9x8 grayscale thumbnail."""
+    pixels = np.asarray(Image.fromarray(frame).convert('L').resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def compute_video_hashes(frames: list[np.ndarray]) -> np.ndarray:
+    return np.array([dhash(frame) for frame in frames], dtype=np.uint64)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    return np.unpackbits(values.view(np.uint8).reshape(*values.shape, 8), axis=-1).sum(axis=-1)
+
+
+class VideoHashIndex:
+    """
+    Ring buffer of per-frame dHashes of recently scored videos with a multi-index lookup.
+
+    Every 64-bit frame hash is split into NUM_BANDS bands, each with its own bucket table. Two hashes within
+    NUM_BANDS - 1 bits of each other share at least one band exactly, so a lookup only verifies the few
+    videos found in the query's buckets instead of scanning the whole index. A video matches when the
+    median Hamming distance over its sampled frames is at most max_distance.
+    """
+
+    def __init__(self, max_entries=20000, num_frames=8, max_distance=NUM_BANDS - 1):
+        self.max_entries = max_entries
+        self.num_frames = num_frames
+        self.max_distance = max_distance
+        self.hashes = np.zeros((max_entries, num_frames), dtype=np.uint64)
+        self.uids = np.full(max_entries, -1, dtype=np.int64)
+        self.payloads = [None] * max_entries
+        self.buckets = [defaultdict(set) for _ in range(NUM_BANDS)]
+        self.size = 0
+        self.next_slot = 0
+        self.lookups = 0
+        self.matches = 0
+        self.lookup_time = 0.0
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def get_bands(hash_value):
+        return [(hash_value >> (band * BAND_BITS)) & BAND_MASK for band in range(NUM_BANDS)]
+
+    def _unlink(self, slot):
+        for hash_value in set(self.hashes[slot].tolist()):
+            for band, band_value in enumerate(self.get_bands(hash_value)):
+                bucket = self.buckets[band].get(band_value)
+                if bucket is not None:
+                    bucket.discard(slot)
+                    if not bucket:
+                        del self.buckets[band][band_value]
+
+    def add(self, hashes: np.ndarray, uid, payload=None):
+        """Index a video's frame hashes; the oldest video is evicted once max_entries are held."""
+        if len(hashes) != self.num_frames:
+            return None
+        slot = self.next_slot
+        if self.size == self.max_entries:
+            self._unlink(slot)
+        else:
+            self.size += 1
+        self.next_slot = (slot + 1) % self.max_entries
+
+        self.hashes[slot] = hashes
+        self.uids[slot] = uid
+        self.payloads[slot] = payload
+        for hash_value in set(hashes.tolist()):
+            for band, band_value in enumerate(self.get_bands(hash_value)):
+                self.buckets[band][band_value].add(slot)
+        return slot
+
+    def set_payload(self, slot, payload):
+        self.payloads[slot] = payload
+
+    def lookup(self, hashes: np.ndarray):
+        """Return (uid, payload, median distance) of the closest indexed near-duplicate, or None."""
+        start_time = time.perf_counter()
+        self.lookups += 1
+        try:
+            if len(hashes) != self.num_frames or not self.size:
+                return None
+            candidates = set()
+            for hash_value in set(hashes.tolist()):
+                for band, band_value in enumerate(self.get_bands(hash_value)):
+                    bucket = self.buckets[band].get(band_value)
+                    if bucket:
+                        candidates.update(bucket)
+            if not candidates:
+                return None
+
+            slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            distances = np.median(popcount(self.hashes[slots] ^ hashes), axis=1)
+            best = int(np.argmin(distances))
+            if distances[best] > self.max_distance:
+                return None
+            self.matches += 1
+            slot = int(slots[best])
+            return int(self.uids[slot]), self.payloads[slot], float(distances[best])
+        finally:
+            self.lookup_time += time.perf_counter() - start_time
+
+    def get_stats(self):
+        return {
+            'entries': self.size,
+            'lookups': self.lookups,
+            'matches': self.matches,
+            'avg_lookup_ms': 1000 * self.lookup_time / self.lookups if self.lookups else 0.0,
+        }
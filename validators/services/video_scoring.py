@@ -0,0 +1,168 @@
+import asyncio
+import concurrent.futures
+import time
+import traceback
+from collections import defaultdict
+
+import torch
+import bittensor as bt
+
+from ryno.reward import compute_video_embeddings, compute_embedding_similarities, get_xclip_num_frames
+from validators.services.video_decoder import StreamingVideoDecoder
+from validators.services.video_dedup import VideoHashIndex, compute_video_hashes
+
+
+class VideoScoringPipeline:
+    """
+    Scores miner videos against their prompts with X-CLIP on CPU.
+
+    Concurrent score() calls are collected for batch_window seconds (or until max_batch_size) and the sampled
+    frames of the whole batch go through the model in a single forward pass. Videos whose frame hashes match
+    a recently scored video reuse its embedding instead. A match with a video from another uid is only flagged
+    as a possible copy: miners running the same model on the same prompt and seed can legitimately return
+    near-identical videos, and which one was scored first says nothing about who copied whom.
+    """
+
+    def __init__(self, max_batch_size=16, batch_window=0.05, num_frames=None, decoder=None,
+                 text_embedding_cache=None, dedup_max_entries=20000):
+        self.max_batch_size = max_batch_size
+        self.decoder = decoder or StreamingVideoDecoder()
+        self.batch_window = batch_window
+        self.num_frames = num_frames
+        # one worker: forward passes run one at a time and torch uses all cores for each of them.
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='video-scoring')
+        # any prompt -> embedding mapping; validators pass the shared PromptEmbeddingCache.
+        self.text_embeddings = {} if text_embedding_cache is None else text_embedding_cache
+        self.dedup_max_entries = dedup_max_entries
+        # built on the first batch when num_frames comes from the model config.
+        self.hash_index: VideoHashIndex = None if num_frames is None else self.create_hash_index()
+        self.uid_to_copied_uids = defaultdict(set)
+        self.pending = []
+        self.flush_handle = None
+        self.videos_scored = 0
+        self.duplicates = 0
+        self.copies = 0
+        self.batches_scored = 0
+        self.scoring_time = 0.0
+
+    def create_hash_index(self):
+        return VideoHashIndex(max_entries=self.dedup_max_entries, num_frames=self.num_frames)
+
+    async def score(self, prompt, video_url, uid=None) -> float:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((uid, prompt, video_url, future))
+        if len(self.pending) >= self.max_batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.batch_window, self.flush)
+        return await future
+
+    async def score_many(self, uid_prompt_urls) -> dict:
+        """Score (uid, prompt, video_url) items and return the average score per uid."""
+        scores = await asyncio.gather(*[self.score(prompt, url, uid) for uid, prompt, url in uid_prompt_urls])
+        uid_to_scores = defaultdict(list)
+        for (uid, _, _), score in zip(uid_prompt_urls, scores):
+            uid_to_scores[uid].append(score)
+        return {uid: sum(scores) / len(scores) for uid, scores in uid_to_scores.items()}
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self.score_batch(batch))
+
+    async def score_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        start_time = time.time()
+        try:
+            if self.num_frames is None:
+                self.num_frames = await loop.run_in_executor(self.executor, get_xclip_num_frames)
+            if self.hash_index is None:
+                self.hash_index = self.create_hash_index()
+            frames_list = await asyncio.gather(
+                *[self.decoder.fetch_sampled_frames(url, self.num_frames) for _, _, url, _ in batch],
+                return_exceptions=True)
+            to_score = []
+            for (uid, prompt, url, future), frames in zip(batch, frames_list):
+                if isinstance(frames, Exception) or not frames:
+                    bt.logging.debug(f"couldn't decode video {url}: {frames}")
+                    # the caller may have been cancelled while the batch was decoding.
+                    if not future.done():
+                        future.set_result(0)
+                else:
+                    to_score.append((uid, prompt, frames, future))
+            if not to_score:
+                return
+
+            scores = await loop.run_in_executor(self.executor, self.embed_and_score,
+                                                [(uid, prompt, frames) for uid, prompt, frames, _ in to_score])
+            for (_, _, _, future), score in zip(to_score, scores):
+                if not future.done():
+                    future.set_result(score)
+            self.videos_scored += len(to_score)
+            self.batches_scored += 1
+        except Exception as err:
+            bt.logging.error(f"failed to score batch of {len(batch)} videos: {err} {traceback.format_exc()}")
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_result(0)
+        finally:
+            self.scoring_time += time.time() - start_time
+
+    def embed_and_score(self, uid_prompt_frames):
+        """Runs on the scoring thread: dedup lookups, one vision pass for the new videos, then similarities."""
+        hashes_list = [compute_video_hashes(frames) for _, _, frames in uid_prompt_frames]
+        video_embeds = [None] * len(uid_prompt_frames)
+        # new videos are indexed right away, with (batch, index) as payload until their embedding is computed,
+        # so that a copy of a video in the same batch is caught too.
+        batch = object()
+        to_embed = []
+        same_batch_matches = []
+        for i, ((uid, _, _), hashes) in enumerate(zip(uid_prompt_frames, hashes_list)):
+            match = self.hash_index.lookup(hashes)
+            # a placeholder left behind by a batch that failed is a miss.
+            if match is None or (isinstance(match[1], tuple) and match[1][0] is not batch):
+                slot = self.hash_index.add(hashes, -1 if uid is None else uid, (batch, i))
+                to_embed.append((i, slot))
+                continue
+            matched_uid, payload, distance = match
+            if isinstance(payload, tuple):
+                same_batch_matches.append((i, payload[1]))
+            else:
+                video_embeds[i] = payload
+            self.duplicates += 1
+            if uid is not None and matched_uid >= 0 and matched_uid != uid:
+                if matched_uid not in self.uid_to_copied_uids[uid]:
+                    bt.logging.info(f"uid {uid} returned a near-duplicate of a video from uid {matched_uid} "
+                                    f"(median frame distance {distance} bits)")
+                self.uid_to_copied_uids[uid].add(matched_uid)
+                self.copies += 1
+
+        if to_embed:
+            embeds = compute_video_embeddings([uid_prompt_frames[i][2] for i, _ in to_embed])
+            for (i, slot), embed in zip(to_embed, embeds):
+                # clone so the index doesn't keep the whole batch tensor alive.
+                video_embeds[i] = embed.clone()
+                if slot is not None:
+                    self.hash_index.set_payload(slot, video_embeds[i])
+        for i, matched_i in same_batch_matches:
+            video_embeds[i] = video_embeds[matched_i]
+
+        prompts = [prompt for _, prompt, _ in uid_prompt_frames]
+        return compute_embedding_similarities(torch.stack(video_embeds), prompts, self.text_embeddings)
+
+    def get_stats(self):
+        return {
+            'videos_scored': self.videos_scored,
+            'batches_scored': self.batches_scored,
+            'videos_per_second': self.videos_scored / self.scoring_time if self.scoring_time else 0.0,
+            'decoder': self.decoder.get_stats(),
+            'text_embeddings': len(self.text_embeddings),
+            'duplicates': self.duplicates,
+            'copies': self.copies,
+            'dedup_index': self.hash_index.get_stats() if self.hash_index is not None else {},
+            'copying_uids': len(self.uid_to_copied_uids),
+        }
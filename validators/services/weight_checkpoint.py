@@ -0,0 +1,51 @@
+import os
+import time
+
+import numpy as np
+import torch
+import bittensor as bt
+
+CHECKPOINT_VERSION = 1
+
+
+def remap_scores(scores: torch.Tensor, old_hotkeys, new_hotkeys) -> torch.Tensor:
+    """
+    Move per-uid scores from old_hotkeys' uids to the uids those hotkeys hold in new_hotkeys.
+    A hotkey that is gone, or a uid that changed owner, starts from 0.
+    """
+    hotkey_to_score = dict(zip(old_hotkeys, scores.tolist()))
+    return torch.tensor([hotkey_to_score.get(hotkey, 0.0) for hotkey in new_hotkeys], dtype=scores.dtype)
+
+
+def save_weight_checkpoint(path, hotkeys, moving_average_scores: torch.Tensor, block=0):
+    """Write the moving average keyed by hotkey, atomically: a crash leaves the previous checkpoint intact."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, version=CHECKPOINT_VERSION, hotkeys=np.array(list(hotkeys), dtype=str),
+                 moving_average_scores=moving_average_scores.numpy(), block=block, saved_at=time.time())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_weight_checkpoint(path, hotkeys):
+    """Return the checkpointed moving average remapped onto hotkeys, or None if there is no usable checkpoint."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as checkpoint:
+            if int(checkpoint['version']) != CHECKPOINT_VERSION:
+                bt.logging.warning(f"ignoring weight checkpoint {path} with version {int(checkpoint['version'])}")
+                return None
+            saved_hotkeys = checkpoint['hotkeys'].tolist()
+            scores = torch.from_numpy(checkpoint['moving_average_scores'])
+            block = int(checkpoint['block'])
+    except Exception as err:
+        bt.logging.error(f"failed to load weight checkpoint {path}: {err}")
+        return None
+
+    moving_average_scores = remap_scores(scores, saved_hotkeys, hotkeys)
+    bt.logging.info(f"restored moving average of {int((moving_average_scores > 0).sum())} uids from {path} "
+                    f"(saved at block {block})")
+    return moving_average_scores
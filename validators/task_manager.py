@@ -1,48 +1,205 @@
 import asyncio
 import random
-from copy import deepcopy
+from typing import List
+
+import numpy as np
 import bittensor as bt
 
 from ryno import VIDEO_SYNAPSE_TYPE
 from validators.utils import error_handler
-from validators import utils
+
+
+class CapacityScheduler:
+    """Index of miners with remaining bandwidth per (provider, model) so each assignment is O(1)."""
+
+    def __init__(self, capacities: "CapacityTable"):
+        self.capacities = capacities
+        self.rows = {}
+        self.positions = {}
+        self.reset()
+
+    def reset(self):
+        remain = self.capacities.remain
+        self.rows = {}
+        self.positions = {}
+        for key, col in self.capacities.slots.items():
+            rows = np.flatnonzero(remain[:, col] > 0).tolist()
+            self.rows[key] = rows
+            self.positions[key] = {row: index for index, row in enumerate(rows)}
+
+    def _remove(self, key, row):
+        # swap-remove: move the last row into the freed slot.
+        rows = self.rows[key]
+        positions = self.positions[key]
+        index = positions.pop(row)
+        last_row = rows.pop()
+        if last_row != row:
+            rows[index] = last_row
+            positions[last_row] = index
+
+    def assign(self, provider, model):
+        key = (provider, model)
+        rows = self.rows.get(key)
+        if not rows:
+            return None
+        row = rows[random.randrange(len(rows))]
+        col = self.capacities.slots[key]
+        remain = self.capacities.remain
+        remain[row, col] -= 1
+        if remain[row, col] <= 0:
+            self._remove(key, row)
+        return self.capacities.uids[row]
+
+    def release(self, provider, model, uid):
+        """Give back one unit of bandwidth taken by assign(), up to the miner's max."""
+        key = (provider, model)
+        row = self.capacities.uid_rows.get(uid)
+        col = self.capacities.slots.get(key)
+        if row is None or col is None:
+            return
+        remain = self.capacities.remain
+        if remain[row, col] >= self.capacities.max[row, col]:
+            return
+        remain[row, col] += 1
+        positions = self.positions.setdefault(key, {})
+        if remain[row, col] > 0 and row not in positions:
+            rows = self.rows.setdefault(key, [])
+            positions[row] = len(rows)
+            rows.append(row)
+
+
+class CapacityTable:
+    """Remaining and max bandwidth in flat arrays indexed by (uid row, provider-model slot)."""
+
+    def __init__(self):
+        self.uids = []
+        self.uid_rows = {}
+        self.slots = {}
+        self.remain = np.zeros((0, 0), dtype=np.int64)
+        self.max = np.zeros((0, 0), dtype=np.int64)
+        # entries a miner actually reported, so the nested view keeps the same keys as the miner's response.
+        self.defined = np.zeros((0, 0), dtype=bool)
+
+    def _resize(self, num_rows, num_cols):
+        old_rows, old_cols = self.remain.shape
+        if num_rows <= old_rows and num_cols <= old_cols:
+            return
+        pad = ((0, max(num_rows - old_rows, 0)), (0, max(num_cols - old_cols, 0)))
+        self.remain = np.pad(self.remain, pad)
+        self.max = np.pad(self.max, pad)
+        self.defined = np.pad(self.defined, pad)
+
+    def get_row(self, uid):
+        row = self.uid_rows.get(uid)
+        if row is None:
+            row = len(self.uids)
+            self.uid_rows[uid] = row
+            self.uids.append(uid)
+            self._resize(row + 1, len(self.slots))
+        return row
+
+    def get_col(self, provider, model):
+        col = self.slots.get((provider, model))
+        if col is None:
+            col = len(self.slots)
+            self.slots[(provider, model)] = col
+            self._resize(len(self.uids), col + 1)
+        return col
+
+    def get(self, uid, provider, model):
+        row = self.uid_rows.get(uid)
+        col = self.slots.get((provider, model))
+        if row is None or col is None or not self.defined[row, col]:
+            return None
+        return int(self.remain[row, col])
+
+    def to_nested_dict(self, values):
+        # compatibility view in the uid -> provider -> model -> bandwidth shape returned by miners.
+        nested = {}
+        for uid, row in self.uid_rows.items():
+            nested[uid] = None
+            for (provider, model), col in self.slots.items():
+                if self.defined[row, col]:
+                    if nested[uid] is None:
+                        nested[uid] = {}
+                    nested[uid].setdefault(provider, {})[model] = int(values[row, col])
+        return nested
+
+    def iter_positive(self, values):
+        """(uid, provider, model, value) for every reported entry of values above 0, in uid then slot order."""
+        slot_keys = list(self.slots)
+        rows, cols = np.nonzero(self.defined & (values > 0))
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            provider, model = slot_keys[col]
+            yield self.uids[row], provider, model, int(values[row, col])
 
 
 class TaskMgr:
     def __init__(self, uid_to_capacities, dendrite, metagraph, loop):
-        # Initialize Redis client
-        self.remain_resources = deepcopy(uid_to_capacities)
-        self.uid_to_capacity = deepcopy(uid_to_capacities)
+        self.capacities = CapacityTable()
+        for uid, capacity in uid_to_capacities.items():
+            row = self.capacities.get_row(uid)
+            if not capacity:
+                continue
+            for provider, model_to_cap in capacity.items():
+                for model, cap in model_to_cap.items():
+                    col = self.capacities.get_col(provider, model)
+                    self.capacities.max[row, col] = cap or 0
+                    self.capacities.defined[row, col] = True
+        np.copyto(self.capacities.remain, self.capacities.max)
+        self.scheduler = CapacityScheduler(self.capacities)
         self.dendrite = dendrite
         self.metagraph = metagraph
         self.loop = loop
+        # nested view of max, rebuilt only after max changes.
+        self._uid_to_capacity = None
+
+    @property
+    def remain_resources(self):
+        # compatibility view, rebuilt on every access. use iter_remaining_bandwidth in hot paths.
+        return self.capacities.to_nested_dict(self.capacities.remain)
+
+    @property
+    def uid_to_capacity(self):
+        if self._uid_to_capacity is None:
+            self._uid_to_capacity = self.capacities.to_nested_dict(self.capacities.max)
+        return self._uid_to_capacity
+
+    def iter_remaining_bandwidth(self):
+        """(uid, provider, model, bandwidth) for every miner slot with bandwidth left."""
+        return self.capacities.iter_positive(self.capacities.remain)
 
     def restore_capacities_for_all_miners(self):
-        self.remain_resources = deepcopy(self.uid_to_capacity)
-        bt.logging.debug(f"resource is restored. remain_resources = {self.remain_resources}")
+        np.copyto(self.capacities.remain, self.capacities.max)
+        self.scheduler.reset()
+        bt.logging.debug(f"resource is restored. total remaining bandwidth = {int(self.capacities.remain.sum())}")
 
     def get_remaining_bandwidth(self, uid, provider, model):
-        if self.remain_resources.get(uid):
-            if self.remain_resources.get(uid).get(provider):
-                return self.remain_resources.get(uid).get(provider).get(model)
-
+        return self.capacities.get(uid, provider, model)
 
     def update_remain_capacity_based_on_new_capacity(self, new_uid_to_capacity):
+        capacities = self.capacities
         for uid, capacity in new_uid_to_capacity.items():
             if not capacity:
                 continue
+            row = capacities.get_row(uid)
             for provider, model_to_cap in capacity.items():
                 for model, cap in model_to_cap.items():
-                    if self.get_remaining_bandwidth(uid, provider, model) is None:
-                        utils.update_nested_dict(self.remain_resources, keys=[uid, provider, model], value=cap)
+                    cap = cap or 0
+                    col = capacities.get_col(provider, model)
+                    if not capacities.defined[row, col]:
+                        capacities.remain[row, col] = cap
+                        capacities.defined[row, col] = True
                     else:
-                        diff = self.uid_to_capacity[uid][provider][model] - cap
+                        diff = capacities.max[row, col] - cap
                         if diff:
                             bt.logging.debug(f"diff {diff} found in {uid}, {provider}, {model}")
-                        self.remain_resources[uid][provider][model] -= diff
+                        capacities.remain[row, col] -= diff
 
-        bt.logging.debug(f"remain_resources after epoch = {self.remain_resources}")
-        self.uid_to_capacity = deepcopy(self.remain_resources)
+        bt.logging.debug(f"total remaining bandwidth after epoch = {int(capacities.remain.sum())}")
+        np.copyto(capacities.max, capacities.remain)
+        self._uid_to_capacity = None
+        self.scheduler.reset()
 
     @error_handler
     def assign_task(self, synapse: VIDEO_SYNAPSE_TYPE):
@@ -57,20 +214,15 @@ class TaskMgr:
         uid = int(uid)
         return self.metagraph.axons[uid]
 
+    @error_handler
+    def assign_many(self, synapses: List[VIDEO_SYNAPSE_TYPE]):
+        """Assign a miner to every synapse in one pass. uid is None where no bandwidth is left."""
+        return [self.choose_miner(synapse) for synapse in synapses]
+
     def choose_miner(self, synapse: VIDEO_SYNAPSE_TYPE):
-        provider = synapse.provider
-        model = synapse.model
-        available_uids = []
-        for uid in self.remain_resources:
-            capacity = self.remain_resources.get(uid)
-            if capacity is None:
-                continue
-            bandwidth = capacity.get(provider).get(model)
-            if bandwidth is not None and bandwidth > 0:
-                # decrease resource by one after choosing this miner for the request.
-                available_uids.append(uid)
-        if not available_uids:
-            return None
-        uid = random.choice(available_uids)
-        self.remain_resources[uid][provider][model] -= 1
-        return uid
+        # the scheduler decreases remaining bandwidth by one for the chosen miner.
+        return self.scheduler.assign(synapse.provider, synapse.model)
+
+    def release_miner(self, synapse: VIDEO_SYNAPSE_TYPE, uid):
+        # undo choose_miner for a request that was never answered by uid.
+        self.scheduler.release(synapse.provider, synapse.model, uid)
@@ -12,15 +12,36 @@ from functools import wraps
 import traceback
 
 from ryno import VIDEO_SYNAPSE_TYPE, VIDEO_SYNAPSE_TYPE
-from validators.services.cache import QueryResponseCache
+from ryno.streaming import StreamAccumulator
+from validators.services.cache import cache_service
+
+
+_http_session: aiohttp.ClientSession = None
+_http_session_loop = None
+# a request that doesn't set its own timeout can't hang on a stalled host. total bounds a whole video download.
+HTTP_SESSION_TIMEOUT = aiohttp.ClientTimeout(total=300, sock_connect=10, sock_read=30)
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """One ClientSession, and so one connection pool, shared by every media download on the running loop."""
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        _http_session = aiohttp.ClientSession(timeout=HTTP_SESSION_TIMEOUT)
+        _http_session_loop = loop
+    return _http_session
+
+
+async def close_http_session():
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
 
 
 async def download_image(url):
     try:
-        async with aiohttp.ClientSession() as session:
-            response = await  session.get(url)
+        async with get_http_session().get(url) as response:
             content = await response.read()
-            return await asyncio.to_thread(Image.open, BytesIO(content))
+        return await asyncio.to_thread(Image.open, BytesIO(content))
     except Exception as e:
         bt.logging.exception(e)
 
@@ -59,13 +80,8 @@ def error_handler(func):
         return wrapper_sync
 
 
-async def handle_response_stream(responses) -> tuple[str, str]:
-    full_response = ""
-    async for chunk in responses:
-        if isinstance(chunk, str):
-            bt.logging.trace(chunk)
-            full_response += chunk
-    return full_response
+async def handle_response_stream(responses, uid=None) -> str:
+    return await StreamAccumulator(uid).consume(responses)
 
 
 def save_or_get_answer_from_cache(func):
@@ -75,7 +91,6 @@ def save_or_get_answer_from_cache(func):
         provider = query_syn.provider
         model = query_syn.model
 
-        cache_service = QueryResponseCache()
         answer = cache_service.get_answer(question=str(query_syn.json()), provider=provider, model=model)
         if answer:
             return answer
@@ -96,16 +111,18 @@ def save_or_get_answer_from_cache(func):
 def get_query_synapse_from_cache(func):
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        cache_service = QueryResponseCache()
         vali = args[0]
         provider = args[2]
         model = args[3]
-        questions_answers = cache_service.get_all_question_to_answers(provider=provider, model=model)
-        if not questions_answers or random.random() > 0.1:
+        if random.random() > 0.1:
             query_syn = await func(*args, **kwargs)
             return query_syn
         # select one of questions_answers from cache database.
-        query, answer = random.choice(questions_answers)
+        question_answer = cache_service.get_random_question_to_answer(provider=provider, model=model)
+        if not question_answer:
+            query_syn = await func(*args, **kwargs)
+            return query_syn
+        query, answer = question_answer
         query_syn = vali.get_synapse_from_json(query)
         return query_syn
 
@@ -183,35 +200,29 @@ def get_bandwidth(data, uid, provider, model):
     return value
 
 
-def load_entire_questions():
-    # Asynchronous function to fetch a URL
-    async def fetch(session, url):
-        async with session.get(url) as response:
+async def fetch_entire_questions(concurrency=16, max_retries=3):
+    # Asynchronous function to fetch a URL, retrying with backoff
+    async def fetch(session, semaphore, url):
+        for try_cnt in range(max_retries):
             try:
-                return await response.json()
+                async with semaphore, session.get(url) as response:
+                    response.raise_for_status()
+                    return await response.json()
             except Exception as err:
-                bt.logging.error(f"{err} {traceback.format_exc()}")
-
-    # Asynchronous function to gather multiple HTTP requests
-    async def gather_requests(urls):
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for url in urls:
-                tasks.append(fetch(session, url))  # Create a task for each URL
-            results = await asyncio.gather(*tasks)  # Run all tasks concurrently
-            return results
-
-    # Main function to run the event loop
-    def main(urls):
-        loop = asyncio.get_event_loop()
-        results = loop.run_until_complete(gather_requests(urls))
-        return results
+                bt.logging.debug(f"fetching {url} failed ({try_cnt + 1}/{max_retries}): {err}")
+                await asyncio.sleep(2 ** try_cnt)
+        bt.logging.error(f"giving up on {url} after {max_retries} tries")
 
     urls = []
     for q_id in range(0, 80000, 100):
         url = f"https://datasets-server.huggingface.co/rows?dataset=microsoft%2Fms_marco&config=v1.1&split=train&offset={q_id}&length=100"
         urls.append(url)
-    responses = main(urls)
+
+    # bounded concurrency instead of firing every request at the datasets server at once
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession() as session:
+        responses = await asyncio.gather(*[fetch(session, semaphore, url) for url in urls])
+
     queries = []
     for response in responses:
         if response is None:
@@ -13,6 +13,8 @@ import ryno
 from ryno import utils, dendrite
 from validators.weight_setter import WeightSetter
 from validators.services.cache import cache_service
+from validators.utils import close_http_session
+from validators.services import BaseValidator
 
 # Load environment variables from .env file
 load_dotenv()
@@ -69,6 +71,50 @@ def parse_arguments():
     parser.add_argument("--autoupdate", action="store_true", help="Enable auto-updates")
     parser.add_argument("--image_validator_probability", type=float, default=0.001)
     parser.add_argument("--async_time_out", type=int, default=60)
+    parser.add_argument("--max_concurrent_queries", type=int, default=10000)
+    parser.add_argument("--max_in_flight_per_miner", type=int, default=50)
+    parser.add_argument("--chain_state_ttl", type=float, default=600,
+                        help="Seconds tempo, weights rate limit and last update are reused before being read again.")
+    parser.add_argument("--cache_flush_size", type=int, default=500)
+    parser.add_argument("--cache_flush_interval", type=float, default=5)
+    parser.add_argument("--cache_queue_size", type=int, default=100000)
+    parser.add_argument("--cache_ttl", type=int, default=3600 * 24, help="Seconds to keep cached responses.")
+    parser.add_argument("--cache_keep_epochs", type=int, default=0,
+                        help="Also drop cached responses older than this many epochs. 0 keeps them until ttl.")
+    parser.add_argument("--cache_retention_interval", type=int, default=600)
+    parser.add_argument("--cache_convert_auto_vacuum", action="store_true",
+                        help="Rewrite a cache.db created without incremental auto vacuum, on the cache writer thread.")
+    parser.add_argument("--questions_path", type=str, default=None,
+                        help="Local question corpus file. Defaults to a file in the validator directory.")
+    parser.add_argument("--questions_refresh_interval", type=int, default=0,
+                        help="Seconds between background refreshes of the question corpus. 0 disables it.")
+    parser.add_argument("--embedding_cache_size", type=int, default=4096,
+                        help="Prompt text embeddings kept in memory.")
+    parser.add_argument("--embedding_cache_dir", type=str, default=None,
+                        help="Directory to persist prompt text embeddings in. Disabled by default.")
+    parser.add_argument("--score_report", type=str, default="table", choices=["table", "jsonl", "off"],
+                        help="How score tables are reported: printed, appended to --score_report_path, or not at all.")
+    parser.add_argument("--score_report_path", type=str, default=None)
+    parser.add_argument("--score_report_interval", type=float, default=60,
+                        help="Minimum seconds between two score reports.")
+    parser.add_argument("--weights_checkpoint_path", type=str, default=None,
+                        help="Where the moving average of weights is saved. Defaults to weights_state.npz "
+                             "in the validator directory.")
+    parser.add_argument("--dendrite_max_connections", type=int, default=1000,
+                        help="Sockets the dendrite keeps open across all miners.")
+    parser.add_argument("--dendrite_max_connections_per_host", type=int, default=None,
+                        help="Sockets the dendrite keeps open per miner. Defaults to --max_in_flight_per_miner.")
+    parser.add_argument("--dendrite_idle_timeout", type=float, default=60,
+                        help="Seconds before an idle keep-alive connection to a miner is closed.")
+    parser.add_argument("--dendrite_dns_ttl", type=int, default=300)
+    parser.add_argument("--hedge_organic_queries", action="store_true",
+                        help="Send a slow organic query to a second miner and answer with whichever responds first.")
+    parser.add_argument("--hedge_percentile", type=float, default=95,
+                        help="Latency percentile of the first miner after which an organic query is hedged.")
+    parser.add_argument("--latency_window", type=int, default=200,
+                        help="Latest requests per miner the latency percentiles are computed over.")
+    parser.add_argument("--latency_min_samples", type=int, default=10,
+                        help="Requests a miner needs before its organic queries can be hedged.")
     return parser.parse_args(namespace=NestedNamespace())
 
 
@@ -116,10 +162,7 @@ def init_wandb(config):
 
 
 async def close_all_connections():
-    tasks = []
-    for key, connection in dendrite.RynoDendrite.miner_to_session.items():
-        tasks.append(connection.close())
-    await asyncio.gather(*tasks)
+    await asyncio.gather(dendrite.RynoDendrite.transport.close(), close_http_session())
 
 
 def main():
@@ -130,6 +173,16 @@ def main():
     setup_logging(config)
 
     config.wallet = bt.wallet(name=config.wallet.name, hotkey=config.wallet.hotkey)
+    dendrite.RynoDendrite.transport.configure(
+        max_connections=config.get('dendrite_max_connections', 1000),
+        max_connections_per_host=(config.get('dendrite_max_connections_per_host') or
+                                  config.get('max_in_flight_per_miner', 50)),
+        idle_timeout=config.get('dendrite_idle_timeout', 60),
+        dns_ttl=config.get('dendrite_dns_ttl', 300))
+    dendrite.RynoDendrite.latency.configure(window=config.get('latency_window', 200),
+                                            min_samples=config.get('latency_min_samples', 10))
+    dendrite.RynoDendrite.stream_latency.configure(window=config.get('latency_window', 200),
+                                                   min_samples=config.get('latency_min_samples', 10))
     config.dendrite = dendrite.RynoDendrite(wallet=config.wallet)
 
     bt.logging.info(f"Config: {vars(config)}")
@@ -145,13 +198,15 @@ def main():
         bt.logging.info("Keyboard interrupt detected. Exiting validator.")
     finally:
         bt.logging.info("stopping axon server.")
-        bt.logging.info(
-            f"closing all sessins. total connections is {len(dendrite.RynoDendrite.miner_to_session.keys())}")
+        bt.logging.info(f"closing all sessions. dendrite transport {dendrite.RynoDendrite.transport.get_stats()}")
         asyncio.run(close_all_connections())
         weight_setter.axon.stop()
         bt.logging.info("updating status before exiting validator")
         state = utils.get_state(state_path)
         utils.save_state_to_file(state, state_path)
+        BaseValidator.score_reporter.stop()
+        bt.logging.info("flushing pending responses to cache database.")
+        weight_setter.cache_writer.stop()
         bt.logging.info("closing connection of cache database.")
         cache_service.close()
         if config.wandb_on:
@@ -1,5 +1,6 @@
 import asyncio
 import concurrent
+import os
 import random
 import traceback
 import threading
@@ -7,6 +8,7 @@ import threading
 import torch
 import time
 
+
 from black.trans import defaultdict
 from substrateinterface import SubstrateInterface
 from functools import partial
@@ -20,14 +22,26 @@ from starlette.types import Send
 from ryno.protocol import IsAlive, VideoResponse
 from ryno.metaclasses import ValidatorRegistryMeta
 from validators.services import CapacityService, BaseValidator
-from validators.services.cache import QueryResponseCache
-from validators.utils import error_handler, setup_max_capacity, load_entire_questions
+# imported for its side effect: defining the class registers it with ValidatorRegistryMeta.
+from validators.services.validators.video_validator import VideoValidator  # noqa: F401
+from validators.services.cache import QueryResponseCache, CacheWriter
+from validators.services.block_subscriber import SubstrateBlockSubscriber
+from validators.services.chain_state import ChainStateCache
+from validators.services.query_dispatcher import QueryDispatcher
+from validators.services.question_corpus import QuestionCorpus, CORPUS_VERSION
+from validators.services.query_buffer import QueryBuffer
+from validators.services.score_accumulator import ScoreAccumulator, resize_tensor
+from validators.services.weight_checkpoint import load_weight_checkpoint, remap_scores, save_weight_checkpoint
+from ryno.models import model_registry
+from validators.utils import error_handler, setup_max_capacity
 from validators.task_manager import TaskMgr
-from ryno.dendrite import RynoDendrite
+from ryno.dendrite import RynoDendrite, STREAM_END
+from ryno.streaming import StreamAccumulator
 from ryno.axon import RynoAxon
 
 scoring_organic_timeout = 60
 NUM_INTERVALS_PER_CYCLE = 10
+BLOCK_TIME = 12
 
 
 class WeightSetter:
@@ -49,7 +63,6 @@ class WeightSetter:
         self.config = config
         self.wallet = config.wallet
         self.subtensor = bt.subtensor(config=config)
-        self.node = SubstrateInterface(url=config.subtensor.chain_endpoint)
         self.netuid = self.config.netuid
         self.metagraph = bt.metagraph(netuid=self.netuid, network=config.subtensor.chain_endpoint)
         self.my_uid = self.metagraph.hotkeys.index(self.wallet.hotkey.ss58_address)
@@ -58,32 +71,62 @@ class WeightSetter:
         # Scoring and querying parameters
         self.max_score_cnt_per_model = 1
 
+        # one long-lived validator per type. query records reference them by index instead of holding instances.
+        self.validators: List[BaseValidator] = []
+        self.validator_type_ids = {}
+        self.synapse_type_to_validator_type_id = {}
+        for vali_type, validator_cls in ValidatorRegistryMeta.all_classes().items():
+            self.validator_type_ids[vali_type] = len(self.validators)
+            self.synapse_type_to_validator_type_id[validator_cls.get_task_type()] = len(self.validators)
+            self.validators.append(validator_cls(config=config, metagraph=self.metagraph))
+
         # Initialize scores and counts
-        self.total_scores = {}
-        self.score_counts = {}
-        self.moving_average_scores = None
+        self.score_accumulator = ScoreAccumulator(len(self.metagraph.uids))
+        # pick up the moving average where the last run left it instead of warming up from scratch.
+        self.weights_checkpoint_path = (config.get('weights_checkpoint_path') or
+                                        os.path.join(config.full_path, "weights_state.npz"))
+        self.moving_average_scores = load_weight_checkpoint(self.weights_checkpoint_path, self.metagraph.hotkeys)
 
         # Set up axon and dendrite
         self.axon = RynoAxon(wallet=self.wallet, config=self.config)
         bt.logging.info(f"Axon server started on port {self.config.axon.port}")
         self.dendrite: RynoDendrite = config.dendrite
 
-        # Get network tempo
-        self.tempo = self.subtensor.tempo(self.netuid)
-        self.weights_rate_limit = self.node_query('SubtensorModule', 'WeightsSetRateLimit', [self.netuid])
+        # Get network tempo, weights rate limit and current block with a single batched read.
+        # hyperparameters rarely change. our own LastUpdate only moves when we set weights, which invalidates it.
+        self.chain_state = ChainStateCache(config.subtensor.chain_endpoint, ttl=config.get('chain_state_ttl', 600))
+        self.block_number_key = self.chain_state.watch('System', 'Number')
+        self.tempo_key = self.chain_state.watch('SubtensorModule', 'Tempo', [self.netuid])
+        self.weights_rate_limit_key = self.chain_state.watch('SubtensorModule', 'WeightsSetRateLimit', [self.netuid])
+        self.last_update_key = self.chain_state.watch('SubtensorModule', 'LastUpdate', [self.netuid])
+        chain_values = self.chain_state.read_sync()
+        self.current_block = chain_values[self.block_number_key]
+        self.tempo = chain_values[self.tempo_key]
+        self.weights_rate_limit = chain_values[self.weights_rate_limit_key]
 
         # Set up async-related attributes
         self.lock = asyncio.Lock()
         self.loop = loop or asyncio.get_event_loop()
 
+        # Follow new block headers instead of polling the chain for the current block.
+        self.block_subscriber = SubstrateBlockSubscriber(config.subtensor.chain_endpoint, self.loop)
+        self.block_subscriber.start()
+
         # Initialize shared query database
-        self.query_database = []
+        self.query_database = QueryBuffer()
+        self.query_dispatcher = QueryDispatcher(
+            max_concurrency=config.get('max_concurrent_queries', 10000),
+            max_in_flight_per_miner=config.get('max_in_flight_per_miner', 50))
 
         # initialize uid and capacities.
         asyncio.run(self.initialize_uids_and_capacities())
-        self.queries = load_entire_questions()
-        if len(self.queries) < 10000:
-            raise f"loading questions failed. {len(self.queries)}"
+        self.queries = QuestionCorpus(config.get('questions_path') or
+                                      os.path.join(config.full_path, f"questions.v{CORPUS_VERSION}.bin"))
+        if not self.queries.load():
+            bt.logging.info("no local question corpus found. downloading questions once.")
+            asyncio.run(self.queries.refresh())
+        if len(self.queries) < self.queries.min_count:
+            raise Exception(f"loading questions failed. {len(self.queries)}")
         bt.logging.info(f"total loaded questions are {len(self.queries)}")
         self.set_up_next_block_to_wait()
         # Set up async tasks
@@ -91,24 +134,28 @@ class WeightSetter:
         self.loop.create_task(self.consume_organic_queries())
         self.loop.create_task(self.perform_synthetic_queries())
         self.loop.create_task(self.process_queries_from_database())
-
-        self.saving_datas = []
-        daemon_thread = threading.Thread(target=self.saving_resp_answers_from_miners)
-        daemon_thread.start()
-
-    def saving_resp_answers_from_miners(self):
-        self.cache = QueryResponseCache()
-        self.cache.set_vali_info(vali_uid=self.my_uid, vali_hotkey=self.wallet.hotkey.ss58_address)
-        while True:
-            if not self.saving_datas:
-                time.sleep(1)
-            else:
-                bt.logging.info(f"saving responses...")
-                self.cache.set_cache_in_batch([item.get('synapse') for item in self.saving_datas],
-                                              block_num=self.current_block,
-                                              cycle_num=self.current_block // 36, epoch_num=self.current_block // 360)
-                bt.logging.info(f"total saved responses is {len(self.saving_datas)}")
-                self.saving_datas.clear()
+        if config.get('questions_refresh_interval'):
+            self.loop.create_task(self.queries.refresh_periodically(config.questions_refresh_interval))
+
+        # every validator type shares one prompt embedding cache; the model source namespaces its keys.
+        BaseValidator.text_embedding_cache.configure(max_entries=config.get('embedding_cache_size', 4096),
+                                                     cache_dir=config.get('embedding_cache_dir'),
+                                                     namespace=model_registry.get_source('xclip'))
+
+        BaseValidator.score_reporter.configure(mode=config.get('score_report', 'table'),
+                                               jsonl_path=config.get('score_report_path'),
+                                               min_interval=config.get('score_report_interval', 60))
+
+        # responses are persisted by a write-behind thread so saving never blocks scoring.
+        self.cache_writer = CacheWriter(vali_uid=self.my_uid, vali_hotkey=self.wallet.hotkey.ss58_address,
+                                        flush_size=config.get('cache_flush_size', 500),
+                                        flush_interval=config.get('cache_flush_interval', 5),
+                                        max_queue_size=config.get('cache_queue_size', 100000),
+                                        ttl=config.get('cache_ttl', 3600 * 24),
+                                        keep_epochs=config.get('cache_keep_epochs', 0),
+                                        retention_interval=config.get('cache_retention_interval', 600),
+                                        convert_auto_vacuum=config.get('cache_convert_auto_vacuum', False))
+        self.cache_writer.start()
 
     async def run_sync_in_async(self, fn):
         return await self.loop.run_in_executor(None, fn)
@@ -122,9 +169,8 @@ class WeightSetter:
         bt.logging.info(f"Available UIDs: {list(self.available_uid_to_axons.keys())}")
         self.uid_to_capacity = await self.get_capacities_for_uids(self.available_uid_to_axons)
         bt.logging.info(f"Capacities for miners: {self.uid_to_capacity}")
-        # Initialize total_scores, score_counts.
-        self.total_scores = {uid: 0.0 for uid in self.available_uid_to_axons.keys()}
-        self.score_counts = {uid: 0 for uid in self.available_uid_to_axons.keys()}
+        # start accumulating scores of the available uids, growing with the metagraph.
+        self.score_accumulator.reset(self.available_uid_to_axons.keys(), size=len(self.metagraph.uids))
 
         # update task_mgr after synthetic query at the end of iterator.
         if self.task_mgr:
@@ -133,23 +179,19 @@ class WeightSetter:
             self.task_mgr = TaskMgr(uid_to_capacities=self.uid_to_capacity, dendrite=self.dendrite,
                                     metagraph=self.metagraph, loop=self.loop)
 
-    def node_query(self, module, method, params):
-        try:
-            result = self.node.query(module, method, params).value
-
-        except Exception as err:
-            # reinitilize node
-            self.node = SubstrateInterface(url=self.config.subtensor.chain_endpoint)
-            result = self.node.query(module, method, params).value
-
-        return result
-
     def get_blocks_til_epoch(self, block):
         return self.tempo - (block + 19) % (self.tempo + 1)
 
-    def is_epoch_end(self):
-        current_block = self.node_query('System', 'Number', [])
-        last_update = current_block - self.node_query('SubtensorModule', 'LastUpdate', [self.netuid])[self.my_uid]
+    async def is_epoch_end(self):
+        current_block = self.block_subscriber.current_block
+        if current_block is None:
+            return False
+        # LastUpdate is stored as one vector per netuid, so the whole vector comes back in the batch.
+        chain_values = await self.chain_state.read()
+        self.tempo = chain_values[self.tempo_key]
+        self.weights_rate_limit = chain_values[self.weights_rate_limit_key]
+        last_update = current_block - chain_values[self.last_update_key][self.my_uid]
+        bt.logging.debug(f"last update: {last_update} blocks ago. chain state cache {self.chain_state.get_stats()}")
         if last_update >= self.tempo * 2 or (
                 self.get_blocks_til_epoch(current_block) < 10 and last_update >= self.weights_rate_limit):
             return True
@@ -158,64 +200,76 @@ class WeightSetter:
     async def update_and_refresh(self):
         await self.update_weights()
         bt.logging.info("Refreshing metagraph...")
+        old_hotkeys = list(self.metagraph.hotkeys)
         await self.refresh_metagraph()
+        if self.moving_average_scores is not None and old_hotkeys != self.metagraph.hotkeys:
+            # uids that changed owner don't inherit the previous owner's moving average.
+            self.moving_average_scores = remap_scores(self.moving_average_scores, old_hotkeys, self.metagraph.hotkeys)
         await self.initialize_uids_and_capacities()
         bt.logging.info("Metagraph refreshed.")
 
+    async def save_streamed_response(self, uid, query_syn, response_text):
+        # Store the query and response in the shared database
+        async with self.lock:
+            self.query_database.append(
+                uid=uid,
+                synapse=query_syn,
+                response=(response_text, query_syn.dendrite.process_time),
+                query_type='organic',
+                timestamp=asyncio.get_event_loop().time(),
+                validator_type_id=self.get_validator_type_id_for_synapse(query_syn),
+                process_time=query_syn.dendrite.process_time)
+            query_syn.time_taken = query_syn.dendrite.process_time
+
     async def query_miner(self, uid, query_syn: ryno.VIDEO_SYNAPSE_TYPE):
         query_syn.uid = uid
-        if query_syn.streaming:
+        if getattr(query_syn, 'streaming', False):
             if uid is None:
                 bt.logging.error("Can't create task.")
                 return
             bt.logging.trace(f"synthetic task is created and uid is {uid}")
 
-            async def handle_response(resp):
-                response_text = ''
-                async for chunk in resp:
-                    if isinstance(chunk, str):
-                        response_text += chunk
-                        bt.logging.trace(f"Streamed text: {chunk}")
-
-                # Store the query and response in the shared database
-                async with self.lock:
-                    self.query_database.append({
-                        'uid': uid,
-                        'synapse': query_syn,
-                        'response': (response_text, query_syn.dendrite.process_time),
-                        'query_type': 'organic',
-                        'timestamp': asyncio.get_event_loop().time(),
-                        'validator': ValidatorRegistryMeta.get_class('TextValidator')(config=self.config,
-                                                                                      metagraph=self.metagraph)
-                    })
-                    query_syn.time_taken = query_syn.dendrite.process_time
-
             axon = self.metagraph.axons[uid]
             response = self.dendrite.call_stream(
                 target_axon=axon,
                 synapse=query_syn,
                 timeout=query_syn.timeout,
             )
-            await handle_response(response)
+            response_text = await StreamAccumulator(uid).consume(response)
+            await self.save_streamed_response(uid, query_syn, response_text)
         else:
-            pass
+            if uid is None:
+                bt.logging.error("Can't create task.")
+                return
+            bt.logging.trace(f"synthetic task is created and uid is {uid}")
+
+            axon = self.metagraph.axons[uid]
+            start_time = time.time()
+            response = await self.dendrite.call_tracked(uid, axon, query_syn, timeout=query_syn.timeout)
+            response.process_time = time.time() - start_time
+            if not response.is_success:
+                bt.logging.trace(f"uid {uid} didn't answer: {response.dendrite.status_message}")
+
+            # Store the query and response in the shared database
+            async with self.lock:
+                self.query_database.append(
+                    uid=uid,
+                    synapse=query_syn,
+                    response=response,
+                    query_type='synthetic',
+                    timestamp=asyncio.get_event_loop().time(),
+                    validator_type_id=self.get_validator_type_id_for_synapse(query_syn),
+                    process_time=response.process_time)
 
     async def create_query_syns_for_remaining_bandwidth(self):
         total_syns = []
-        for uid, provider_to_cap in self.task_mgr.remain_resources.items():
-            if provider_to_cap is None:
-                continue
-            for provider, model_to_cap in provider_to_cap.items():
-                for model, bandwidth in model_to_cap.items():
-                    if bandwidth > 0:
-                        # create task and send remaining requests to the miner
-                        vali = self.choose_validator_from_model(model)
-
-                        query_syns = [vali.create_query(uid, provider, model, prompt=prompt)
-                                      for prompt in random.choices(self.queries, k=bandwidth)]
-                        total_syns += query_syns
-                    else:
-                        continue
+        for uid, provider, model, bandwidth in self.task_mgr.iter_remaining_bandwidth():
+            # create task and send remaining requests to the miner
+            vali = self.choose_validator_from_model(model)
+
+            query_syns = await asyncio.gather(*[vali.create_query(uid, provider, model, prompt=prompt)
+                                                for prompt in random.choices(self.queries, k=bandwidth)])
+            total_syns += query_syns
         return total_syns
 
     def set_up_next_block_to_wait(self):
@@ -223,93 +277,84 @@ class WeightSetter:
         if self.next_block_to_wait:
             current_block = self.next_block_to_wait
         else:
-            current_block = self.node_query('System', 'Number', [])
+            current_block = self.current_block
         next_block = current_block + (self.tempo / NUM_INTERVALS_PER_CYCLE)  # 36 blocks per cycle.
         self.next_block_to_wait = next_block
 
-    def is_cycle_end(self):
-        current_block = self.node_query('System', 'Number', [])
-        bt.logging.info(current_block, self.next_block_to_wait)
-        if self.current_block != current_block:
-            last_update = current_block - self.node_query('SubtensorModule', 'LastUpdate', [self.netuid])[self.my_uid]
-            bt.logging.info(f"last update: {last_update} blocks ago")
-            bt.logging.info(f"current block {current_block}: next block for synthetic {self.next_block_to_wait}")
-            self.current_block = current_block
-        if current_block >= self.next_block_to_wait:
-            return True
-        else:
-            return False
+    async def wait_for_cycle_end(self):
+        current_block = await self.block_subscriber.wait_for_block(self.next_block_to_wait)
+        bt.logging.info(f"current block {current_block}: next block for synthetic {self.next_block_to_wait}")
+        self.current_block = current_block
 
     async def perform_synthetic_queries(self):
         while True:
-            if not self.is_cycle_end():
-                await asyncio.sleep(12)
-                continue
+            await self.wait_for_cycle_end()
             self.set_up_next_block_to_wait()
             start_time = time.time()
             # don't process any organic query while processing synthetic queries.
             async with self.lock:
-                synthetic_tasks = []
                 # check available bandwidth and send synthetic requests to all miners.
                 query_synapses = await self.create_query_syns_for_remaining_bandwidth()
-                for query_syn in query_synapses:
-                    uid = self.task_mgr.assign_task(query_syn)
-                    if uid is None:
-                        bt.logging.debug(f"No available uids for synthetic query process.")
-                    synthetic_tasks.append((uid, self.query_miner(uid, query_syn)))
+                # error_handler returns None when assignment fails: no synapse gets a miner then.
+                uids = self.task_mgr.assign_many(query_synapses) or [None] * len(query_synapses)
 
             bt.logging.debug(f"{time.time() - start_time} elapsed for creating and submitting synthetic queries.")
 
             # restore capacities immediately after synthetic query consuming all bandwidth.
             self.task_mgr.restore_capacities_for_all_miners()
 
+            synthetic_tasks = list(zip(uids, query_synapses))
             random.shuffle(synthetic_tasks)
-            batched_tasks, remain_tasks = self.pop_synthetic_tasks_max_100_per_miner(synthetic_tasks)
-            while batched_tasks:
-                start_time_batch = time.time()
-                await asyncio.gather(*batched_tasks, return_exceptions=True)
-                bt.logging.debug(
-                    f"batch size {len(batched_tasks)} has been processed and time elapsed: {time.time() - start_time_batch}")
-                bt.logging.debug(f"remain tasks: {len(remain_tasks)}")
-
-                batched_tasks, remain_tasks = self.pop_synthetic_tasks_max_100_per_miner(remain_tasks)
+            # streaming queries share one multiplexed fan-out; the rest go through the per-miner dispatcher.
+            streaming_tasks = [(uid, syn) for uid, syn in synthetic_tasks
+                               if uid is not None and getattr(syn, 'streaming', False)]
+            other_tasks = [(uid, syn) for uid, syn in synthetic_tasks
+                           if uid is None or not getattr(syn, 'streaming', False)]
+            stats, _ = await asyncio.gather(self.query_dispatcher.run(self.query_miner, other_tasks),
+                                            self.query_miners_in_batch(streaming_tasks))
+            if stats.skipped:
+                bt.logging.debug(f"No available uids for {stats.skipped} synthetic queries.")
 
             bt.logging.info(
                 f"synthetic queries has been processed successfully."
-                f"total queries are {len(query_synapses)}: total {time.time() - start_time} elapsed")
+                f"total queries are {len(query_synapses)}: total {time.time() - start_time} elapsed. "
+                f"slowest request took {stats.max_latency}")
+            bt.logging.debug(f"stream latency per uid {StreamAccumulator.stats.get_stats()}")
+            bt.logging.debug(f"organic latency per uid {RynoDendrite.latency.get_stats()}")
             self.synthetic_task_done = True
 
-            bt.logging.info(
-                f"synthetic queries and answers has been processed in cache successfully. total times {time.time() - start_time}")
-
-    def pop_synthetic_tasks_max_100_per_miner(self, synthetic_tasks):
-        batch_size = 10000
-        max_query_cnt_per_miner = 50
-        batch_tasks = []
-        remain_tasks = []
-        uid_to_task_cnt = defaultdict(int)
-        for uid, synthetic_task in synthetic_tasks:
-            if uid_to_task_cnt[uid] < max_query_cnt_per_miner:
-                if len(batch_tasks) > batch_size:
-                    remain_tasks.append((uid, synthetic_task))
-                    continue
-                batch_tasks.append(synthetic_task)
-                uid_to_task_cnt[uid] += 1
-                continue
+    async def query_miners_in_batch(self, uid_syns):
+        """Stream all (uid, synapse) queries through one fan-out and save each response as soon as its stream ends."""
+        if not uid_syns:
+            return
+        for uid, query_syn in uid_syns:
+            query_syn.uid = uid
+        accumulators = [StreamAccumulator(uid) for uid, _ in uid_syns]
+        # whatever is still streaming when the next cycle starts is cancelled.
+        cycle_time = self.tempo / NUM_INTERVALS_PER_CYCLE * BLOCK_TIME
+        async for index, chunk in self.dendrite.call_stream_in_batch(
+                target_axons=[self.metagraph.axons[uid] for uid, _ in uid_syns],
+                synapses=[query_syn for _, query_syn in uid_syns],
+                timeout=max(query_syn.timeout for _, query_syn in uid_syns),
+                keys=list(range(len(uid_syns))),
+                target_deadline=cycle_time,
+                deadline=cycle_time,
+                max_concurrency=self.config.get('max_concurrent_queries', 10000)):
+            if chunk is STREAM_END:
+                uid, query_syn = uid_syns[index]
+                await self.save_streamed_response(uid, query_syn, accumulators[index].finish())
             else:
-                remain_tasks.append((uid, synthetic_task))
-                continue
-        return batch_tasks, remain_tasks
+                accumulators[index].add(chunk)
+
+    def get_validator(self, vali_type) -> BaseValidator:
+        return self.validators[self.validator_type_ids[vali_type]]
+
+    def get_validator_type_id_for_synapse(self, synapse):
+        return self.synapse_type_to_validator_type_id[type(synapse).__name__]
 
     def choose_validator_from_model(self, model):
-        text_validator = ValidatorRegistryMeta.get_class('TextValidator')(config=self.config, metagraph=self.metagraph)
-        # image_validator = ValidatorRegistryMeta.get_class('ImageValidator')(config=self.config,
-        #                                                                     metagraph=self.metagraph)
-        if model != 'dall-e-3':
-            text_validator.model = model
-            return text_validator
-        # else:
-        #     return image_validator
+        # every model is a video model for now. create_query gets the model, so the shared instance isn't mutated.
+        return self.get_validator('VideoValidator')
 
     async def get_capacities_for_uids(self, uids):
         capacity_service = CapacityService(metagraph=self.metagraph, dendrite=self.dendrite)
@@ -345,24 +390,12 @@ class WeightSetter:
     async def update_weights(self):
         """Update weights based on average scores."""
         bt.logging.info("Updating weights...")
-        avg_scores = {}
 
-        # Compute average scores per UID
+        # average scores per uid, aligned with metagraph uids.
         async with self.lock:
-            for uid in self.total_scores:
-                count = self.score_counts[uid]
-                if count > 0:
-                    avg_scores[uid] = self.total_scores[uid] / count
-                else:
-                    avg_scores[uid] = 0.0
-
-        bt.logging.info(f"Average scores = {avg_scores}")
-
-        # Convert avg_scores to a tensor aligned with metagraph UIDs
-        weights = torch.zeros(len(self.metagraph.uids))
-        for uid, score in avg_scores.items():
-            weights[uid] = score
+            weights = self.score_accumulator.averages(size=len(self.metagraph.uids))
 
+        bt.logging.info(f"Average scores = {self.score_accumulator.summary()}")
         await self.set_weights(weights)
 
     async def set_weights(self, scores):
@@ -370,6 +403,9 @@ class WeightSetter:
         alpha = .3
         if self.moving_average_scores is None:
             self.moving_average_scores = scores.clone()
+        elif len(self.moving_average_scores) != len(scores):
+            # the metagraph grew (or shrank): new uids start from 0.
+            self.moving_average_scores = resize_tensor(self.moving_average_scores, len(scores))
 
         # Update the moving average scores
         self.moving_average_scores = alpha * scores + (1 - alpha) * self.moving_average_scores
@@ -385,6 +421,13 @@ class WeightSetter:
             )
         )
         bt.logging.success("Successfully included weights in block.")
+        self.chain_state.invalidate(self.last_update_key)
+        try:
+            await self.run_sync_in_async(
+                lambda: save_weight_checkpoint(self.weights_checkpoint_path, self.metagraph.hotkeys,
+                                               self.moving_average_scores, block=self.current_block))
+        except Exception as err:
+            bt.logging.error(f"failed to save weight checkpoint: {err}")
 
     def blacklist_videos(self, synapse: VideoResponse) -> Tuple[bool, str]:
         blacklist = self.base_blacklist(synapse, ryno.VIDEO_BLACKLIST_STAKE)
@@ -413,25 +456,47 @@ class WeightSetter:
 
         axon = self.metagraph.axons[synapse.uid]
         start_time = time.time()
-        synapse_response: VideoResponse = await self.dendrite(axon, synapse, deserialize=False,
-                                                              timeout=synapse.timeout)
+        if self.config.get('hedge_organic_queries', False):
+            uid, synapse_response = await self.dendrite.call_hedged(
+                synapse.uid, axon, synapse, timeout=synapse.timeout,
+                get_hedge_target=partial(self.get_hedge_target, synapse),
+                release_hedge_target=partial(self.release_hedge_target, synapse),
+                hedge_percentile=self.config.get('hedge_percentile', 95))
+            if uid != synapse.uid:
+                synapse = synapse_response
+        else:
+            synapse_response: VideoResponse = await self.dendrite.call_tracked(synapse.uid, axon, synapse,
+                                                                               timeout=synapse.timeout)
         synapse_response.process_time = time.time() - start_time
 
         bt.logging.info(f"New synapse = {synapse_response}")
         # Store the query and response in the shared database
         async with self.lock:
-            self.query_database.append({
-                'uid': synapse.uid,
-                'synapse': synapse,
-                'response': synapse_response,
-                'query_type': 'organic',
-                'timestamp': asyncio.get_event_loop().time(),
-                'validator': ValidatorRegistryMeta.get_class('VideoValidator')(config=self.config,
-                                                                               metagraph=self.metagraph)
-            })
+            self.query_database.append(
+                uid=synapse.uid,
+                synapse=synapse,
+                response=synapse_response,
+                query_type='organic',
+                timestamp=asyncio.get_event_loop().time(),
+                validator_type_id=self.get_validator_type_id_for_synapse(synapse),
+                process_time=synapse_response.process_time)
 
         return synapse_response
 
+    def get_hedge_target(self, synapse: VideoResponse):
+        """Another miner with bandwidth left for the synapse's model, as (uid, axon), or None."""
+        if self.task_mgr is None:
+            return None
+        uid = self.task_mgr.choose_miner(synapse)
+        if uid is None or uid == synapse.uid:
+            return None
+        return uid, self.metagraph.axons[uid]
+
+    def release_hedge_target(self, synapse: VideoResponse, uid):
+        # the hedge didn't answer: give back the unit of bandwidth get_hedge_target took.
+        if self.task_mgr is not None:
+            self.task_mgr.release_miner(synapse, uid)
+
     async def consume_organic_queries(self):
         bt.logging.info("Attaching forward function to axon.")
         self.axon.attach(
@@ -443,61 +508,45 @@ class WeightSetter:
         self.axon.start()
         bt.logging.info(f"Running validator on uid: {self.my_uid}")
 
-    def get_scoring_tasks_from_query_responses(self, queries_to_process):
-
-        grouped_query_resps = defaultdict(list)
+    def get_scoring_tasks_from_query_responses(self, queries_to_process: QueryBuffer):
         validator_to_query_resps = defaultdict(list)
-        type_to_validator = {}
-
-        # Process queries outside the lock to prevent blocking
-        for query_data in queries_to_process:
-            uid = query_data['uid']
-            synapse = query_data['synapse']
-            response = query_data['response']
-            validator = query_data['validator']
-            vali_type = type(validator).__name__
-            type_to_validator[vali_type] = validator
-
-            provider = synapse.provider
-            model = synapse.model
-
-            grouped_key = f"{vali_type}:{uid}:{provider}:{model}"
-            grouped_query_resps[grouped_key].append(
-                (uid, {'query': synapse, 'response': response}))
-
-        for key, uid_to_query_resps in grouped_query_resps.items():
-            vali_type = str(key).split(":")[0]
-            if not uid_to_query_resps:
-                continue
-            query_resp_to_score_for_uids = random.choices(uid_to_query_resps, k=self.max_score_cnt_per_model)
-            validator_to_query_resps[vali_type] += query_resp_to_score_for_uids
+
+        # pick max_score_cnt_per_model responses of every (validator, uid, provider, model) group.
+        picks, group_validator_type_ids = queries_to_process.sample_per_group(self.max_score_cnt_per_model)
+        uids = queries_to_process.column('uids')
+        for rows, validator_type_id in zip(picks.tolist(), group_validator_type_ids.tolist()):
+            validator_to_query_resps[validator_type_id] += [
+                (int(uids[row]), {'query': queries_to_process.synapses[row],
+                                  'response': queries_to_process.responses[row]}) for row in rows]
 
         score_tasks = []
-        for vali_type in type_to_validator:
-            validator = type_to_validator[vali_type]
-            text_score_task = validator.score_responses(validator_to_query_resps[vali_type], self.uid_to_capacity)
-            score_tasks.append(text_score_task)
+        for validator_type_id, query_resps in validator_to_query_resps.items():
+            validator = self.validators[validator_type_id]
+            score_task = validator.score_responses(query_resps, self.uid_to_capacity)
+            score_tasks.append(score_task)
         return score_tasks
 
     async def process_queries_from_database(self):
         while True:
-            await asyncio.sleep(1)  # Adjust the sleep time as needed
+            # check once per new block instead of polling the chain every second.
+            await self.block_subscriber.wait_for_next_block()
             # accumulate all query results for 36 blocks
             if not self.query_database:
                 bt.logging.debug("no data in query_database. so continue...")
                 continue
-            if not self.is_epoch_end():
-                bt.logging.debug("no end of epoch. so continue...")
-                continue
             if not self.synthetic_task_done:
                 bt.logging.debug("wait for synthetic tasks to complete.")
                 continue
+            if not await self.is_epoch_end():
+                bt.logging.debug("no end of epoch. so continue...")
+                continue
 
             bt.logging.info(f"start scoring process...")
 
             async with self.lock:
-                queries_to_process = self.query_database.copy()
-                self.query_database.clear()
+                # swap in an empty buffer instead of copying the accumulated one.
+                queries_to_process = self.query_database
+                self.query_database = queries_to_process.empty_like()
 
             self.synthetic_task_done = False
             bt.logging.info("start scoring process")
@@ -508,15 +557,15 @@ class WeightSetter:
 
             resps = await asyncio.gather(*score_tasks)
             resps = [item for item in resps if item is not None]
-            # Update total_scores and score_counts
+            # Update score sums and counts
             async with self.lock:
                 for uid_scores_dict, _, _ in resps:
-                    for uid, score in uid_scores_dict.items():
-                        if self.total_scores.get(uid) is not None:
-                            self.total_scores[uid] += score
-                            self.score_counts[uid] += 1
-            bt.logging.info(
-                f"current total score are {self.total_scores}. total time of scoring is {time.time() - start_time}")
-            self.saving_datas = queries_to_process.copy()
+                    self.score_accumulator.add(uid_scores_dict)
+            bt.logging.info(f"current average scores are {self.score_accumulator.summary()}. "
+                            f"total time of scoring is {time.time() - start_time}")
+            bt.logging.debug(f"prompt embedding cache {BaseValidator.text_embedding_cache.get_stats()}")
+            current_block = self.block_subscriber.current_block or self.current_block
+            self.cache_writer.submit(queries_to_process.synapses, block_num=current_block,
+                                     cycle_num=current_block // 36, epoch_num=current_block // 360)
             await self.update_and_refresh()
             bt.logging.info("update and referesh is done.")